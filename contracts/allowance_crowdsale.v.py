@@ -13,7 +13,9 @@
 contract TokenContract:
     def transferFrom(_from: address, _to: address, _value: uint256) -> bool: modifying
     def allowance(_owner: address, _spender: address) -> uint256: constant
-    
+    def transfer(_to: address, _value: uint256) -> bool: modifying
+    def balanceOf(_owner: address) -> uint256: constant
+
 
 # Event for token purchase logging
 # @param _purchaser who paid for the tokens
@@ -23,19 +25,24 @@ contract TokenContract:
 TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(address), _value: uint256(wei), _amount: uint256})
 
 #AllowanceCrowdsale
-tokenWallet: public(address)
-
-# The token being sold
-token: public(address)
+# The token wallet in the upper 160 bits, and in the lowest bit whether purchases
+# are delivered from the tranches pulled into this contract instead of the allowance.
+tokenWalletAndTranches: uint256
 
-#Address where funds are collected
-wallet: public(address)
+# The largest rate which fits below an address in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
 
+# The token being sold in the upper 160 bits and the rate in the lower 96 bits,
+# packed in one storage word because every purchase reads both.
 # How many token units a buyer gets per wei.
 # The rate is the conversion between wei and the smallest and indivisible token unit.
 # So, if you are using a rate of 1 with a DetailedERC20 token with 3 decimals called TOK
 # 1 wei will give you 1 unit, or 0.001 TOK.
-rate: public(uint256)
+tokenAndRate: uint256
+
+# Address where funds are collected in the upper 160 bits, and in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet.
+walletAndSettlement: uint256
 
 #Amount of wei raised
 weiRaised: public(uint256(wei))
@@ -44,7 +51,59 @@ weiRaised: public(uint256(wei))
 @public
 @constant
 def getRemainingTokens() -> uint256:
-    return TokenContract(self.token).allowance(self.tokenWallet, self)
+    """
+    @dev Checks the amount of tokens left for sale, in the allowance and in the pulled tranches.
+    @return Amount of tokens left
+    """
+
+    token: address = convert(convert(shift(self.tokenAndRate, -96), bytes32), address)
+    tokenWallet: address = convert(convert(shift(self.tokenWalletAndTranches, -96), bytes32), address)
+
+    return TokenContract(token).allowance(tokenWallet, self) + TokenContract(token).balanceOf(self)
+
+@public
+@constant
+def getTrancheTokens() -> uint256:
+    """
+    @dev Checks the amount of tokens left in the tranches pulled into this contract.
+    @return Amount of tokens held by this contract
+    """
+
+    return TokenContract(convert(convert(shift(self.tokenAndRate, -96), bytes32), address)).balanceOf(self)
+
+@public
+def pullTranche(_amount: uint256):
+    """
+    @dev Moves a tranche of the allowance into this contract. From then on, purchases are
+    delivered with a transfer from this contract, which leaves the allowance untouched.
+    Purchases fail once the tranches are sold out, until the next tranche is pulled.
+    @param _amount Amount of tokens to move
+    """
+
+    tokenWallet: uint256 = shift(self.tokenWalletAndTranches, -96)
+    assert msg.sender == convert(convert(tokenWallet, bytes32), address), "Access is denied."
+    assert _amount > 0, "Invalid amount."
+
+    self.tokenWalletAndTranches = bitwise_or(shift(tokenWallet, 96), 1)
+    assert TokenContract(convert(convert(shift(self.tokenAndRate, -96), bytes32), address)).transferFrom(msg.sender, self, _amount), "Could not pull the tranche due to an unknown error."
+
+@public
+def returnTranches():
+    """
+    @dev Returns the unsold tokens of the tranches to the token wallet, after which
+    purchases are delivered from the allowance again.
+    """
+
+    tokenWallet: uint256 = shift(self.tokenWalletAndTranches, -96)
+    assert msg.sender == convert(convert(tokenWallet, bytes32), address), "Access is denied."
+
+    self.tokenWalletAndTranches = shift(tokenWallet, 96)
+
+    token: address = convert(convert(shift(self.tokenAndRate, -96), bytes32), address)
+    unsold: uint256 = TokenContract(token).balanceOf(self)
+
+    if unsold > 0:
+        assert TokenContract(token).transfer(msg.sender, unsold), "Could not return the tranches due to an unknown error."
 
 #Crowdsale
 @public
@@ -60,44 +119,168 @@ def __init__(_rate: uint256, _wallet: address, _token: address, _tokenWallet: ad
     assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
     assert _tokenWallet != ZERO_ADDRESS, "Invalid token wallet."
 
-    self.rate = _rate
-    self.wallet = _wallet
-    self.token = _token
-    self.tokenWallet = _tokenWallet
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.tokenWalletAndTranches = shift(convert(convert(_tokenWallet, bytes32), uint256), 96)
+
+@public
+def initialize(_rate: uint256, _wallet: address, _token: address, _tokenWallet: address):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _rate Number of token units a buyer gets per wei
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _tokenWallet Address holding the tokens, which has approved allowance to the crowdsale
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
+    assert _tokenWallet != ZERO_ADDRESS, "Invalid token wallet."
+
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.tokenWalletAndTranches = shift(convert(convert(_tokenWallet, bytes32), uint256), 96)
 
 @private
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    return _weiAmount * self.rate
+def unpackAddress(_word: uint256) -> address:
+    return convert(convert(shift(_word, -96), bytes32), address)
+
+@public
+@constant
+def token() -> address:
+    return self.unpackAddress(self.tokenAndRate)
+
+@public
+@constant
+def rate() -> uint256:
+    return bitwise_and(self.tokenAndRate, MAX_RATE)
+
+@public
+@constant
+def wallet() -> address:
+    return self.unpackAddress(self.walletAndSettlement)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
+
+@public
+@constant
+def tokenWallet() -> address:
+    return self.unpackAddress(self.tokenWalletAndTranches)
+
+@public
+@constant
+def usesTranches() -> bool:
+    return bitwise_and(self.tokenWalletAndTranches, 1) == 1
 
 
 @private
-def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
+def processPurchase(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
 
+    config: uint256 = self.tokenAndRate
+
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
-    
-    self.weiRaised += _weiAmount
+    tokens: uint256 = as_unitless_number(_weiAmount) * bitwise_and(config, MAX_RATE)
 
     #process purchase
-    assert TokenContract(self.token).transferFrom(self.tokenWallet, _beneficiary, tokens), "Could not forward funds due to an unknown error."
+    token: address = convert(convert(shift(config, -96), bytes32), address)
+    tokenWallet: uint256 = self.tokenWalletAndTranches
+
+    if bitwise_and(tokenWallet, 1) == 1:
+        assert TokenContract(token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
+    else:
+        assert TokenContract(token).transferFrom(convert(convert(shift(tokenWallet, -96), bytes32), address), _beneficiary, tokens), "Could not forward funds due to an unknown error."
     log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
 
+@private
+def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
+    self.processPurchase(_sender, _beneficiary, _weiAmount)
+
+    self.weiRaised += _weiAmount
+
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), _weiAmount)
 
     #post validate
 
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    wallet: uint256 = shift(self.walletAndSettlement, -96)
+    assert msg.sender == convert(convert(wallet, bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(shift(wallet, 96), 1)
+    else:
+        self.walletAndSettlement = shift(wallet, 96)
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
 @public
 @payable
 def buyTokens(_beneficiary: address):
     self.processTransaction(msg.sender, _beneficiary, msg.value)
 
+@public
+@payable
+def buyTokensBatch(_count: int128, _beneficiaries: address[50], _amounts: uint256(wei)[50]):
+    """
+    @dev Purchases tokens for a group of beneficiaries in a single transaction.
+    The funds are forwarded to the wallet once for the whole batch.
+    @param _count The count of beneficiaries in this batch. Should be less than or equal to 50.
+    @param _beneficiaries List of addresses receiving the tokens
+    @param _amounts List of wei amounts paid for each beneficiary
+    """
+
+    assert _count > 0, "No beneficiaries supplied."
+    assert _count <= 50, "Too many beneficiaries supplied."
+
+    total: uint256(wei)
+
+    for i in range(50):
+        if i >= _count:
+            break
+
+        self.processPurchase(msg.sender, _beneficiaries[i], _amounts[i])
+        total += _amounts[i]
+
+    assert total == msg.value, "The amount received does not match the sum of amounts."
+
+    self.weiRaised += msg.value
+
+    #forward funds to the receiving wallet address.
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), msg.value)
+
 @public
 @payable
 def __default__():
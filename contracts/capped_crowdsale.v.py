@@ -20,26 +20,39 @@ contract TokenContract:
 # @param _amount amount of tokens purchased
 TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(address), _value: uint256(wei), _amount: uint256})
 
-#Capped Crowdsale
-cap: public(uint256)
-
 #Crowdsale
-# The token being sold
-token: public(address)
-
-#Address where funds are collected
-wallet: public(address)
+# The largest rate which fits below an address in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
 
+# The token being sold in the upper 160 bits and the rate in the lower 96 bits,
+# packed in one storage word because every purchase reads both.
 # How many token units a buyer gets per wei.
 # The rate is the conversion between wei and the smallest and indivisible token unit.
 # So, if you are using a rate of 1 with a DetailedERC20 token with 3 decimals called TOK
 # 1 wei will give you 1 unit, or 0.001 TOK.
-rate: public(uint256)
+tokenAndRate: uint256
+
+# Address where funds are collected in the upper 160 bits, in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet,
+# and in the next bit whether purchases exceeding the cap are filled partially.
+walletAndSettlement: uint256
 
-#Amount of wei raised
-weiRaised: public(uint256(wei))
+#Capped Crowdsale
+# Amount of wei raised in the upper 128 bits and the cap in the lower 128 bits,
+# packed in one storage word because every purchase checks the cap and updates the amount raised.
+weiRaisedAndCap: uint256
 
 #Capped Crowdsale
+@public
+@constant
+def cap() -> uint256:
+    return shift(shift(self.weiRaisedAndCap, 128), -128)
+
+@public
+@constant
+def weiRaised() -> uint256(wei):
+    return as_wei_value(shift(self.weiRaisedAndCap, -128), "wei")
+
 @public
 @constant
 def capReached() -> bool:
@@ -48,7 +61,8 @@ def capReached() -> bool:
     @return Whether the cap was reached
     """
 
-    return as_unitless_number(self.weiRaised) >= self.cap
+    state: uint256 = self.weiRaisedAndCap
+    return shift(state, -128) >= shift(shift(state, 128), -128)
 
 #Crowdsale
 @public
@@ -64,17 +78,65 @@ def __init__(_rate: uint256, _wallet: address, _token: address, _cap: uint256):
     assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
     assert _cap > 0, "Invalid cap."
+    assert shift(_cap, -128) == 0, "Invalid cap."
 
-    self.rate = _rate
-    self.wallet = _wallet
-    self.token = _token
-    self.cap = _cap
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.weiRaisedAndCap = _cap
+
+@public
+def initialize(_rate: uint256, _wallet: address, _token: address, _cap: uint256):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _rate Number of token units a buyer gets per wei
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _cap Max amount of wei to be contributed
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
+    assert _cap > 0, "Invalid cap."
+    assert shift(_cap, -128) == 0, "Invalid cap."
+
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.weiRaisedAndCap = _cap
 
 @private
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    return _weiAmount * self.rate
+def unpackAddress(_word: uint256) -> address:
+    return convert(convert(shift(_word, -96), bytes32), address)
+
+@public
+@constant
+def token() -> address:
+    return self.unpackAddress(self.tokenAndRate)
+
+@public
+@constant
+def rate() -> uint256:
+    return bitwise_and(self.tokenAndRate, MAX_RATE)
+
+@public
+@constant
+def wallet() -> address:
+    return self.unpackAddress(self.walletAndSettlement)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
+
+@public
+@constant
+def partialFills() -> bool:
+    return bitwise_and(self.walletAndSettlement, 2) == 2
 
 
 @private
@@ -82,22 +144,81 @@ def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
-    assert as_unitless_number(self.weiRaised + _weiAmount) <= self.cap, "Sorry but this exceeds the cap."
+    state: uint256 = self.weiRaisedAndCap
+    settlement: uint256 = self.walletAndSettlement
+    raised: uint256 = shift(state, -128)
+    remaining: uint256 = shift(shift(state, 128), -128) - raised
+    amount: uint256 = as_unitless_number(_weiAmount)
+    refund: uint256
+
+    if amount > remaining:
+        #with partial fills, the remaining capacity is sold and the excess refunded.
+        assert bitwise_and(settlement, 2) == 2, "Sorry but this exceeds the cap."
+        assert remaining > 0, "Sorry but this exceeds the cap."
+        refund = amount - remaining
+        amount = remaining
+
+    config: uint256 = self.tokenAndRate
 
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
+    tokens: uint256 = amount * bitwise_and(config, MAX_RATE)
     
-    self.weiRaised += _weiAmount
+    self.weiRaisedAndCap = state + shift(amount, 128)
 
     #process purchase
-    assert TokenContract(self.token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
-    log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
+    assert TokenContract(convert(convert(shift(config, -96), bytes32), address)).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
+    log.TokenPurchase(_sender, _beneficiary, as_wei_value(amount, "wei"), tokens)
 
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), as_wei_value(amount, "wei"))
+
+    if refund > 0:
+        send(_sender, as_wei_value(refund, "wei"))
 
     #post validate
 
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    settlement: uint256 = self.walletAndSettlement
+    assert msg.sender == convert(convert(shift(settlement, -96), bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(settlement, 1)
+    else:
+        self.walletAndSettlement = bitwise_xor(settlement, bitwise_and(settlement, 1))
+
+@public
+def setPartialFills(_enabled: bool):
+    """
+    @dev Lets a purchase which exceeds the cap buy the remaining capacity instead of failing.
+    The excess of such a purchase is refunded to the sender in the same transaction.
+    @param _enabled True to fill purchases partially, false to reject purchases which exceed the cap
+    """
+
+    settlement: uint256 = self.walletAndSettlement
+    assert msg.sender == convert(convert(shift(settlement, -96), bytes32), address), "Access is denied."
+
+    if _enabled:
+        self.walletAndSettlement = bitwise_or(settlement, 2)
+    else:
+        self.walletAndSettlement = bitwise_xor(settlement, bitwise_and(settlement, 2))
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
 @public
 @payable
 def buyTokens(_beneficiary: address):
@@ -0,0 +1,139 @@
+# CrowdsaleFactory
+# This file is released under Apache 2.0 license.
+# @dev Creates crowdsales as minimal proxies of a template deployed once.
+# Each proxy delegates every call to the template, so it only pays for a few
+# bytes of code and the storage written by the initializer of the template.
+# The proxy does not forward revert reasons, a failed call reverts without data.
+
+
+#@dev Initializers of the crowdsale contracts, grouped by their arguments.
+#Crowdsale and MintedCrowdsale
+contract Crowdsale:
+    def initialize(_rate: uint256, _wallet: address, _token: address): modifying
+
+#IndividuallyCappedCrowdsale and WhitelistedCrowdsale
+contract OwnedCrowdsale:
+    def initialize(_rate: uint256, _wallet: address, _token: address, _owner: address): modifying
+
+contract AllowanceCrowdsale:
+    def initialize(_rate: uint256, _wallet: address, _token: address, _tokenWallet: address): modifying
+
+contract CappedCrowdsale:
+    def initialize(_rate: uint256, _wallet: address, _token: address, _cap: uint256): modifying
+
+#TimedCrowdsale and PostDeliveryCrowdsale
+contract TimedCrowdsale:
+    def initialize(_openingTime: timestamp, _closingTime: timestamp, _rate: uint256, _wallet: address, _token: address): modifying
+
+contract IncreasingPriceCrowdsale:
+    def initialize(_openingTime: timestamp, _closingTime: timestamp, _wallet: address, _token: address, _initialRate: uint256, _finalRate: uint256): modifying
+
+contract TieredPriceCrowdsale:
+    def initialize(_closingTime: timestamp, _wallet: address, _token: address, _tierCount: int128, _tierStartTimes: timestamp[32], _tierRates: uint256[32]): modifying
+
+# Event for crowdsale creation logging
+# @param _template the crowdsale the new one delegates to
+# @param _crowdsale the new crowdsale
+# @param _creator who created the crowdsale
+CrowdsaleCreated: event({_template: indexed(address), _crowdsale: indexed(address), _creator: indexed(address)})
+
+
+@private
+def createProxy(_template: address, _creator: address) -> address:
+    assert _template != ZERO_ADDRESS, "Invalid template address."
+
+    crowdsale: address = create_with_code_of(_template)
+    log.CrowdsaleCreated(_template, crowdsale, _creator)
+
+    return crowdsale
+
+@public
+def createCrowdsale(_template: address, _rate: uint256, _wallet: address, _token: address) -> address:
+    """
+    @dev Creates a Crowdsale or a MintedCrowdsale.
+    @param _template A deployed crowdsale of the same contract
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    Crowdsale(crowdsale).initialize(_rate, _wallet, _token)
+
+    return crowdsale
+
+@public
+def createOwnedCrowdsale(_template: address, _rate: uint256, _wallet: address, _token: address) -> address:
+    """
+    @dev Creates an IndividuallyCappedCrowdsale or a WhitelistedCrowdsale owned by the sender.
+    @param _template A deployed crowdsale of the same contract
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    OwnedCrowdsale(crowdsale).initialize(_rate, _wallet, _token, msg.sender)
+
+    return crowdsale
+
+@public
+def createAllowanceCrowdsale(_template: address, _rate: uint256, _wallet: address, _token: address, _tokenWallet: address) -> address:
+    """
+    @dev Creates an AllowanceCrowdsale.
+    @param _template A deployed AllowanceCrowdsale
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    AllowanceCrowdsale(crowdsale).initialize(_rate, _wallet, _token, _tokenWallet)
+
+    return crowdsale
+
+@public
+def createCappedCrowdsale(_template: address, _rate: uint256, _wallet: address, _token: address, _cap: uint256) -> address:
+    """
+    @dev Creates a CappedCrowdsale.
+    @param _template A deployed CappedCrowdsale
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    CappedCrowdsale(crowdsale).initialize(_rate, _wallet, _token, _cap)
+
+    return crowdsale
+
+@public
+def createTimedCrowdsale(_template: address, _openingTime: timestamp, _closingTime: timestamp, _rate: uint256, _wallet: address, _token: address) -> address:
+    """
+    @dev Creates a TimedCrowdsale or a PostDeliveryCrowdsale.
+    @param _template A deployed crowdsale of the same contract
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    TimedCrowdsale(crowdsale).initialize(_openingTime, _closingTime, _rate, _wallet, _token)
+
+    return crowdsale
+
+@public
+def createIncreasingPriceCrowdsale(_template: address, _openingTime: timestamp, _closingTime: timestamp, _wallet: address, _token: address, _initialRate: uint256, _finalRate: uint256) -> address:
+    """
+    @dev Creates an IncreasingPriceCrowdsale.
+    @param _template A deployed IncreasingPriceCrowdsale
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    IncreasingPriceCrowdsale(crowdsale).initialize(_openingTime, _closingTime, _wallet, _token, _initialRate, _finalRate)
+
+    return crowdsale
+
+@public
+def createTieredPriceCrowdsale(_template: address, _closingTime: timestamp, _wallet: address, _token: address, _tierCount: int128, _tierStartTimes: timestamp[32], _tierRates: uint256[32]) -> address:
+    """
+    @dev Creates a TieredPriceCrowdsale.
+    @param _template A deployed TieredPriceCrowdsale
+    @return The address of the new crowdsale
+    """
+
+    crowdsale: address = self.createProxy(_template, msg.sender)
+    TieredPriceCrowdsale(crowdsale).initialize(_closingTime, _wallet, _token, _tierCount, _tierStartTimes, _tierRates)
+
+    return crowdsale
@@ -0,0 +1,87 @@
+# CrowdsaleReader
+# This file is released under Apache 2.0 license.
+# @dev Reads the state of up to 50 crowdsales of any contract in one call,
+# for dashboards which would otherwise call every getter of every sale.
+# A call to a getter a sale does not have reverts the whole read, so the
+# caller tells which getters each sale has, see scripts/reader.py.
+
+
+#@dev Getters of the crowdsale contracts, each sale has some of them.
+contract Crowdsale:
+    def weiRaised() -> uint256: constant
+    def rate() -> uint256: constant
+    def getCurrentRate() -> uint256: constant
+    def cap() -> uint256: constant
+    def capReached() -> bool: constant
+    def openingTime() -> uint256: constant
+    def closingTime() -> uint256: constant
+    def hasClosed() -> bool: constant
+    def getRemainingTokens() -> uint256: constant
+
+#Getters to call, combined with bitwise_or for each sale.
+WEI_RAISED: constant(uint256) = 1
+#rate() of sales with a fixed rate.
+RATE: constant(uint256) = 2
+#getCurrentRate() of IncreasingPriceCrowdsale and TieredPriceCrowdsale, in the rate column.
+CURRENT_RATE: constant(uint256) = 4
+#cap() and capReached()
+CAP: constant(uint256) = 8
+#openingTime(), closingTime() and hasClosed()
+TIMES: constant(uint256) = 16
+#getRemainingTokens()
+REMAINING_TOKENS: constant(uint256) = 32
+
+#Columns of each sale in the result, in this order: weiRaised, rate, cap,
+#capReached, openingTime, closingTime, hasClosed and getRemainingTokens.
+COLUMNS: constant(int128) = 8
+
+
+@public
+@constant
+def getStatuses(_count: int128, _sales: address[50], _fields: uint256[50]) -> uint256[400]:
+    """
+    @dev Reads the state of a list of crowdsales.
+    @param _count The count of crowdsales in this list. Should be less than or equal to 50.
+    @param _sales List of crowdsale addresses
+    @param _fields List of the getters to call on each crowdsale
+    @return 8 columns per crowdsale, zero for getters not called and booleans as 0 or 1
+    """
+
+    assert _count <= 50, "Too many crowdsales supplied."
+
+    statuses: uint256[400]
+
+    for i in range(50):
+        if i >= _count:
+            break
+
+        sale: address = _sales[i]
+        fields: uint256 = _fields[i]
+        column: int128 = i * COLUMNS
+
+        if bitwise_and(fields, WEI_RAISED) != 0:
+            statuses[column] = Crowdsale(sale).weiRaised()
+
+        if bitwise_and(fields, RATE) != 0:
+            statuses[column + 1] = Crowdsale(sale).rate()
+
+        if bitwise_and(fields, CURRENT_RATE) != 0:
+            statuses[column + 1] = Crowdsale(sale).getCurrentRate()
+
+        if bitwise_and(fields, CAP) != 0:
+            statuses[column + 2] = Crowdsale(sale).cap()
+
+            if Crowdsale(sale).capReached():
+                statuses[column + 3] = 1
+
+        if bitwise_and(fields, TIMES) != 0:
+            statuses[column + 4] = Crowdsale(sale).openingTime()
+            statuses[column + 5] = Crowdsale(sale).closingTime()
+
+            if Crowdsale(sale).hasClosed():
+                statuses[column + 6] = 1
+
+        if bitwise_and(fields, REMAINING_TOKENS) != 0:
+            statuses[column + 7] = Crowdsale(sale).getRemainingTokens()
+
+    return statuses
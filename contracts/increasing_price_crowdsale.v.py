@@ -23,25 +23,59 @@ contract TokenContract:
 TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(address), _value: uint256(wei), _amount: uint256})
 
 #IncreasingPriceCrowdsale
-initialRate: public(uint256)
-finalRate: public(uint256)
+# The largest initial rate which fits above the slope in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
+
+# The longest crowdsale period for which the slope gives exact rates (2 ** 32 - 1 seconds).
+MAX_PERIOD: constant(uint256) = 4294967295
+
+# The initial rate in the upper 96 bits and, in the lower 160 bits, the decrease
+# of the rate per second as a fixed point number with 64 fractional bits.
+# The slope is computed once in the constructor so that a purchase reads a single word
+# and multiplies, instead of reading four values and dividing.
+initialRateAndSlope: uint256
 
 #Timed Crowdsale
-openingTime: public(timestamp)
-closingTime: public(timestamp)
+# The opening time in the upper 128 bits and the closing time in the lower 128 bits,
+# packed in one storage word because every purchase checks both.
+openingAndClosingTime: uint256
 
 #Crowdsale
 # The token being sold
 token: public(address)
 
-#Address where funds are collected
-wallet: public(address)
+# Address where funds are collected in the upper 160 bits, and in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet.
+walletAndSettlement: uint256
 
 #Amount of wei raised
 weiRaised: public(uint256(wei))
 
 
 #IncreasingPriceCrowdsale
+@public
+@constant
+def getRateAt(_time: timestamp) -> uint256:
+    """
+    @dev Returns the rate of tokens per wei at any time, e.g. to draw the price curve.
+    @param _time The time, which is clamped to the crowdsale period
+    @return The number of tokens a buyer gets per wei at the given time
+    """
+
+    period: uint256 = self.openingAndClosingTime
+    rates: uint256 = self.initialRateAndSlope
+    openingTime: uint256 = shift(period, -128)
+    closingTime: uint256 = shift(shift(period, 128), -128)
+    time: uint256 = as_unitless_number(_time)
+
+    if time < openingTime:
+        time = openingTime
+
+    if time > closingTime:
+        time = closingTime
+
+    return shift(rates, -160) - shift((time - openingTime) * shift(shift(rates, 96), -96), -64)
+
 @public
 @constant
 def getCurrentRate() -> uint256:
@@ -51,16 +85,37 @@ def getCurrentRate() -> uint256:
     @return The number of tokens a buyer gets per wei at a given time
     """
 
-    elapsedTime: timedelta = block.timestamp - self.openingTime
-    timeRange: timedelta = self.closingTime - self.openingTime
-    rateRange: uint256 = self.initialRate - self.finalRate
-    return self.initialRate - (elapsedTime * rateRange / timeRange)
+    return self.getRateAt(block.timestamp)
+
+@public
+@constant
+def initialRate() -> uint256:
+    return shift(self.initialRateAndSlope, -160)
+
+@public
+@constant
+def finalRate() -> uint256:
+    period: uint256 = self.openingAndClosingTime
+    rates: uint256 = self.initialRateAndSlope
+    timeRange: uint256 = shift(shift(period, 128), -128) - shift(period, -128)
+
+    return shift(rates, -160) - shift(timeRange * shift(shift(rates, 96), -96), -64)
 
 #Timed Crowdsale
 @public
 @constant
 def hasClosed() -> bool:
-    return block.timestamp > self.closingTime
+    return as_unitless_number(block.timestamp) > shift(shift(self.openingAndClosingTime, 128), -128)
+
+@public
+@constant
+def openingTime() -> uint256:
+    return shift(self.openingAndClosingTime, -128)
+
+@public
+@constant
+def closingTime() -> uint256:
+    return shift(shift(self.openingAndClosingTime, 128), -128)
 
 #Crowdsale
 @public
@@ -77,34 +132,89 @@ def __init__(_openingTime: timestamp, _closingTime: timestamp, _wallet: address,
 
     assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."
     assert _closingTime >= _openingTime, "The closing time cannot be before opening time."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert as_unitless_number(_closingTime - _openingTime) <= MAX_PERIOD, "The crowdsale period is too long."
     assert _initialRate >= _finalRate, "The initial rate must be greater than final rate."
+    assert _initialRate <= MAX_RATE, "Invalid value supplied for the parameter \"_initialRate\"."
     assert _finalRate > 0, "The final rate "
 
-    self.openingTime = _openingTime
-    self.closingTime = _closingTime
-    self.wallet = _wallet
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
     self.token = _token
-    self.initialRate = _initialRate
-    self.finalRate = _finalRate
 
-@private
+    #The slope is rounded up, which makes every rate equal to
+    #initialRate - elapsedTime * (initialRate - finalRate) / timeRange rounded down.
+    timeRange: uint256 = as_unitless_number(_closingTime - _openingTime)
+    slope: uint256 = 0
+
+    if timeRange > 0:
+        slope = (shift(_initialRate - _finalRate, 64) + timeRange - 1) / timeRange
+
+    self.initialRateAndSlope = bitwise_or(shift(_initialRate, 160), slope)
+
+@public
+def initialize(_openingTime: timestamp, _closingTime: timestamp, _wallet: address, _token: address, _initialRate: uint256, _finalRate: uint256):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _openingTime Crowdsale opening time
+    @param _closingTime Crowdsale closing time
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _initialRate Number of tokens a buyer gets per wei at the start of the crowdsale
+    @param _finalRate Number of tokens a buyer gets per wei at the end of the crowdsale
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."
+    assert _closingTime >= _openingTime, "The closing time cannot be before opening time."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert as_unitless_number(_closingTime - _openingTime) <= MAX_PERIOD, "The crowdsale period is too long."
+    assert _initialRate >= _finalRate, "The initial rate must be greater than final rate."
+    assert _initialRate <= MAX_RATE, "Invalid value supplied for the parameter \"_initialRate\"."
+    assert _finalRate > 0, "The final rate "
+
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.token = _token
+
+    #The slope is rounded up, which makes every rate equal to
+    #initialRate - elapsedTime * (initialRate - finalRate) / timeRange rounded down.
+    timeRange: uint256 = as_unitless_number(_closingTime - _openingTime)
+    slope: uint256 = 0
+
+    if timeRange > 0:
+        slope = (shift(_initialRate - _finalRate, 64) + timeRange - 1) / timeRange
+
+    self.initialRateAndSlope = bitwise_or(shift(_initialRate, 160), slope)
+
+@public
+@constant
+def wallet() -> address:
+    return convert(convert(shift(self.walletAndSettlement, -96), bytes32), address)
+
+@public
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    currentRate: uint256 = self.getCurrentRate()
-    return currentRate * _weiAmount
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
 
 @private
 def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
-    assert block.timestamp >= self.openingTime, "Sorry but the crowdsale has not yet begun."
-    assert block.timestamp <= self.closingTime, "Sorry but the crowdsale was already concluded."
+    period: uint256 = self.openingAndClosingTime
+    assert as_unitless_number(block.timestamp) >= shift(period, -128), "Sorry but the crowdsale has not yet begun."
+    assert as_unitless_number(block.timestamp) <= shift(shift(period, 128), -128), "Sorry but the crowdsale was already concluded."
 
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
+    rates: uint256 = self.initialRateAndSlope
+    elapsedTime: uint256 = as_unitless_number(block.timestamp) - shift(period, -128)
+    rate: uint256 = shift(rates, -160) - shift(elapsedTime * shift(shift(rates, 96), -96), -64)
+    tokens: uint256 = as_unitless_number(_weiAmount) * rate
     
     self.weiRaised += _weiAmount
 
@@ -113,10 +223,38 @@ def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint
     log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
 
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), _weiAmount)
 
     #post validate
 
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    wallet: uint256 = shift(self.walletAndSettlement, -96)
+    assert msg.sender == convert(convert(wallet, bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(shift(wallet, 96), 1)
+    else:
+        self.walletAndSettlement = shift(wallet, 96)
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
 @public
 @payable
 def buyTokens(_beneficiary: address):
@@ -16,6 +16,9 @@ contract TokenContract:
 OwnershipRenounced: event({_previousOwner: indexed(address)})
 OwnershipTransferred: event({_previousOwner: indexed(address), _newOwner: indexed(address)})
 
+#Individually Capped Crowdsale
+CapsRootChanged: event({_root: bytes32})
+
 #Crowdsale
 
 # Event for token purchase logging
@@ -26,25 +29,36 @@ OwnershipTransferred: event({_previousOwner: indexed(address), _newOwner: indexe
 TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(address), _value: uint256(wei), _amount: uint256})
 
 #Individually Capped Crowdsale
-contributions: public(map(address, uint256))
-caps: public(map(address, uint256))
+# The contribution of each user in the upper 127 bits and their cap in the lower 128 bits,
+# packed in one storage word because every purchase checks the cap and updates the contribution.
+# Bit 128 is set once the cap was set by the owner or verified with a proof, so that
+# a cap revoked by setting it to zero is not restored from the Merkle tree.
+contributionsAndCaps: map(address, uint256)
+
+# Root of a Merkle tree of (address, cap) pairs, see scripts/merkle.py.
+# Each leaf is keccak256 of the address and the cap, both padded to 32 bytes.
+capsRoot: public(bytes32)
 
 
 #Ownable
 owner: public(address)
 
 #Crowdsale
-# The token being sold
-token: public(address)
-
-#Address where funds are collected
-wallet: public(address)
+# The largest rate which fits below an address in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
 
+# The token being sold in the upper 160 bits and the rate in the lower 96 bits,
+# packed in one storage word because every purchase reads both.
 # How many token units a buyer gets per wei.
 # The rate is the conversion between wei and the smallest and indivisible token unit.
 # So, if you are using a rate of 1 with a DetailedERC20 token with 3 decimals called TOK
 # 1 wei will give you 1 unit, or 0.001 TOK.
-rate: public(uint256)
+tokenAndRate: uint256
+
+# Address where funds are collected in the upper 160 bits, in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet,
+# and in the next bit whether purchases exceeding a user's cap are filled partially.
+walletAndSettlement: uint256
 
 #Amount of wei raised
 weiRaised: public(uint256(wei))
@@ -91,7 +105,11 @@ def setUserCap(_beneficiary: address, _cap: uint256):
     """
 
     assert msg.sender == self.owner, "Access is denied."
-    self.caps[_beneficiary] = _cap
+    assert shift(_cap, -128) == 0, "Invalid cap."
+
+    #the upper 128 bits hold the contribution and, in their lowest bit, whether the cap was set.
+    contributionAndCapSet: uint256 = shift(self.contributionsAndCaps[_beneficiary], -128)
+    self.contributionsAndCaps[_beneficiary] = bitwise_or(shift(bitwise_or(contributionAndCapSet, 1), 128), _cap)
 
 @public
 def setGroupCap(_totalItems: int128, _beneficiaries: address[50], _cap: uint256):
@@ -103,12 +121,81 @@ def setGroupCap(_totalItems: int128, _beneficiaries: address[50], _cap: uint256)
     """
 
     assert msg.sender == self.owner, "Access is denied."
+    assert shift(_cap, -128) == 0, "Invalid cap."
 
     for i in range(50):
         if(i >= _totalItems):
             break
-        self.caps[_beneficiaries[i]] = _cap
+        contributionAndCapSet: uint256 = shift(self.contributionsAndCaps[_beneficiaries[i]], -128)
+        self.contributionsAndCaps[_beneficiaries[i]] = bitwise_or(shift(bitwise_or(contributionAndCapSet, 1), 128), _cap)
+
+@public
+def setGroupCapBulk(_beneficiaries: bytes[16000], _cap: uint256):
+    """
+    @dev Sets the maximum contribution of up to 500 users, paying only for the addresses supplied.
+    @param _beneficiaries The addresses to be capped, each left-padded to 32 bytes and concatenated
+    @param _cap Wei limit for individual contribution
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert len(_beneficiaries) % 32 == 0, "Invalid address list supplied."
+    assert shift(_cap, -128) == 0, "Invalid cap."
+
+    count: int128 = len(_beneficiaries) / 32
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        beneficiary: address = extract32(_beneficiaries, i * 32, type=address)
+        contributionAndCapSet: uint256 = shift(self.contributionsAndCaps[beneficiary], -128)
+        self.contributionsAndCaps[beneficiary] = bitwise_or(shift(bitwise_or(contributionAndCapSet, 1), 128), _cap)
+
+
+@public
+def setCapsRoot(_root: bytes32):
+    """
+    @dev Sets the maximum contribution of every user of a Merkle tree at once.
+    A user's cap is verified and stored on their first purchase with buyTokensWithCapProof.
+    @param _root The root of the tree, or zero to disable proofs
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    self.capsRoot = _root
+    log.CapsRootChanged(_root)
+
+@private
+@constant
+def hashPair(_a: bytes32, _b: bytes32) -> bytes32:
+    #pairs are hashed in ascending order
+    if convert(_a, uint256) <= convert(_b, uint256):
+        return keccak256(concat(_a, _b))
+
+    return keccak256(concat(_b, _a))
+
+@public
+@constant
+def checkCapProof(_beneficiary: address, _cap: uint256, _proof: bytes32[20], _proofLength: int128) -> bool:
+    """
+    @dev Checks whether a user's cap is in the Merkle tree of caps.
+    @param _beneficiary Address of the user
+    @param _cap Wei limit for the user's contribution
+    @param _proof The sibling hashes from the leaf up to the root, padded to 20 items
+    @param _proofLength The number of hashes in the proof
+    """
+
+    if self.capsRoot == EMPTY_BYTES32:
+        return False
+
+    computed: bytes32 = keccak256(concat(convert(_beneficiary, bytes32), convert(_cap, bytes32)))
+
+    for i in range(20):
+        if i >= _proofLength:
+            break
+
+        computed = self.hashPair(computed, _proof[i])
 
+    return computed == self.capsRoot
 
 @public
 @constant
@@ -119,7 +206,7 @@ def getUserCap(_beneficiary: address) -> uint256:
     @return Current cap for individual user
     """
 
-    return self.caps[_beneficiary]
+    return shift(shift(self.contributionsAndCaps[_beneficiary], 128), -128)
 
 @public
 @constant
@@ -130,7 +217,80 @@ def getUserContribution(_beneficiary: address) -> uint256:
     @return User contribution so far
     """
 
-    return self.contributions[_beneficiary]
+    return shift(self.contributionsAndCaps[_beneficiary], -129)
+
+@public
+@constant
+def remainingUserCap(_beneficiary: address) -> uint256:
+    """
+    @dev Returns how much a specific user can still contribute.
+    @param _beneficiary Address of the user
+    @return The cap of the user less their contribution so far
+    """
+
+    state: uint256 = self.contributionsAndCaps[_beneficiary]
+    cap: uint256 = shift(shift(state, 128), -128)
+    contribution: uint256 = shift(state, -129)
+
+    #a cap lowered below the contribution leaves nothing to contribute.
+    if contribution >= cap:
+        return 0
+
+    return cap - contribution
+
+@public
+@constant
+def getUserCapsBulk(_beneficiaries: bytes[16000]) -> uint256[500]:
+    """
+    @dev Returns the caps of up to 500 users in one call.
+    @param _beneficiaries The addresses, each left-padded to 32 bytes and concatenated
+    @return The cap of each user in the order supplied, followed by zeros
+    """
+
+    assert len(_beneficiaries) % 32 == 0, "Invalid address list supplied."
+
+    count: int128 = len(_beneficiaries) / 32
+    result: uint256[500]
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        result[i] = shift(shift(self.contributionsAndCaps[extract32(_beneficiaries, i * 32, type=address)], 128), -128)
+
+    return result
+
+@public
+@constant
+def getUserContributionsBulk(_beneficiaries: bytes[16000]) -> uint256[500]:
+    """
+    @dev Returns the amounts contributed so far by up to 500 users in one call.
+    @param _beneficiaries The addresses, each left-padded to 32 bytes and concatenated
+    @return The contribution of each user in the order supplied, followed by zeros
+    """
+
+    assert len(_beneficiaries) % 32 == 0, "Invalid address list supplied."
+
+    count: int128 = len(_beneficiaries) / 32
+    result: uint256[500]
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        result[i] = shift(self.contributionsAndCaps[extract32(_beneficiaries, i * 32, type=address)], -129)
+
+    return result
+
+@public
+@constant
+def caps(_beneficiary: address) -> uint256:
+    return shift(shift(self.contributionsAndCaps[_beneficiary], 128), -128)
+
+@public
+@constant
+def contributions(_beneficiary: address) -> uint256:
+    return shift(self.contributionsAndCaps[_beneficiary], -129)
 
 #Crowdsale
 @public
@@ -145,16 +305,62 @@ def __init__(_rate: uint256, _wallet: address, _token: address):
     assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
 
-    self.rate = _rate
-    self.wallet = _wallet
-    self.token = _token
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
     self.owner = msg.sender
 
+@public
+def initialize(_rate: uint256, _wallet: address, _token: address, _owner: address):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _rate Number of token units a buyer gets per wei
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _owner Address of the owner of the crowdsale
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
+    assert _owner != ZERO_ADDRESS, "Invalid owner supplied."
+
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.owner = _owner
+
 @private
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    return _weiAmount * self.rate
+def unpackAddress(_word: uint256) -> address:
+    return convert(convert(shift(_word, -96), bytes32), address)
+
+@public
+@constant
+def token() -> address:
+    return self.unpackAddress(self.tokenAndRate)
+
+@public
+@constant
+def rate() -> uint256:
+    return bitwise_and(self.tokenAndRate, MAX_RATE)
+
+@public
+@constant
+def wallet() -> address:
+    return self.unpackAddress(self.walletAndSettlement)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
+
+@public
+@constant
+def partialFills() -> bool:
+    return bitwise_and(self.walletAndSettlement, 2) == 2
 
 
 @private
@@ -162,28 +368,118 @@ def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
-    assert self.contributions[_beneficiary] + as_unitless_number(_weiAmount) \
-        <= self.caps[_beneficiary], "Maximum user funding cap exceeded."
+    state: uint256 = self.contributionsAndCaps[_beneficiary]
+    settlement: uint256 = self.walletAndSettlement
+    contribution: uint256 = shift(state, -129)
+    cap: uint256 = shift(shift(state, 128), -128)
+    amount: uint256 = as_unitless_number(_weiAmount)
+    refund: uint256
+
+    if contribution + amount > cap:
+        #with partial fills, the rest of the user's cap is sold and the excess refunded.
+        assert bitwise_and(settlement, 2) == 2, "Maximum user funding cap exceeded."
+        assert contribution < cap, "Maximum user funding cap exceeded."
+        refund = contribution + amount - cap
+        amount = cap - contribution
+
+    config: uint256 = self.tokenAndRate
 
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
+    tokens: uint256 = amount * bitwise_and(config, MAX_RATE)
     
-    self.weiRaised += _weiAmount
+    self.weiRaised += as_wei_value(amount, "wei")
+    self.contributionsAndCaps[_beneficiary] = state + shift(amount, 129)
 
     #process purchase
-    assert TokenContract(self.token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
-    log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
+    assert TokenContract(convert(convert(shift(config, -96), bytes32), address)).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
+    log.TokenPurchase(_sender, _beneficiary, as_wei_value(amount, "wei"), tokens)
 
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), as_wei_value(amount, "wei"))
+
+    if refund > 0:
+        send(_sender, as_wei_value(refund, "wei"))
+
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    settlement: uint256 = self.walletAndSettlement
+    assert msg.sender == convert(convert(shift(settlement, -96), bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(settlement, 1)
+    else:
+        self.walletAndSettlement = bitwise_xor(settlement, bitwise_and(settlement, 1))
+
+@public
+def setPartialFills(_enabled: bool):
+    """
+    @dev Lets a purchase which exceeds the beneficiary's cap buy the rest of the cap instead of failing.
+    The excess of such a purchase is refunded to the sender in the same transaction.
+    @param _enabled True to fill purchases partially, false to reject purchases which exceed a cap
+    """
+
+    settlement: uint256 = self.walletAndSettlement
+    assert msg.sender == convert(convert(shift(settlement, -96), bytes32), address), "Access is denied."
+
+    if _enabled:
+        self.walletAndSettlement = bitwise_or(settlement, 2)
+    else:
+        self.walletAndSettlement = bitwise_xor(settlement, bitwise_and(settlement, 2))
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
 
-    self.contributions[_beneficiary] += as_unitless_number(_weiAmount)
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
 
 @public
 @payable
 def buyTokens(_beneficiary: address):
     self.processTransaction(msg.sender, _beneficiary, msg.value)
 
+@public
+@payable
+def buyTokensWithCapProof(_beneficiary: address, _cap: uint256, _proof: bytes32[20], _proofLength: int128):
+    """
+    @dev Purchases tokens for a beneficiary whose cap is in the Merkle tree of caps.
+    The cap is stored on the first purchase, later purchases do not verify the proof again
+    and can also use buyTokens. A cap set by the owner takes precedence over the tree.
+    @param _beneficiary Address receiving the tokens
+    @param _cap Wei limit for the beneficiary's contribution
+    @param _proof The sibling hashes from the leaf up to the root, padded to 20 items
+    @param _proofLength The number of hashes in the proof
+    """
+
+    if bitwise_and(shift(self.contributionsAndCaps[_beneficiary], -128), 1) == 0:
+        assert self.capsRoot != EMPTY_BYTES32, "Maximum user funding cap exceeded."
+
+        #Vyper cannot pass lists to private functions, so the proof is verified here.
+        computed: bytes32 = keccak256(concat(convert(_beneficiary, bytes32), convert(_cap, bytes32)))
+
+        for i in range(20):
+            if i >= _proofLength:
+                break
+
+            computed = self.hashPair(computed, _proof[i])
+
+        assert computed == self.capsRoot, "Invalid cap proof."
+        assert shift(_cap, -128) == 0, "Invalid cap."
+
+        contributionAndCapSet: uint256 = shift(self.contributionsAndCaps[_beneficiary], -128)
+        self.contributionsAndCaps[_beneficiary] = bitwise_or(shift(bitwise_or(contributionAndCapSet, 1), 128), _cap)
+
+    self.processTransaction(msg.sender, _beneficiary, msg.value)
+
 @public
 @payable
 def __default__():
@@ -227,3 +227,35 @@ def mint(_to: address, _amount: uint256) -> bool:
     log.Transfer(ZERO_ADDRESS, _to, _amount)
 
     return True
+
+@public
+def mintBatch(_count: int128, _recipients: address[50], _amounts: uint256[50]) -> bool:
+    """
+    @notice Function to mint tokens for a group of recipients.
+    The permissions and the maximum supply are checked once for the whole group.
+    @param _count The count of recipients in this group. Should be less than or equal to 50.
+    @param _recipients The addresses that will receive the minted tokens.
+    @param _amounts The amounts of tokens to mint for each recipient.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert not self.mintingFinished, "Minting cannot be performed anymore."
+    assert _count <= 50, "Too many recipients supplied."
+
+    total: uint256
+
+    for i in range(50):
+        if i >= _count:
+            break
+
+        total += _amounts[i]
+        self.balances[_recipients[i]] += _amounts[i]
+
+        log.Mint(_recipients[i], _amounts[i])
+        log.Transfer(ZERO_ADDRESS, _recipients[i], _amounts[i])
+
+    assert self.totalSupply + total <= self.maximumSupply, "You cannot print those many tokens."
+    self.totalSupply += total
+
+    return True
@@ -24,21 +24,25 @@ TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(addres
 balances: public(map(address, uint256))
 
 #Timed Crowdsale
-openingTime: public(timestamp)
-closingTime: public(timestamp)
+# The opening time in the upper 128 bits and the closing time in the lower 128 bits,
+# packed in one storage word because every purchase checks both.
+openingAndClosingTime: uint256
 
 #Crowdsale
-# The token being sold
-token: public(address)
-
-#Address where funds are collected
-wallet: public(address)
+# The largest rate which fits below an address in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
 
+# The token being sold in the upper 160 bits and the rate in the lower 96 bits,
+# packed in one storage word because every purchase reads both.
 # How many token units a buyer gets per wei.
 # The rate is the conversion between wei and the smallest and indivisible token unit.
 # So, if you are using a rate of 1 with a DetailedERC20 token with 3 decimals called TOK
 # 1 wei will give you 1 unit, or 0.001 TOK.
-rate: public(uint256)
+tokenAndRate: uint256
+
+# Address where funds are collected in the upper 160 bits, and in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet.
+walletAndSettlement: uint256
 
 #Amount of wei raised
 weiRaised: public(uint256(wei))
@@ -53,17 +57,83 @@ def hasClosed() -> bool:
     @return Whether crowdsale period has elapsed
     """
 
-    return block.timestamp > self.closingTime
+    return as_unitless_number(block.timestamp) > shift(shift(self.openingAndClosingTime, 128), -128)
+
+@public
+@constant
+def openingTime() -> uint256:
+    return shift(self.openingAndClosingTime, -128)
+
+@public
+@constant
+def closingTime() -> uint256:
+    return shift(shift(self.openingAndClosingTime, 128), -128)
 
 #PostDeliveryCrowdsale
+@public
+@constant
+def getBalancesBulk(_beneficiaries: bytes[16000]) -> uint256[500]:
+    """
+    @dev Returns the tokens waiting for delivery to up to 500 beneficiaries in one call.
+    @param _beneficiaries The addresses, each left-padded to 32 bytes and concatenated
+    @return The balance of each beneficiary in the order supplied, followed by zeros
+    """
+
+    assert len(_beneficiaries) % 32 == 0, "Invalid address list supplied."
+
+    count: int128 = len(_beneficiaries) / 32
+    result: uint256[500]
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        result[i] = self.balances[extract32(_beneficiaries, i * 32, type=address)]
+
+    return result
+
 @public
 def withdrawTokens():
-    assert self.hasClosed(), "You cannot withdraw tokens until the crowdsale has closed."
+    assert as_unitless_number(block.timestamp) > shift(shift(self.openingAndClosingTime, 128), -128), "You cannot withdraw tokens until the crowdsale has closed."
     amount: uint256 = self.balances[msg.sender]
     assert amount > 0, "Nothing to withdraw."
 
     self.balances[msg.sender] = 0
-    assert TokenContract(self.token).transfer(msg.sender, amount), "Could not withdraw tokens due to an unknown error."
+    assert TokenContract(convert(convert(shift(self.tokenAndRate, -96), bytes32), address)).transfer(msg.sender, amount), "Could not withdraw tokens due to an unknown error."
+
+@public
+def distributeTokens(_count: int128, _beneficiaries: address[50]):
+    """
+    @dev Delivers the tokens of a group of beneficiaries after the crowdsale has closed,
+    so that they do not need to withdraw them. Anyone can call this function.
+    Beneficiaries without a balance, e.g. who have already withdrawn, are skipped.
+    @param _count The count of beneficiaries in this group. Should be less than or equal to 50.
+    @param _beneficiaries List of addresses receiving their tokens
+    """
+
+    assert _count <= 50, "Too many beneficiaries supplied."
+    assert as_unitless_number(block.timestamp) > shift(shift(self.openingAndClosingTime, 128), -128), "You cannot distribute tokens until the crowdsale has closed."
+
+    token: address = convert(convert(shift(self.tokenAndRate, -96), bytes32), address)
+    delivered: bool = True
+
+    for i in range(50):
+        if i >= _count:
+            break
+
+        beneficiary: address = _beneficiaries[i]
+        amount: uint256 = self.balances[beneficiary]
+
+        if amount == 0:
+            continue
+
+        self.balances[beneficiary] = 0
+
+        #A reason string cannot be given to an assertion inside a loop.
+        if not TokenContract(token).transfer(beneficiary, amount):
+            delivered = False
+
+    assert delivered, "Could not distribute tokens due to an unknown error."
 
 #Crowdsale
 @public
@@ -79,49 +149,167 @@ def __init__( _openingTime: timestamp, _closingTime: timestamp, _rate: uint256,
 
     assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."
     assert _closingTime >= _openingTime, "The closing time cannot be before opening time."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
     assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
 
-    self.openingTime = _openingTime
-    self.closingTime = _closingTime
-    self.rate = _rate
-    self.wallet = _wallet
-    self.token = _token
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+
+@public
+def initialize(_openingTime: timestamp, _closingTime: timestamp, _rate: uint256, _wallet: address, _token: address):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _openingTime Crowdsale opening time
+    @param _closingTime Crowdsale closing time
+    @param _rate Number of token units a buyer gets per wei
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."
+    assert _closingTime >= _openingTime, "The closing time cannot be before opening time."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
+    assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
+
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
 
 @private
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    return _weiAmount * self.rate
+def unpackAddress(_word: uint256) -> address:
+    return convert(convert(shift(_word, -96), bytes32), address)
+
+@public
+@constant
+def token() -> address:
+    return self.unpackAddress(self.tokenAndRate)
+
+@public
+@constant
+def rate() -> uint256:
+    return bitwise_and(self.tokenAndRate, MAX_RATE)
+
+@public
+@constant
+def wallet() -> address:
+    return self.unpackAddress(self.walletAndSettlement)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
 
 
 @private
-def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
+def processPurchase(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
-    assert block.timestamp >= self.openingTime, "Sorry but the crowdsale has not yet begun."
-    assert block.timestamp <= self.closingTime, "Sorry but the crowdsale was already concluded."
+
+    config: uint256 = self.tokenAndRate
 
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
-    
-    self.weiRaised += _weiAmount
+    tokens: uint256 = as_unitless_number(_weiAmount) * bitwise_and(config, MAX_RATE)
 
     #process purchase
     self.balances[_beneficiary] += tokens
     log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
 
+@private
+def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
+    #pre validate
+    period: uint256 = self.openingAndClosingTime
+    assert as_unitless_number(block.timestamp) >= shift(period, -128), "Sorry but the crowdsale has not yet begun."
+    assert as_unitless_number(block.timestamp) <= shift(shift(period, 128), -128), "Sorry but the crowdsale was already concluded."
+
+    self.processPurchase(_sender, _beneficiary, _weiAmount)
+
+    self.weiRaised += _weiAmount
+
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), _weiAmount)
 
     #post validate
 
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    wallet: uint256 = shift(self.walletAndSettlement, -96)
+    assert msg.sender == convert(convert(wallet, bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(shift(wallet, 96), 1)
+    else:
+        self.walletAndSettlement = shift(wallet, 96)
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
 @public
 @payable
 def buyTokens(_beneficiary: address):
     self.processTransaction(msg.sender, _beneficiary, msg.value)
 
+@public
+@payable
+def buyTokensBatch(_count: int128, _beneficiaries: address[50], _amounts: uint256(wei)[50]):
+    """
+    @dev Purchases tokens for a group of beneficiaries in a single transaction.
+    The funds are forwarded to the wallet once for the whole batch.
+    @param _count The count of beneficiaries in this batch. Should be less than or equal to 50.
+    @param _beneficiaries List of addresses receiving the tokens
+    @param _amounts List of wei amounts paid for each beneficiary
+    """
+
+    assert _count > 0, "No beneficiaries supplied."
+    assert _count <= 50, "Too many beneficiaries supplied."
+
+    period: uint256 = self.openingAndClosingTime
+    assert as_unitless_number(block.timestamp) >= shift(period, -128), "Sorry but the crowdsale has not yet begun."
+    assert as_unitless_number(block.timestamp) <= shift(shift(period, 128), -128), "Sorry but the crowdsale was already concluded."
+
+    total: uint256(wei)
+
+    for i in range(50):
+        if i >= _count:
+            break
+
+        self.processPurchase(msg.sender, _beneficiaries[i], _amounts[i])
+        total += _amounts[i]
+
+    assert total == msg.value, "The amount received does not match the sum of amounts."
+
+    self.weiRaised += msg.value
+
+    #forward funds to the receiving wallet address.
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), msg.value)
+
 @public
 @payable
 def __default__():
@@ -0,0 +1,308 @@
+# TieredPriceCrowdsale
+# Contributors: Binod Nirvan
+# This file is released under Apache 2.0 license.
+# @dev Extension of Crowdsale contract that changes the price of tokens in discrete tiers.
+# Each tier has a start time and a rate, that is, the amount of tokens per wei contributed.
+# The first tier starts at the opening time and each tier lasts until the next one starts.
+
+
+#@dev ERC20/223 Features referenced by this contract
+contract TokenContract:
+    def transfer(_to: address, _value: uint256) -> bool: modifying
+
+# Event for token purchase logging
+# @param _purchaser who paid for the tokens
+# @param _beneficiary who got the tokens
+# @param _value weis paid for purchase
+# @param _amount amount of tokens purchased
+TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(address), _value: uint256(wei), _amount: uint256})
+
+#TieredPriceCrowdsale
+# The start time of each tier in the upper 128 bits and its rate in the lower 128 bits,
+# packed in one storage word so that the search reads one word per step.
+tiers: uint256[32]
+
+# The number of tiers in use, at most 32.
+tierCount: public(int128)
+
+#Timed Crowdsale
+# The opening time in the upper 128 bits and the closing time in the lower 128 bits,
+# packed in one storage word because every purchase checks both.
+openingAndClosingTime: uint256
+
+#Crowdsale
+# The token being sold
+token: public(address)
+
+# Address where funds are collected in the upper 160 bits, and in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet.
+walletAndSettlement: uint256
+
+#Amount of wei raised
+weiRaised: public(uint256(wei))
+
+
+#TieredPriceCrowdsale
+@private
+@constant
+def findTier(_time: uint256) -> uint256:
+    """
+    @dev Finds the last tier which starts at or before a time using binary search,
+    so the cost grows with the logarithm of the tier count. Five steps cover 32 tiers.
+    @param _time The time, not before the opening time
+    @return The packed start time and rate of the tier
+    """
+
+    tier: uint256 = self.tiers[0]
+    low: int128 = 0
+    high: int128 = self.tierCount
+
+    for i in range(5):
+        if high - low <= 1:
+            break
+
+        middle: int128 = (low + high) / 2
+        candidate: uint256 = self.tiers[middle]
+
+        if shift(candidate, -128) <= _time:
+            low = middle
+            tier = candidate
+        else:
+            high = middle
+
+    return tier
+
+@public
+@constant
+def getRateAt(_time: timestamp) -> uint256:
+    """
+    @dev Returns the rate of tokens per wei at any time, e.g. to draw the price curve.
+    @param _time The time, which is clamped to the crowdsale period
+    @return The number of tokens a buyer gets per wei at the given time
+    """
+
+    period: uint256 = self.openingAndClosingTime
+    time: uint256 = as_unitless_number(_time)
+
+    if time > shift(shift(period, 128), -128):
+        time = shift(shift(period, 128), -128)
+
+    return shift(shift(self.findTier(time), 128), -128)
+
+@public
+@constant
+def getCurrentRate() -> uint256:
+    """
+    @dev Returns the rate of tokens per wei at the present time.
+    @return The number of tokens a buyer gets per wei at a given time
+    """
+
+    return self.getRateAt(block.timestamp)
+
+@public
+@constant
+def getTierStartTime(_index: int128) -> uint256:
+    assert _index < self.tierCount, "Invalid tier."
+    return shift(self.tiers[_index], -128)
+
+@public
+@constant
+def getTierRate(_index: int128) -> uint256:
+    assert _index < self.tierCount, "Invalid tier."
+    return shift(shift(self.tiers[_index], 128), -128)
+
+#Timed Crowdsale
+@public
+@constant
+def hasClosed() -> bool:
+    return as_unitless_number(block.timestamp) > shift(shift(self.openingAndClosingTime, 128), -128)
+
+@public
+@constant
+def openingTime() -> uint256:
+    return shift(self.openingAndClosingTime, -128)
+
+@public
+@constant
+def closingTime() -> uint256:
+    return shift(shift(self.openingAndClosingTime, 128), -128)
+
+#Crowdsale
+@public
+def __init__(_closingTime: timestamp, _wallet: address, _token: address, _tierCount: int128, _tierStartTimes: timestamp[32], _tierRates: uint256[32]):
+    """
+    @dev Constructor, takes the start time and the rate of each tier.
+    @param _closingTime Crowdsale closing time
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _tierCount The count of tiers. Should be between 1 and 32.
+    @param _tierStartTimes List of tier start times in ascending order. The first tier starts at the opening time.
+    @param _tierRates List of the number of tokens a buyer gets per wei during each tier
+    """
+
+    assert _tierCount > 0, "No tiers supplied."
+    assert _tierCount <= 32, "Too many tiers supplied."
+    assert _tierStartTimes[0] >= block.timestamp, "The value for opening time cannot be in the past."
+    assert _closingTime >= _tierStartTimes[_tierCount - 1], "The closing time cannot be before the last tier."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+
+    validRates: bool = True
+    ascending: bool = True
+
+    for i in range(32):
+        if i >= _tierCount:
+            break
+
+        if _tierRates[i] == 0 or shift(_tierRates[i], -128) != 0:
+            validRates = False
+
+        if i > 0:
+            if _tierStartTimes[i] <= _tierStartTimes[i - 1]:
+                ascending = False
+
+        self.tiers[i] = bitwise_or(shift(as_unitless_number(_tierStartTimes[i]), 128), _tierRates[i])
+
+    assert validRates, "Invalid value supplied for the parameter \"_tierRates\"."
+    assert ascending, "The tiers must start in ascending order."
+
+    self.tierCount = _tierCount
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_tierStartTimes[0]), 128), as_unitless_number(_closingTime))
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.token = _token
+
+@public
+def initialize(_closingTime: timestamp, _wallet: address, _token: address, _tierCount: int128, _tierStartTimes: timestamp[32], _tierRates: uint256[32]):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _closingTime Crowdsale closing time
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _tierCount The count of tiers. Should be between 1 and 32.
+    @param _tierStartTimes List of tier start times in ascending order. The first tier starts at the opening time.
+    @param _tierRates List of the number of tokens a buyer gets per wei during each tier
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _tierCount > 0, "No tiers supplied."
+    assert _tierCount <= 32, "Too many tiers supplied."
+    assert _tierStartTimes[0] >= block.timestamp, "The value for opening time cannot be in the past."
+    assert _closingTime >= _tierStartTimes[_tierCount - 1], "The closing time cannot be before the last tier."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+
+    validRates: bool = True
+    ascending: bool = True
+
+    for i in range(32):
+        if i >= _tierCount:
+            break
+
+        if _tierRates[i] == 0 or shift(_tierRates[i], -128) != 0:
+            validRates = False
+
+        if i > 0:
+            if _tierStartTimes[i] <= _tierStartTimes[i - 1]:
+                ascending = False
+
+        self.tiers[i] = bitwise_or(shift(as_unitless_number(_tierStartTimes[i]), 128), _tierRates[i])
+
+    assert validRates, "Invalid value supplied for the parameter \"_tierRates\"."
+    assert ascending, "The tiers must start in ascending order."
+
+    self.tierCount = _tierCount
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_tierStartTimes[0]), 128), as_unitless_number(_closingTime))
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.token = _token
+
+@public
+@constant
+def wallet() -> address:
+    return convert(convert(shift(self.walletAndSettlement, -96), bytes32), address)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
+
+@private
+def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
+    #pre validate
+    assert _beneficiary != ZERO_ADDRESS, "Invalid address."
+    assert _weiAmount != 0, "Invalid amount received."
+    period: uint256 = self.openingAndClosingTime
+    assert as_unitless_number(block.timestamp) >= shift(period, -128), "Sorry but the crowdsale has not yet begun."
+    assert as_unitless_number(block.timestamp) <= shift(shift(period, 128), -128), "Sorry but the crowdsale was already concluded."
+
+    #calculate the number of tokens for the Ether contribution.
+    #the search of findTier is inlined to save a call on every purchase.
+    tier: uint256 = self.tiers[0]
+    low: int128 = 0
+    high: int128 = self.tierCount
+
+    for i in range(5):
+        if high - low <= 1:
+            break
+
+        middle: int128 = (low + high) / 2
+        candidate: uint256 = self.tiers[middle]
+
+        if shift(candidate, -128) <= as_unitless_number(block.timestamp):
+            low = middle
+            tier = candidate
+        else:
+            high = middle
+
+    rate: uint256 = shift(shift(tier, 128), -128)
+    tokens: uint256 = as_unitless_number(_weiAmount) * rate
+
+    self.weiRaised += _weiAmount
+
+    #process purchase
+    assert TokenContract(self.token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
+    log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
+
+    #forward funds to the receiving wallet address.
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), _weiAmount)
+
+    #post validate
+
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    wallet: uint256 = shift(self.walletAndSettlement, -96)
+    assert msg.sender == convert(convert(wallet, bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(shift(wallet, 96), 1)
+    else:
+        self.walletAndSettlement = shift(wallet, 96)
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
+@public
+@payable
+def buyTokens(_beneficiary: address):
+    self.processTransaction(msg.sender, _beneficiary, msg.value)
+
+@public
+@payable
+def __default__():
+    self.processTransaction(msg.sender, msg.sender, msg.value)
@@ -21,21 +21,25 @@ contract TokenContract:
 TokenPurchase: event({_purchaser: indexed(address), _beneficiary: indexed(address), _value: uint256(wei), _amount: uint256})
 
 #Timed Crowdsale
-openingTime: public(timestamp)
-closingTime: public(timestamp)
+# The opening time in the upper 128 bits and the closing time in the lower 128 bits,
+# packed in one storage word because every purchase checks both.
+openingAndClosingTime: uint256
 
 #Crowdsale
-# The token being sold
-token: public(address)
-
-#Address where funds are collected
-wallet: public(address)
+# The largest rate which fits below an address in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
 
+# The token being sold in the upper 160 bits and the rate in the lower 96 bits,
+# packed in one storage word because every purchase reads both.
 # How many token units a buyer gets per wei.
 # The rate is the conversion between wei and the smallest and indivisible token unit.
 # So, if you are using a rate of 1 with a DetailedERC20 token with 3 decimals called TOK
 # 1 wei will give you 1 unit, or 0.001 TOK.
-rate: public(uint256)
+tokenAndRate: uint256
+
+# Address where funds are collected in the upper 160 bits, and in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet.
+walletAndSettlement: uint256
 
 #Amount of wei raised
 weiRaised: public(uint256(wei))
@@ -49,7 +53,17 @@ def hasClosed() -> bool:
     @return Whether crowdsale period has elapsed
     """
 
-    return block.timestamp > self.closingTime
+    return as_unitless_number(block.timestamp) > shift(shift(self.openingAndClosingTime, 128), -128)
+
+@public
+@constant
+def openingTime() -> uint256:
+    return shift(self.openingAndClosingTime, -128)
+
+@public
+@constant
+def closingTime() -> uint256:
+    return shift(shift(self.openingAndClosingTime, 128), -128)
 
 #Crowdsale
 @public
@@ -65,20 +79,64 @@ def __init__( _openingTime: timestamp, _closingTime: timestamp, _rate: uint256,
 
     assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."
     assert _closingTime >= _openingTime, "The closing time cannot be before opening time."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
+    assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
+
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+
+@public
+def initialize(_openingTime: timestamp, _closingTime: timestamp, _rate: uint256, _wallet: address, _token: address):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _openingTime Crowdsale opening time
+    @param _closingTime Crowdsale closing time
+    @param _rate Number of token units a buyer gets per wei
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."
+    assert _closingTime >= _openingTime, "The closing time cannot be before opening time."
+    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."
     assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
 
-    self.openingTime = _openingTime
-    self.closingTime = _closingTime
-    self.rate = _rate
-    self.wallet = _wallet
-    self.token = _token
+    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
 
 @private
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    return _weiAmount * self.rate
+def unpackAddress(_word: uint256) -> address:
+    return convert(convert(shift(_word, -96), bytes32), address)
+
+@public
+@constant
+def token() -> address:
+    return self.unpackAddress(self.tokenAndRate)
+
+@public
+@constant
+def rate() -> uint256:
+    return bitwise_and(self.tokenAndRate, MAX_RATE)
+
+@public
+@constant
+def wallet() -> address:
+    return self.unpackAddress(self.walletAndSettlement)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
 
 
 @private
@@ -86,23 +144,54 @@ def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
-    assert block.timestamp >= self.openingTime, "Sorry but the crowdsale has not yet begun."
-    assert block.timestamp <= self.closingTime, "Sorry but the crowdsale was already concluded."
+    period: uint256 = self.openingAndClosingTime
+    assert as_unitless_number(block.timestamp) >= shift(period, -128), "Sorry but the crowdsale has not yet begun."
+    assert as_unitless_number(block.timestamp) <= shift(shift(period, 128), -128), "Sorry but the crowdsale was already concluded."
+
+    config: uint256 = self.tokenAndRate
 
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
+    tokens: uint256 = as_unitless_number(_weiAmount) * bitwise_and(config, MAX_RATE)
     
     self.weiRaised += _weiAmount
 
     #process purchase
-    assert TokenContract(self.token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
+    assert TokenContract(convert(convert(shift(config, -96), bytes32), address)).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
     log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
 
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), _weiAmount)
 
     #post validate
 
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    wallet: uint256 = shift(self.walletAndSettlement, -96)
+    assert msg.sender == convert(convert(wallet, bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(shift(wallet, 96), 1)
+    else:
+        self.walletAndSettlement = shift(wallet, 96)
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
 @public
 @payable
 def buyTokens(_beneficiary: address):
@@ -20,6 +20,7 @@ OwnershipTransferred: event({_previousOwner: indexed(address), _newOwner: indexe
 #WHITELIST
 WhitelistAdded: event({_address: indexed(address)})
 WhitelistRemoved: event({_address: indexed(address)})
+WhitelistRootChanged: event({_root: bytes32})
 
 #Crowdsale
 # Event for token purchase logging
@@ -35,18 +36,25 @@ owner: public(address)
 #WHITELIST
 whitelist: public(map(address, bool))
 
-#Crowdsale
-# The token being sold
-token: public(address)
+# Root of a Merkle tree of whitelisted addresses, see scripts/merkle.py.
+# Each leaf is keccak256 of an address left-padded to 32 bytes.
+whitelistRoot: public(bytes32)
 
-#Address where funds are collected
-wallet: public(address)
+#Crowdsale
+# The largest rate which fits below an address in a storage word (2 ** 96 - 1).
+MAX_RATE: constant(uint256) = 79228162514264337593543950335
 
+# The token being sold in the upper 160 bits and the rate in the lower 96 bits,
+# packed in one storage word because every purchase reads both.
 # How many token units a buyer gets per wei.
 # The rate is the conversion between wei and the smallest and indivisible token unit.
 # So, if you are using a rate of 1 with a DetailedERC20 token with 3 decimals called TOK
 # 1 wei will give you 1 unit, or 0.001 TOK.
-rate: public(uint256)
+tokenAndRate: uint256
+
+# Address where funds are collected in the upper 160 bits, and in the lowest bit
+# whether funds are kept in this contract until withdrawn to the wallet.
+walletAndSettlement: uint256
 
 #Amount of wei raised
 weiRaised: public(uint256(wei))
@@ -90,6 +98,28 @@ def transferOwnership(_newOwner: address):
 def checkIfWhitelisted(_address: address) -> bool:
     return self.whitelist[_address]
 
+@public
+@constant
+def checkIfWhitelistedBulk(_addresses: bytes[16000]) -> bool[500]:
+    """
+    @dev Checks up to 500 addresses against the whitelist in one call.
+    @param _addresses The addresses, each left-padded to 32 bytes and concatenated
+    @return Whether each address is whitelisted in the order supplied, followed by false
+    """
+
+    assert len(_addresses) % 32 == 0, "Invalid address list supplied."
+
+    count: int128 = len(_addresses) / 32
+    result: bool[500]
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        result[i] = self.whitelist[extract32(_addresses, i * 32, type=address)]
+
+    return result
+
 @public
 def addAddressToWhitelist(_address: address):
     assert msg.sender == self.owner, "Access is denied."
@@ -126,6 +156,90 @@ def removeAddressesFromWhitelist(_count: int128, _addresses: address[50]):
         self.whitelist[_addresses[i]] = False
         log.WhitelistRemoved(_addresses[i])
 
+@public
+def addAddressesToWhitelistBulk(_addresses: bytes[16000]):
+    """
+    @dev Whitelists up to 500 addresses, paying only for the addresses supplied.
+    @param _addresses The addresses, each left-padded to 32 bytes and concatenated
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert len(_addresses) % 32 == 0, "Invalid address list supplied."
+
+    count: int128 = len(_addresses) / 32
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        _address: address = extract32(_addresses, i * 32, type=address)
+        self.whitelist[_address] = True
+        log.WhitelistAdded(_address)
+
+@public
+def removeAddressesFromWhitelistBulk(_addresses: bytes[16000]):
+    """
+    @dev Removes up to 500 addresses from the whitelist, paying only for the addresses supplied.
+    @param _addresses The addresses, each left-padded to 32 bytes and concatenated
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert len(_addresses) % 32 == 0, "Invalid address list supplied."
+
+    count: int128 = len(_addresses) / 32
+
+    for i in range(500):
+        if i >= count:
+            break
+
+        _address: address = extract32(_addresses, i * 32, type=address)
+        self.whitelist[_address] = False
+        log.WhitelistRemoved(_address)
+
+
+@public
+def setWhitelistRoot(_root: bytes32):
+    """
+    @dev Whitelists every address of a Merkle tree at once.
+    Investors in the tree buy tokens using buyTokensWithProof.
+    @param _root The root of the tree, or zero to disable proofs
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    self.whitelistRoot = _root
+    log.WhitelistRootChanged(_root)
+
+@private
+@constant
+def hashPair(_a: bytes32, _b: bytes32) -> bytes32:
+    #pairs are hashed in ascending order
+    if convert(_a, uint256) <= convert(_b, uint256):
+        return keccak256(concat(_a, _b))
+
+    return keccak256(concat(_b, _a))
+
+@public
+@constant
+def checkWhitelistProof(_address: address, _proof: bytes32[20], _proofLength: int128) -> bool:
+    """
+    @dev Checks whether an address is in the Merkle tree of whitelisted addresses.
+    @param _address The address to check
+    @param _proof The sibling hashes from the leaf up to the root, padded to 20 items
+    @param _proofLength The number of hashes in the proof
+    """
+
+    if self.whitelistRoot == EMPTY_BYTES32:
+        return False
+
+    computed: bytes32 = keccak256(convert(_address, bytes32))
+
+    for i in range(20):
+        if i >= _proofLength:
+            break
+
+        computed = self.hashPair(computed, _proof[i])
+
+    return computed == self.whitelistRoot
 
 #Crowdsale
 @public
@@ -140,45 +254,139 @@ def __init__(_rate: uint256, _wallet: address, _token: address):
     assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
     assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
     assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
 
-    self.rate = _rate
-    self.wallet = _wallet
-    self.token = _token
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
     self.owner = msg.sender
 
+@public
+def initialize(_rate: uint256, _wallet: address, _token: address, _owner: address):
+    """
+    @dev Initializes a copy of this contract created by crowdsale_factory.v.py, with the checks of __init__.
+    @param _rate Number of token units a buyer gets per wei
+    @param _wallet Address where collected funds will be forwarded to
+    @param _token Address of the token being sold
+    @param _owner Address of the owner of the crowdsale
+    """
+
+    assert self.walletAndSettlement == 0, "The crowdsale is already initialized."
+    assert _rate > 0, "Invalid value supplied for the parameter \"_rate\"."
+    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."
+    assert _token != ZERO_ADDRESS, "Invalid token address."
+    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \"_rate\"."
+    assert _owner != ZERO_ADDRESS, "Invalid owner supplied."
+
+    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)
+    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)
+    self.owner = _owner
+
 @private
 @constant
-def getTokenAmount(_weiAmount: uint256) -> uint256:
-    return _weiAmount * self.rate
+def unpackAddress(_word: uint256) -> address:
+    return convert(convert(shift(_word, -96), bytes32), address)
+
+@public
+@constant
+def token() -> address:
+    return self.unpackAddress(self.tokenAndRate)
+
+@public
+@constant
+def rate() -> uint256:
+    return bitwise_and(self.tokenAndRate, MAX_RATE)
+
+@public
+@constant
+def wallet() -> address:
+    return self.unpackAddress(self.walletAndSettlement)
+
+@public
+@constant
+def accumulateFunds() -> bool:
+    return bitwise_and(self.walletAndSettlement, 1) == 1
 
 
 @private
-def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):
+def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei), _whitelisted: bool):
     #pre validate
     assert _beneficiary != ZERO_ADDRESS, "Invalid address."
     assert _weiAmount != 0, "Invalid amount received."
-    assert self.checkIfWhitelisted(_beneficiary), "This address is not whitelisted to contribute."
+    assert _whitelisted, "This address is not whitelisted to contribute."
+
+    config: uint256 = self.tokenAndRate
 
     #calculate the number of tokens for the Ether contribution.
-    tokens: uint256 = self.getTokenAmount(as_unitless_number(_weiAmount))
+    tokens: uint256 = as_unitless_number(_weiAmount) * bitwise_and(config, MAX_RATE)
     
     self.weiRaised += _weiAmount
 
     #process purchase
-    assert TokenContract(self.token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
+    assert TokenContract(convert(convert(shift(config, -96), bytes32), address)).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."
     log.TokenPurchase(_sender, _beneficiary, _weiAmount, tokens)
 
     #forward funds to the receiving wallet address.
-    send(self.wallet, _weiAmount)
+    settlement: uint256 = self.walletAndSettlement
+
+    if bitwise_and(settlement, 1) == 0:
+        send(convert(convert(shift(settlement, -96), bytes32), address), _weiAmount)
 
     #post validate
 
+#Settlement
+@public
+def setAccumulateFunds(_accumulate: bool):
+    """
+    @dev Lets the wallet collect funds in bulk using withdrawFunds instead of receiving them on every purchase.
+    @param _accumulate True to keep funds in this contract, false to forward them on each purchase
+    """
+
+    wallet: uint256 = shift(self.walletAndSettlement, -96)
+    assert msg.sender == convert(convert(wallet, bytes32), address), "Access is denied."
+
+    if _accumulate:
+        self.walletAndSettlement = bitwise_or(shift(wallet, 96), 1)
+    else:
+        self.walletAndSettlement = shift(wallet, 96)
+
+@public
+def withdrawFunds():
+    """
+    @dev Forwards the funds held by this contract to the wallet.
+    """
+
+    assert self.balance > 0, "Nothing to withdraw."
+    send(convert(convert(shift(self.walletAndSettlement, -96), bytes32), address), self.balance)
+
 @public
 @payable
 def buyTokens(_beneficiary: address):
-    self.processTransaction(msg.sender, _beneficiary, msg.value)
+    self.processTransaction(msg.sender, _beneficiary, msg.value, self.whitelist[_beneficiary])
+
+@public
+@payable
+def buyTokensWithProof(_beneficiary: address, _proof: bytes32[20], _proofLength: int128):
+    """
+    @dev Purchases tokens for a beneficiary whitelisted through the Merkle root.
+    @param _beneficiary Address receiving the tokens
+    @param _proof The sibling hashes from the beneficiary's leaf up to the root, padded to 20 items
+    @param _proofLength The number of hashes in the proof
+    """
+
+    assert self.whitelistRoot != EMPTY_BYTES32, "This address is not whitelisted to contribute."
+
+    #Vyper cannot pass lists to private functions, so the proof is verified here.
+    computed: bytes32 = keccak256(convert(_beneficiary, bytes32))
+
+    for i in range(20):
+        if i >= _proofLength:
+            break
+
+        computed = self.hashPair(computed, _proof[i])
+
+    self.processTransaction(msg.sender, _beneficiary, msg.value, computed == self.whitelistRoot)
 
 @public
 @payable
 def __default__():
-    self.processTransaction(msg.sender, msg.sender, msg.value)
+    self.processTransaction(msg.sender, msg.sender, msg.value, self.whitelist[msg.sender])
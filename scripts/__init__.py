@@ -0,0 +1,9 @@
+"""
+Python tooling for the Vyper crowdsale contracts.
+
+The modules in this package compile the contracts found in `contracts/` and
+exercise them on an in-process EVM (py-evm through eth-tester), so they can be
+run without Truffle or Ganache. Run them from the project root, for example:
+
+    python -m scripts.gas_benchmark
+"""
@@ -0,0 +1,125 @@
+"""
+Builds the Truffle artifacts of the contracts, like `truper`, without
+recompiling unchanged contracts.
+
+    python -m scripts.build                 # build/contracts/<name>.vyper.json
+    python -m scripts.build --jobs 4
+
+Each source is hashed together with the compiler version. An artifact whose
+hash matches is left alone, and a source compiled before, e.g. by the Python
+tests, is taken from the cache in `build/cache`. The remaining contracts are
+compiled in parallel on a process pool.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .compilation import BUILD_DIR, CACHE_DIR, COMPILER_VERSION, CONTRACTS_DIR, MOCK_DIR, cache_path, compile_source, source_hash
+
+
+ARTIFACTS_DIR = os.path.join(BUILD_DIR, 'contracts')
+
+
+def source_paths():
+    """
+    Lists the Vyper sources in `contracts/` and `contracts/mock/`.
+    """
+
+    return [os.path.join(directory, f) for directory in (CONTRACTS_DIR, MOCK_DIR) for f in sorted(os.listdir(directory)) if f.endswith('.v.py')]
+
+
+def artifact_name(path):
+    # truper names the artifact of `crowdsale.v.py` `crowdsale.vyper`.
+    return os.path.basename(path)[:-len('.v.py')] + '.vyper'
+
+
+def read_source(path):
+    with open(path) as f:
+        return f.read()
+
+
+def compile_file(path, cache_dir):
+    return compile_source(read_source(path), cache_dir)
+
+
+def write_artifact(path, output, key, artifacts_dir):
+    name = artifact_name(path)
+    artifact = {
+        'contractName': name,
+        'abi': output['abi'],
+        'bytecode': output['bytecode'],
+        'deployedBytecode': output['bytecode_runtime'],
+        'sourcePath': path,
+        'sourceHash': key,
+        'compiler': {'name': 'vyper', 'version': COMPILER_VERSION.split(' ')[1]},
+        'networks': {},
+    }
+
+    with open(os.path.join(artifacts_dir, name + '.json'), 'w') as f:
+        json.dump(artifact, f, indent=2)
+
+
+def is_up_to_date(path, key, artifacts_dir):
+    try:
+        with open(os.path.join(artifacts_dir, artifact_name(path) + '.json')) as f:
+            return json.load(f).get('sourceHash') == key
+    except (OSError, ValueError):
+        return False
+
+
+def build(paths=None, artifacts_dir=ARTIFACTS_DIR, cache_dir=CACHE_DIR, jobs=None):
+    """
+    Writes the artifacts of the sources `paths` which are missing or out of date.
+    @return A dict with the lists of `compiled`, `cached` and `unchanged` paths
+    """
+
+    paths = paths or source_paths()
+    keys = {path: source_hash(read_source(path)) for path in paths}
+    stale = [path for path in paths if not is_up_to_date(path, keys[path], artifacts_dir)]
+    cached = [path for path in stale if os.path.exists(cache_path(keys[path], cache_dir))]
+    missing = [path for path in stale if path not in cached]
+    outputs = {}
+
+    if len(missing) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            outputs.update(zip(missing, executor.map(compile_file, missing, [cache_dir] * len(missing))))
+    else:
+        # Starting a pool costs more than compiling a single contract.
+        outputs.update((path, compile_file(path, cache_dir)) for path in missing)
+
+    outputs.update((path, compile_file(path, cache_dir)) for path in cached)
+    os.makedirs(artifacts_dir, exist_ok=True)
+
+    for path in stale:
+        write_artifact(path, outputs[path], keys[path], artifacts_dir)
+
+    return {
+        'compiled': missing,
+        'cached': cached,
+        'unchanged': [path for path in paths if path not in stale],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Builds the Truffle artifacts of the contracts, compiling only changed sources.')
+    parser.add_argument('--output', default=ARTIFACTS_DIR, help='directory of the artifacts')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of contracts compiled at the same time')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    result = build(artifacts_dir=args.output, jobs=args.jobs)
+
+    for path in result['compiled']:
+        print('Compiled {}'.format(os.path.relpath(path)), file=sys.stderr)
+
+    print('{} compiled, {} from cache, {} unchanged in {:.2f} seconds.'.format(
+        len(result['compiled']), len(result['cached']), len(result['unchanged']), time.time() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
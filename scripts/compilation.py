@@ -0,0 +1,102 @@
+"""
+Compiles the Vyper contracts of this repository, caching the compiler output
+by the hash of each source and the compiler version.
+
+This module only needs Vyper, so that builds do not pay for importing the EVM.
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+import vyper
+from vyper import compiler
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTRACTS_DIR = os.path.join(ROOT, 'contracts')
+MOCK_DIR = os.path.join(CONTRACTS_DIR, 'mock')
+BUILD_DIR = os.path.join(ROOT, 'build')
+
+# Compiler outputs keyed by the hash of the source and the compiler version,
+# shared by the Python tools and `scripts.build`.
+CACHE_DIR = os.path.join(BUILD_DIR, 'cache')
+
+COMPILER_VERSION = 'vyper ' + vyper.__version__
+
+
+def contract_path(name):
+    """
+    Returns the path of the contract `name`, e.g. `crowdsale` or `mintable_token`.
+    """
+
+    for directory in (CONTRACTS_DIR, MOCK_DIR):
+        path = os.path.join(directory, name + '.v.py')
+        if os.path.exists(path):
+            return path
+
+    raise ValueError('Unknown contract "{}".'.format(name))
+
+
+def contract_names(include_mocks=False):
+    """
+    Lists the names of the contracts in `contracts/` (and optionally `contracts/mock/`).
+    """
+
+    directories = [CONTRACTS_DIR, MOCK_DIR] if include_mocks else [CONTRACTS_DIR]
+    names = []
+
+    for directory in directories:
+        names += sorted(f[:-len('.v.py')] for f in os.listdir(directory) if f.endswith('.v.py'))
+
+    return names
+
+
+def source_hash(source):
+    """
+    Hashes a contract source together with the compiler version, the key of the compilation cache.
+    """
+
+    return hashlib.sha256((COMPILER_VERSION + '\n' + source).encode()).hexdigest()
+
+
+def cache_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key + '.json')
+
+
+def compile_source(source, cache_dir=CACHE_DIR):
+    """
+    Compiles a contract source, or reads the output of an earlier compilation of the same source.
+    @return A dict with the `abi`, `bytecode` and `bytecode_runtime` of the contract
+    """
+
+    path = cache_path(source_hash(source), cache_dir)
+
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+
+    output = compiler.compile_code(source, ['abi', 'bytecode', 'bytecode_runtime'])
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Written under a temporary name first, so that parallel builds never read a partial file.
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+
+    with open(temporary, 'w') as f:
+        json.dump(output, f)
+
+    os.replace(temporary, path)
+    return output
+
+
+@functools.lru_cache(maxsize=None)
+def compile_contract(name):
+    """
+    Compiles the contract `name` and returns a dict with its `abi` and `bytecode`.
+    """
+
+    with open(contract_path(name)) as f:
+        source = f.read()
+
+    return compile_source(source)
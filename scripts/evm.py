@@ -0,0 +1,169 @@
+"""
+Compiles the Vyper contracts of this repository and runs them on an
+in-process EVM.
+"""
+
+import contextlib
+
+from eth_tester import EthereumTester, PyEVMBackend
+from eth_tester.backends.pyevm.main import get_default_genesis_params
+from web3 import Web3
+
+try:
+    # pysha3 hashes about ten times faster than the default backend of eth_utils,
+    # which matters when building trees of hundreds of thousands of addresses.
+    from sha3 import keccak_256
+
+    def keccak(data):
+        return keccak_256(data).digest()
+except ImportError:
+    from eth_utils import keccak
+from web3.providers.eth_tester import EthereumTesterProvider
+
+# Re-exported, the tools and tests import them from here.
+from .compilation import (
+    BUILD_DIR, CACHE_DIR, COMPILER_VERSION, CONTRACTS_DIR, MOCK_DIR, ROOT,
+    compile_contract, compile_source, contract_names, contract_path, source_hash,
+)
+
+
+# Same block gas limit as a default Ganache instance, so that results are
+# comparable with `truffle test`.
+BLOCK_GAS_LIMIT = 6721975
+
+# Block gas limit of the main network, which fits the largest bulk setters.
+MAINNET_BLOCK_GAS_LIMIT = 30000000
+
+
+class TransactionReverted(Exception):
+    """
+    Raised when a transaction was mined but reverted.
+    """
+
+    def __init__(self, receipt):
+        super().__init__('Transaction {} reverted.'.format(receipt.transactionHash.hex()))
+        self.receipt = receipt
+
+
+def address_bytes(address):
+    """
+    Returns the 20 bytes of a hex address. Much faster than eth_utils for large lists.
+    """
+
+    value = bytes.fromhex(address[2:] if address.startswith('0x') else address)
+
+    if len(value) != 20:
+        raise ValueError('Invalid address "{}".'.format(address))
+
+    return value
+
+
+def checksum_address(value):
+    """
+    Returns the EIP-55 checksummed form of a 20 byte address.
+    """
+
+    lower = value.hex()
+    digest = keccak(lower.encode()).hex()
+
+    return '0x' + ''.join(c.upper() if d in '89abcdef' else c for c, d in zip(lower, digest))
+
+
+def pack_addresses(addresses):
+    """
+    Encodes addresses for the `bytes` argument of the bulk setters, each left-padded to 32 bytes.
+    """
+
+    return b''.join(b'\0' * 12 + address_bytes(address) for address in addresses)
+
+
+def to_bytes32(text):
+    return Web3.toBytes(text=text).ljust(32, b'\0')
+
+
+class Chain:
+    """
+    A fresh in-process chain with funded accounts.
+    """
+
+    def __init__(self, gas_limit=BLOCK_GAS_LIMIT):
+        genesis = get_default_genesis_params({'gas_limit': gas_limit})
+        self.tester = EthereumTester(PyEVMBackend(genesis_parameters=genesis))
+        self.w3 = Web3(EthereumTesterProvider(self.tester))
+        self.accounts = self.w3.eth.accounts
+        self.gas_limit = gas_limit
+
+    def deploy(self, name, *args, sender=None):
+        """
+        Deploys the contract `name` with the constructor arguments `args`.
+        @return The deployed contract instance
+        """
+
+        return self.deploy_interface(compile_contract(name), *args, sender=sender)
+
+    def deploy_interface(self, interface, *args, sender=None):
+        """
+        Deploys compiled output, e.g. of `compile_source`, with the constructor arguments `args`.
+        @return The deployed contract instance
+        """
+
+        factory = self.w3.eth.contract(abi=interface['abi'], bytecode=interface['bytecode'])
+        receipt = self.receipt(factory.constructor(*args).transact(self.tx(sender)))
+
+        return self.w3.eth.contract(address=receipt.contractAddress, abi=interface['abi'])
+
+    def tx(self, sender=None, value=0):
+        # The block gas limit drifts from block to block, always use the current one.
+        gas = self.w3.eth.getBlock('pending').gasLimit
+        return {'from': sender or self.accounts[0], 'value': value, 'gas': gas}
+
+    def transact(self, function, sender=None, value=0):
+        """
+        Sends a transaction to a contract function and returns the receipt.
+        Raises `TransactionReverted` if the transaction failed.
+        """
+
+        return self.receipt(function.transact(self.tx(sender, value)))
+
+    def send(self, to, value, sender=None):
+        """
+        Sends plain ether to `to`, which triggers `__default__` on a contract.
+        """
+
+        tx = self.tx(sender, value)
+        tx['to'] = to
+        return self.receipt(self.w3.eth.sendTransaction(tx))
+
+    def receipt(self, tx_hash):
+        receipt = self.w3.eth.getTransactionReceipt(tx_hash)
+
+        if receipt.status == 0:
+            raise TransactionReverted(receipt)
+
+        return receipt
+
+    def now(self):
+        return self.w3.eth.getBlock('latest').timestamp
+
+    def time_travel(self, timestamp):
+        self.tester.time_travel(timestamp)
+
+    def snapshot(self):
+        return self.tester.take_snapshot()
+
+    def revert(self, snapshot_id):
+        self.tester.revert_to_snapshot(snapshot_id)
+
+    @contextlib.contextmanager
+    def reverting(self):
+        """
+        Restores the state and the time of the chain when the block exits, so that
+        tests can share contracts deployed once instead of deploying for every test.
+        """
+
+        snapshot_id = self.snapshot()
+
+        try:
+            yield self
+        finally:
+            self.revert(snapshot_id)
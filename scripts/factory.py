@@ -0,0 +1,209 @@
+"""
+Creates crowdsales as minimal proxies of templates, through
+`contracts/crowdsale_factory.v.py`, instead of deploying their full bytecode.
+
+    python -m scripts.factory capped_crowdsale 1 0xWallet... 0xToken... 100000000000000000000
+    python -m scripts.factory tiered_price_crowdsale 1548979200 0xWallet... 0xToken... 2 1546300800,1547510400 200,100
+
+The arguments are those of the constructor of the contract. Lists, e.g. the
+tier start times and rates, are comma separated. The factory and a template of
+each contract are deployed on first use with the first unlocked account of the
+node and recorded in `--registry`, so later runs only pay for the proxy and the
+storage of the new crowdsale. Contracts with an owner are owned by the account
+which creates them.
+
+A proxy delegates every call to its template, which keeps its own storage
+untouched. Calls that fail through a proxy revert without a reason.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from web3 import HTTPProvider, Web3
+
+from .compilation import compile_contract
+
+
+FACTORY = 'crowdsale_factory'
+
+# The function of the factory which creates each contract, named after its initializer.
+FACTORY_FUNCTIONS = {
+    'allowance_crowdsale': 'createAllowanceCrowdsale',
+    'capped_crowdsale': 'createCappedCrowdsale',
+    'crowdsale': 'createCrowdsale',
+    'increasing_price_crowdsale': 'createIncreasingPriceCrowdsale',
+    'individually_capped_crowdsale': 'createOwnedCrowdsale',
+    'minted_crowdsale': 'createCrowdsale',
+    'post_delivery_crowdsale': 'createTimedCrowdsale',
+    'tiered_price_crowdsale': 'createTieredPriceCrowdsale',
+    'timed_crowdsale': 'createTimedCrowdsale',
+    'whitelisted_crowdsale': 'createOwnedCrowdsale',
+}
+
+TIERS = 32
+
+# Runtime code of a proxy created by `create_with_code_of`, around the address of its template.
+PROXY_CODE = re.compile(r'^366000600037611000600036600073([0-9a-f]{40})5af4602c57600080fd5b6110006000f3$')
+
+
+def example_arguments(name, now, wallet, token):
+    """
+    Returns valid constructor arguments of the contract `name`, for a sale opening an hour after `now`.
+    Templates are deployed with them, their values do not matter to the proxies.
+    """
+
+    opening, closing = now + 3600, now + 7200
+
+    if name == 'allowance_crowdsale':
+        return [1, wallet, token, wallet]
+
+    if name == 'capped_crowdsale':
+        return [1, wallet, token, 10 ** 18]
+
+    if name in ('timed_crowdsale', 'post_delivery_crowdsale'):
+        return [opening, closing, 1, wallet, token]
+
+    if name == 'increasing_price_crowdsale':
+        return [opening, closing, wallet, token, 2, 1]
+
+    if name == 'tiered_price_crowdsale':
+        return [closing, wallet, token, 1, [opening] + [0] * (TIERS - 1), [1] + [0] * (TIERS - 1)]
+
+    return [1, wallet, token]
+
+
+def deploy(w3, name, *args, sender=None):
+    interface = compile_contract(name)
+    factory = w3.eth.contract(abi=interface['abi'], bytecode=interface['bytecode'])
+    receipt = w3.eth.waitForTransactionReceipt(factory.constructor(*args).transact({'from': sender or w3.eth.accounts[0]}))
+
+    if receipt.status == 0:
+        raise ValueError('The deployment of {} failed.'.format(name))
+
+    return w3.eth.contract(address=receipt.contractAddress, abi=interface['abi'])
+
+
+def at(w3, name, address):
+    return w3.eth.contract(address=address, abi=compile_contract(name)['abi'])
+
+
+def proxy_template(code):
+    """
+    Returns the address of the template a proxy delegates to, or None if `code` is not the runtime code of a proxy.
+    """
+
+    match = PROXY_CODE.match(bytes(code).hex())
+    return Web3.toChecksumAddress(match.group(1)) if match else None
+
+
+def load_registry(path):
+    if not path or not os.path.exists(path):
+        return {'factory': None, 'templates': {}}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_registry(path, registry):
+    with open(path, 'w') as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def ensure_deployed(w3, registry, name, sender=None):
+    """
+    Deploys the factory and the template of `name` unless the registry has them.
+    @return The factory and the address of the template
+    """
+
+    sender = sender or w3.eth.accounts[0]
+
+    if not registry['factory']:
+        registry['factory'] = deploy(w3, FACTORY, sender=sender).address
+
+    if name not in registry['templates']:
+        args = example_arguments(name, w3.eth.getBlock('latest').timestamp, sender, sender)
+        registry['templates'][name] = deploy(w3, name, *args, sender=sender).address
+
+    return at(w3, FACTORY, registry['factory']), registry['templates'][name]
+
+
+def create(w3, factory, name, template, args, sender=None):
+    """
+    Creates a crowdsale `name` from `template` with the constructor arguments `args`.
+    @return The new crowdsale and the receipt of its creation
+    """
+
+    function = getattr(factory.functions, FACTORY_FUNCTIONS[name])
+    tx_hash = function(template, *args).transact({'from': sender or w3.eth.accounts[0]})
+    receipt = w3.eth.waitForTransactionReceipt(tx_hash)
+
+    if receipt.status == 0:
+        raise ValueError('The creation of {} failed, check its arguments.'.format(name))
+
+    event, = factory.events.CrowdsaleCreated().processReceipt(receipt)
+    return at(w3, name, event.args._crowdsale), receipt
+
+
+def parse_argument(abi_type, text):
+    """
+    Converts a command line argument to the ABI type of the constructor argument.
+    """
+
+    if abi_type.endswith(']'):
+        size = int(abi_type[abi_type.index('[') + 1:-1])
+        items = [parse_argument(abi_type[:abi_type.index('[')], item) for item in text.split(',') if item]
+
+        if len(items) > size:
+            raise ValueError('At most {} items are allowed.'.format(size))
+
+        return items + [0] * (size - len(items))
+
+    if abi_type == 'address':
+        return Web3.toChecksumAddress(text)
+
+    return int(text, 0)
+
+
+def parse_arguments(name, texts):
+    inputs = next(item['inputs'] for item in compile_contract(name)['abi'] if item['type'] == 'constructor')
+
+    if len(texts) != len(inputs):
+        raise ValueError('{} takes {} arguments: {}.'.format(name, len(inputs), ', '.join(item['name'] for item in inputs)))
+
+    return [parse_argument(item['type'], text) for item, text in zip(inputs, texts)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Creates a crowdsale as a minimal proxy of a template.')
+    parser.add_argument('contract', choices=sorted(FACTORY_FUNCTIONS), help='crowdsale to create')
+    parser.add_argument('arguments', nargs='*', help='constructor arguments of the crowdsale')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--registry', default='crowdsale_templates.json', help='file recording the factory and the templates')
+    parser.add_argument('--sender', help='account creating the crowdsale, the first unlocked account by default')
+    args = parser.parse_args(argv)
+
+    try:
+        values = parse_arguments(args.contract, args.arguments)
+    except ValueError as e:
+        parser.error(str(e))
+
+    w3 = Web3(HTTPProvider(args.rpc))
+    registry = load_registry(args.registry)
+
+    try:
+        factory, template = ensure_deployed(w3, registry, args.contract)
+    finally:
+        save_registry(args.registry, registry)
+
+    crowdsale, receipt = create(w3, factory, args.contract, template, values, args.sender)
+    print('Created {} at {} for {} gas.'.format(args.contract, crowdsale.address, receipt.gasUsed))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
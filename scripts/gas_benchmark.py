@@ -0,0 +1,455 @@
+"""
+Gas benchmark for the crowdsale contracts.
+
+Deploys every contract in `contracts/` against the mock tokens on an in-process
+EVM, records the gas used by each purchase and administration path and
+compares the results with the stored baseline (`scripts/gas_baseline.json`).
+
+    python -m scripts.gas_benchmark                  # compare with the baseline
+    python -m scripts.gas_benchmark --update         # rewrite the baseline
+    python -m scripts.gas_benchmark --threshold 0.5  # allowed increase in percent
+
+The command exits with a non-zero status when a path became more expensive
+than the baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from . import factory, merkle
+from .evm import COMPILER_VERSION, MAINNET_BLOCK_GAS_LIMIT, Chain, pack_addresses, to_bytes32
+from .sale import LIST_LENGTH, RATE, TOKEN_SUPPLY, VALUE, Sale, addresses, deploy_generated, padded
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gas_baseline.json')
+
+BATCH_SIZES = (1, 10, 50)
+BULK_SIZES = (10, 50, 200, 500)
+BULK_LENGTH = 500
+TIER_COUNTS = (1, 8, 32)
+TIER_LENGTH = 32
+MERKLE_LEAVES = 100000
+
+# The generated contract measured against each hand-written one, and a combination of features.
+GENERATED_SALES = {
+    'crowdsale': ((), 'transfer'),
+    'allowance_crowdsale': ((), 'allowance'),
+    'capped_crowdsale': (('capped',), 'transfer'),
+    'individually_capped_crowdsale': (('individually_capped',), 'transfer'),
+    'minted_crowdsale': ((), 'minted'),
+    'post_delivery_crowdsale': (('timed', 'post_delivery'), 'transfer'),
+    'timed_crowdsale': (('timed',), 'transfer'),
+    'whitelisted_crowdsale': (('whitelisted',), 'transfer'),
+    'timed_capped_whitelisted_minted': (('timed', 'capped', 'whitelisted'), 'minted'),
+}
+
+DEFAULT_THRESHOLD = 1.0
+
+
+def measure_purchases(sale):
+    """
+    Measures a first purchase, a repeated purchase and a purchase through `__default__`,
+    then a repeated purchase while the wallet accumulates funds and the withdrawal of those funds.
+    """
+
+    chain, functions = sale.chain, sale.crowdsale.functions
+
+    results = {
+        'buyTokens': chain.transact(functions.buyTokens(sale.investor), sale.purchaser, VALUE).gasUsed,
+        'buyTokens(repeat)': chain.transact(functions.buyTokens(sale.investor), sale.purchaser, VALUE).gasUsed,
+        '__default__': chain.send(sale.crowdsale.address, VALUE, sale.buyer).gasUsed,
+    }
+
+    chain.transact(functions.setAccumulateFunds(True), sale.wallet)
+    results['buyTokens(accumulate)'] = chain.transact(functions.buyTokens(sale.investor), sale.purchaser, VALUE).gasUsed
+    results['withdrawFunds'] = chain.transact(functions.withdrawFunds(), sale.purchaser).gasUsed
+    chain.transact(functions.setAccumulateFunds(False), sale.wallet)
+
+    return results
+
+
+def measure_batches(sale, offset=0):
+    """
+    Measures `buyTokensBatch` for each batch size, every beneficiary buying for the first time.
+    """
+
+    results = {}
+    amount = VALUE // 100
+
+    for size in BATCH_SIZES:
+        group = addresses(size, offset=offset + size * LIST_LENGTH)
+        function = sale.crowdsale.functions.buyTokensBatch(size, padded(group), padded([amount] * size, filler=0))
+        results['buyTokensBatch({})'.format(size)] = sale.chain.transact(function, sale.purchaser, amount * size).gasUsed
+
+    return results
+
+
+def bench_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    results = measure_purchases(sale)
+    results.update(measure_batches(sale))
+
+    return results
+
+
+def bench_allowance_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('allowance_crowdsale', RATE, sale.wallet, sale.token.address, sale.owner)
+    chain.transact(sale.token.functions.approve(sale.crowdsale.address, TOKEN_SUPPLY))
+
+    results = measure_purchases(sale)
+    results.update(measure_batches(sale))
+
+    # The same paths, delivered from a tranche pulled into the crowdsale.
+    results['pullTranche'] = chain.transact(sale.crowdsale.functions.pullTranche(TOKEN_SUPPLY // 2), sale.owner).gasUsed
+    results.update(('{}[tranches]'.format(path), gas) for path, gas in measure_purchases(sale).items())
+    results.update(('{}[tranches]'.format(path), gas) for path, gas in measure_batches(sale, offset=BULK_LENGTH).items())
+
+    return results
+
+
+def bench_capped_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('capped_crowdsale', RATE, sale.wallet, sale.token.address, 100 * VALUE)
+    sale.fund()
+
+    results = measure_purchases(sale)
+
+    # A purchase of twice the cap, filled up to the cap with the excess refunded.
+    chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    results['buyTokens(partial fill)'] = chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 200 * VALUE).gasUsed
+
+    return results
+
+
+def bench_increasing_price_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    opening, closing = sale.opening_and_closing()
+    sale.crowdsale = chain.deploy('increasing_price_crowdsale', opening, closing, sale.wallet, sale.token.address, 9166, 5500)
+    sale.fund()
+    chain.time_travel(opening + 3600)
+
+    return measure_purchases(sale)
+
+
+def bench_tiered_price_crowdsale(chain):
+    """
+    Measures the purchase paths for each tier count, buying during the last tier
+    so that the search takes the most steps.
+    """
+
+    results = {}
+
+    for count in TIER_COUNTS:
+        sale = Sale(chain)
+        sale.deploy_token()
+        opening, closing = sale.opening_and_closing()
+        step = (closing - opening) // count
+        starts = [opening + i * step for i in range(count)]
+        rates = [RATE + count - i for i in range(count)]
+
+        sale.crowdsale = chain.deploy('tiered_price_crowdsale', closing, sale.wallet, sale.token.address, count,
+                                      padded(starts, TIER_LENGTH, 0), padded(rates, TIER_LENGTH, 0))
+        sale.fund()
+        chain.time_travel(starts[-1] + 60)
+
+        for path, gas in measure_purchases(sale).items():
+            results['{}[{} tiers]'.format(path, count)] = gas
+
+    return results
+
+
+def bench_individually_capped_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    results = {}
+    set_group_cap = sale.crowdsale.functions.setGroupCap
+
+    for size in BATCH_SIZES:
+        group = addresses(size, offset=size * LIST_LENGTH)
+        results['setGroupCap({})'.format(size)] = chain.transact(set_group_cap(size, padded(group), 10 * VALUE)).gasUsed
+
+    for size in BULK_SIZES:
+        group = pack_addresses(addresses(size, offset=size * BULK_LENGTH))
+        results['setGroupCapBulk({})'.format(size)] = chain.transact(sale.crowdsale.functions.setGroupCapBulk(group, 10 * VALUE)).gasUsed
+
+    chain.transact(set_group_cap(2, padded([sale.investor, sale.buyer]), 10 * VALUE))
+    results.update(measure_purchases(sale))
+
+    # Caps committed as a Merkle root, verified and stored on the first purchase.
+    beneficiary = chain.accounts[4]
+    tree, caps = merkle.caps_tree([(address, 10 * VALUE) for address in addresses(MERKLE_LEAVES - 1)] + [(beneficiary, 10 * VALUE)])
+    cap, proof = caps[beneficiary]
+    proof, length = merkle.contract_proof(proof)
+    buy = sale.crowdsale.functions.buyTokensWithCapProof(beneficiary, cap, proof, length)
+
+    results['setCapsRoot'] = chain.transact(sale.crowdsale.functions.setCapsRoot(tree.root)).gasUsed
+    results['buyTokensWithCapProof({})'.format(MERKLE_LEAVES)] = chain.transact(buy, sale.purchaser, VALUE).gasUsed
+    results['buyTokensWithCapProof(cached)'] = chain.transact(buy, sale.purchaser, VALUE).gasUsed
+    results['buyTokens(cached cap)'] = chain.transact(sale.crowdsale.functions.buyTokens(beneficiary), sale.purchaser, VALUE).gasUsed
+
+    # A purchase of twice the cap, filled up to the rest of the cap with the excess refunded.
+    chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    results['buyTokens(partial fill)'] = chain.transact(sale.crowdsale.functions.buyTokens(beneficiary), sale.purchaser, 20 * VALUE).gasUsed
+
+    return results
+
+
+def bench_minted_crowdsale(chain):
+    sale = Sale(chain)
+    sale.token = chain.deploy('mintable_token', to_bytes32('Name'), to_bytes32('SYMBOL'), 0, TOKEN_SUPPLY, 18)
+    sale.crowdsale = chain.deploy('minted_crowdsale', RATE, sale.wallet, sale.token.address)
+    chain.transact(sale.token.functions.transferOwnership(sale.crowdsale.address))
+
+    results = measure_purchases(sale)
+    results.update(measure_batches(sale))
+
+    return results
+
+
+def bench_post_delivery_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    opening, closing = sale.opening_and_closing()
+    sale.crowdsale = chain.deploy('post_delivery_crowdsale', opening, closing, RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    chain.time_travel(opening + 3600)
+
+    results = measure_purchases(sale)
+    results.update(measure_batches(sale))
+
+    chain.time_travel(closing + 3600)
+    results['withdrawTokens'] = chain.transact(sale.crowdsale.functions.withdrawTokens(), sale.investor).gasUsed
+
+    # Distributes the tokens bought by `measure_batches`, then distributes again to measure skipped holders.
+    for size in BATCH_SIZES:
+        group = padded(addresses(size, offset=size * LIST_LENGTH))
+        distribute = sale.crowdsale.functions.distributeTokens(size, group)
+        results['distributeTokens({})'.format(size)] = chain.transact(distribute, sale.purchaser).gasUsed
+        results['distributeTokens({} withdrawn)'.format(size)] = chain.transact(distribute, sale.purchaser).gasUsed
+
+    return results
+
+
+def bench_timed_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    opening, closing = sale.opening_and_closing()
+    sale.crowdsale = chain.deploy('timed_crowdsale', opening, closing, RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    chain.time_travel(opening + 3600)
+
+    return measure_purchases(sale)
+
+
+def bench_whitelisted_crowdsale(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('whitelisted_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    results = {}
+    add = sale.crowdsale.functions.addAddressesToWhitelist
+
+    for size in BATCH_SIZES:
+        group = addresses(size, offset=size * LIST_LENGTH)
+        results['addAddressesToWhitelist({})'.format(size)] = chain.transact(add(size, padded(group))).gasUsed
+
+    for size in BULK_SIZES:
+        group = pack_addresses(addresses(size, offset=size * BULK_LENGTH))
+        results['addAddressesToWhitelistBulk({})'.format(size)] = chain.transact(sale.crowdsale.functions.addAddressesToWhitelistBulk(group)).gasUsed
+        results['removeAddressesFromWhitelistBulk({})'.format(size)] = chain.transact(sale.crowdsale.functions.removeAddressesFromWhitelistBulk(group)).gasUsed
+
+    chain.transact(add(2, padded([sale.investor, sale.buyer])))
+    results.update(measure_purchases(sale))
+
+    tree, proofs = merkle.whitelist_tree(addresses(MERKLE_LEAVES - 1) + [sale.investor])
+    proof, length = merkle.contract_proof(proofs[sale.investor])
+    results['setWhitelistRoot'] = chain.transact(sale.crowdsale.functions.setWhitelistRoot(tree.root)).gasUsed
+    buy = sale.crowdsale.functions.buyTokensWithProof(sale.investor, proof, length)
+    results['buyTokensWithProof({})'.format(MERKLE_LEAVES)] = chain.transact(buy, sale.purchaser, VALUE).gasUsed
+
+    return results
+
+
+def bench_generated_crowdsale(chain):
+    """
+    Measures the purchase paths of the contracts generated by `scripts/generate.py`,
+    named after the hand-written contract with the same features.
+    """
+
+    results = {}
+
+    for name, (features, source) in sorted(GENERATED_SALES.items()):
+        for path, gas in measure_purchases(deploy_generated(chain, features, source)).items():
+            results['{}[{}]'.format(path, name)] = gas
+
+    return results
+
+
+def bench_crowdsale_factory(chain):
+    """
+    Measures the deployment of each contract against its creation as a proxy of a template,
+    with the same constructor arguments.
+    """
+
+    sale = Sale(chain)
+    sale.deploy_token()
+    crowdsale_factory = chain.deploy(factory.FACTORY)
+    results = {}
+
+    for name, function in sorted(factory.FACTORY_FUNCTIONS.items()):
+        args = factory.example_arguments(name, chain.now(), sale.wallet, sale.token.address)
+        template = chain.deploy(name, *args)
+        results['deploy[{}]'.format(name)] = chain.w3.eth.getBlock('latest').gasUsed
+
+        create = getattr(crowdsale_factory.functions, function)
+        receipt = chain.transact(create(template.address, *args))
+        results['{}[{}]'.format(function, name)] = receipt.gasUsed
+
+        if name == 'crowdsale':
+            event, = crowdsale_factory.events.CrowdsaleCreated().processReceipt(receipt)
+            proxy = chain.w3.eth.contract(address=event.args._crowdsale, abi=template.abi)
+
+    # Every call through a proxy pays for the delegation to the template.
+    sale.crowdsale = proxy
+    sale.fund()
+    results.update(('{}[proxy]'.format(path), gas) for path, gas in measure_purchases(sale).items())
+
+    return results
+
+
+BENCHMARKS = {
+    'crowdsale': bench_crowdsale,
+    'crowdsale_factory': bench_crowdsale_factory,
+    'allowance_crowdsale': bench_allowance_crowdsale,
+    'capped_crowdsale': bench_capped_crowdsale,
+    'generated_crowdsale': bench_generated_crowdsale,
+    'increasing_price_crowdsale': bench_increasing_price_crowdsale,
+    'individually_capped_crowdsale': bench_individually_capped_crowdsale,
+    'minted_crowdsale': bench_minted_crowdsale,
+    'post_delivery_crowdsale': bench_post_delivery_crowdsale,
+    'tiered_price_crowdsale': bench_tiered_price_crowdsale,
+    'timed_crowdsale': bench_timed_crowdsale,
+    'whitelisted_crowdsale': bench_whitelisted_crowdsale,
+}
+
+
+def run(names=None):
+    """
+    Runs the benchmarks of the given contracts (all of them by default), each on a fresh chain.
+    @return A dict of contract name -> path -> gas used
+    """
+
+    # The gas used does not depend on the block gas limit, but the 500 address
+    # bulk setters do not fit in a Ganache block.
+    return {name: BENCHMARKS[name](Chain(MAINNET_BLOCK_GAS_LIMIT)) for name in (names or sorted(BENCHMARKS))}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Finds the paths which became more expensive than the baseline by more than `threshold` percent.
+    @return A list of (contract, path, baseline gas, current gas) tuples
+    """
+
+    regressions = []
+
+    for name, paths in sorted(current.items()):
+        for path, gas in sorted(paths.items()):
+            previous = baseline.get(name, {}).get(path)
+
+            if previous is not None and gas > previous * (1 + threshold / 100.0):
+                regressions.append((name, path, previous, gas))
+
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({'compiler': COMPILER_VERSION, 'gas': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def format_table(results, baseline):
+    lines = ['{:<32} {:<32} {:>10} {:>10} {:>8}'.format('contract', 'path', 'gas', 'baseline', 'change')]
+
+    for name, paths in sorted(results.items()):
+        for path, gas in sorted(paths.items()):
+            previous = baseline.get(name, {}).get(path)
+            change = '{:+.2f}%'.format((gas - previous) * 100.0 / previous) if previous else ''
+            lines.append('{:<32} {:<32} {:>10} {:>10} {:>8}'.format(name, path, gas, previous or '', change))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measures the gas used by the crowdsale contracts.')
+    parser.add_argument('contracts', nargs='*', help='contracts to benchmark (default: all)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline file to compare with or update')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed gas increase in percent')
+    parser.add_argument('--update', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--output', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    for name in args.contracts:
+        if name not in BENCHMARKS:
+            parser.error('Unknown contract "{}". Choose from: {}.'.format(name, ', '.join(sorted(BENCHMARKS))))
+
+    results = run(args.contracts)
+    stored = load_baseline(args.baseline)
+    baseline = stored['gas'] if stored else {}
+
+    print(format_table(results, baseline))
+
+    if args.output:
+        write_results(args.output, results)
+
+    if args.update:
+        if args.contracts:
+            results = dict(baseline, **results)
+
+        write_results(args.baseline, results)
+        print('Baseline written to {}.'.format(args.baseline))
+        return 0
+
+    if stored is None:
+        print('No baseline found at {}. Run with --update to create one.'.format(args.baseline))
+        return 0
+
+    if stored.get('compiler') != COMPILER_VERSION:
+        print('Warning: the baseline was recorded with {}.'.format(stored.get('compiler')))
+
+    regressions = compare(baseline, results, args.threshold)
+
+    for name, path, previous, gas in regressions:
+        print('{}.{} costs {} gas, {} in the baseline.'.format(name, path, gas, previous))
+
+    if regressions:
+        print('{} path(s) exceeded the baseline by more than {}%.'.format(len(regressions), args.threshold))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,478 @@
+"""
+Attributes the gas of transactions to the source lines of the Vyper contracts.
+
+    python -m scripts.gas_profile capped_crowdsale
+    python -m scripts.gas_profile tiered_price_crowdsale --transaction buyTokens --function getCurrentRate
+    python -m scripts.gas_profile individually_capped_crowdsale --transaction setGroupCap --svg caps.svg
+
+The tool runs the gas benchmark of each contract and replays every
+transaction it sends on a copy of the state before the transaction, tracing
+each opcode like the structLogs of `debug_traceTransaction`. The gas of an
+opcode is mapped to a line of the contract through the program counter, and
+the gas of a call excludes the gas used by the callee, whose opcodes are
+attributed to the lines of the callee. Contracts are recognized by their
+runtime bytecode, so this works for every contract in `contracts/` and
+`contracts/mock/`.
+
+The report is a table of the most expensive lines. `--folded` writes the
+stacks of transaction, function and line in the format of flamegraph.pl and
+speedscope, and `--svg` renders them as a flame graph.
+"""
+
+import argparse
+import bisect
+import collections
+import functools
+import html
+import re
+import sys
+import zlib
+
+from eth_utils import function_abi_to_4byte_selector
+from vyper import compile_lll, optimizer
+from vyper.parser import parser as vyper_parser
+from web3 import Web3
+
+from .evm import MAINNET_BLOCK_GAS_LIMIT, Chain, compile_contract, contract_names, contract_path
+from .gas_benchmark import BENCHMARKS
+
+
+CONTRACTS = tuple(name for name in sorted(BENCHMARKS) if name in contract_names())
+
+DEFAULT_TOP = 25
+FLAME_GRAPH_WIDTH = 1200
+FLAME_GRAPH_ROW = 16
+
+# Frames which are not a line of a contract.
+INTRINSIC = '(intrinsic)'
+UNATTRIBUTED = '(unattributed)'
+DISPATCHER = '(dispatcher)'
+
+
+def position_line_numbers(node, pos=None):
+    """
+    Gives every node of an LLL tree the position of its closest ancestor which has one.
+    """
+
+    if node.pos is None:
+        node.pos = pos
+
+    for arg in node.args:
+        position_line_numbers(arg, node.pos)
+
+
+def assembly_line_numbers(assembly):
+    """
+    Maps the program counter of each instruction of Vyper assembly to its line.
+    Follows the first pass of `compile_lll.assembly_to_evm`, which loses the lines of
+    the code before the last data section in this version of the compiler.
+    @return The bytecode and a dict of program counter -> line
+    """
+
+    lines = {}
+    pc = 0
+
+    for i, item in enumerate(assembly):
+        if isinstance(item, compile_lll.instruction) and item.lineno is not None:
+            lines[pc] = item.lineno
+
+        if item == 'DEBUG' or item == 'BLANK':
+            continue
+
+        if compile_lll.is_symbol(item):
+            if assembly[i + 1] not in ('JUMPDEST', 'BLANK'):
+                pc += 3
+        elif isinstance(item, list):
+            pc += len(compile_lll.assembly_to_evm(item)[0])
+        else:
+            pc += 1
+
+    return compile_lll.assembly_to_evm(assembly)[0], lines
+
+
+class SourceMap:
+    """
+    The lines and functions of a contract, by program counter of its runtime bytecode.
+    """
+
+    def __init__(self, name):
+        with open(contract_path(name)) as f:
+            source = f.read()
+
+        lll = optimizer.optimize(vyper_parser.parse_to_lll(source, runtime_only=True))
+        position_line_numbers(lll)
+        self.bytecode, lines = assembly_line_numbers(compile_lll.compile_to_assembly(lll))
+
+        self.name = name
+        self.source = source.splitlines()
+        self.pcs = sorted(lines)
+        self.lines = [lines[pc] for pc in self.pcs]
+        self.functions = self.function_names()
+        self.selectors = {
+            function_abi_to_4byte_selector(abi): abi['name']
+            for abi in compile_contract(name)['abi'] if abi['type'] == 'function'
+        }
+        self.frames = {}
+
+    def function_names(self):
+        # The function of a line is the closest definition above it, or below its decorators.
+        functions = []
+        current = None
+
+        for i, text in enumerate(self.source):
+            match = re.match(r'def (\w+)', text)
+
+            if match:
+                current = match.group(1)
+
+                for j in range(i - 1, -1, -1):
+                    if not self.source[j].startswith('@'):
+                        break
+
+                    functions[j] = current
+
+            functions.append(current)
+
+        return functions
+
+    def line(self, pc):
+        """
+        Returns the line of the instruction at `pc`, or of the closest instruction before it which has one.
+        """
+
+        i = bisect.bisect_right(self.pcs, pc) - 1
+        return self.lines[i] if i >= 0 else None
+
+    def frame(self, pc):
+        """
+        @return A tuple of the contract, the function and the line of the instruction at `pc`
+        """
+
+        if pc not in self.frames:
+            line = self.line(pc)
+            function = self.functions[line - 1] if line else None
+            self.frames[pc] = (self.name, function or DISPATCHER, line)
+
+        return self.frames[pc]
+
+
+@functools.lru_cache(maxsize=None)
+def source_map(name):
+    return SourceMap(name)
+
+
+@functools.lru_cache(maxsize=None)
+def source_maps_by_bytecode():
+    maps = (source_map(name) for name in contract_names(include_mocks=True))
+    return {source.bytecode: source for source in maps}
+
+
+def find_source_map(code):
+    """
+    Returns the source map of the contract whose runtime bytecode is `code`, or None.
+    """
+
+    return source_maps_by_bytecode().get(bytes(code))
+
+
+def tracing_computation(base, on_step):
+    """
+    Subclasses a py-evm computation class so that it calls `on_step(step, callers)` after each opcode.
+    A step has the keys of a structLog (pc, op, gas, gasCost, depth) and the address and code
+    which ran, and `callers` are the steps of the calls which led to it, outermost first.
+    """
+
+    callers = []
+
+    class TracingComputation(base):
+        def get_opcode_fn(self, opcode):
+            opcode_fn = super().get_opcode_fn(opcode)
+
+            def traced(computation):
+                depth = computation.msg.depth
+                step = {
+                    'pc': max(0, computation.code.pc - 1),
+                    'op': opcode_fn.mnemonic,
+                    'gas': computation.get_gas_remaining(),
+                    'depth': depth,
+                    'address': computation.msg.code_address,
+                    'code': computation.msg.code,
+                }
+                del callers[depth:]
+                callers.append(step)
+                children = len(computation.children)
+
+                try:
+                    opcode_fn(computation=computation)
+                finally:
+                    # A call only costs what the callee did not use, the opcodes of the callee are steps of their own.
+                    used = sum(child.get_gas_used() for child in computation.children[children:])
+                    step['gasCost'] = step['gas'] - computation.get_gas_remaining() - used
+                    on_step(step, callers[:depth])
+
+            traced.mnemonic = opcode_fn.mnemonic
+            return traced
+
+    return TracingComputation
+
+
+def replay(chain, tx_hash, on_step):
+    """
+    Replays a mined transaction of `chain` on the state before it, without changing the chain.
+    @return The computation of the transaction and its py-evm transaction object
+    """
+
+    backend = chain.tester.backend.chain
+    mined = chain.w3.eth.getTransaction(tx_hash)
+    block = backend.get_canonical_block_by_number(mined.blockNumber)
+    parent = backend.get_block_header_by_hash(block.header.parent_hash)
+
+    # The block is executed again from the state of its parent, with the same timestamp and number.
+    state = backend.get_vm(block.header.copy(state_root=parent.state_root, gas_used=0)).state
+
+    for transaction in block.transactions:
+        if transaction.hash == bytes(mined.hash):
+            state.computation_class = tracing_computation(state.computation_class, on_step)
+            return state.apply_transaction(transaction)[1], transaction
+
+        state.apply_transaction(transaction)
+
+    raise ValueError('Transaction {} is not in block {}.'.format(Web3.toHex(tx_hash), mined.blockNumber))
+
+
+def transaction_label(chain, tx_hash):
+    """
+    Names a transaction after the contract and the function it calls, e.g. `capped_crowdsale.buyTokens`.
+    @return The label, or None for a contract creation
+    """
+
+    mined = chain.w3.eth.getTransaction(tx_hash)
+
+    if not mined.to:
+        return None
+
+    source = find_source_map(chain.w3.eth.getCode(mined.to))
+    data = bytes.fromhex(mined.data[2:]) if isinstance(mined.data, str) else bytes(mined.data)
+
+    if source is None:
+        return mined.to
+
+    return '{}.{}'.format(source.name, source.selectors.get(data[:4], '__default__'))
+
+
+def frame_names(frame):
+    contract, function, line = frame
+    return ['{}.{}'.format(contract, function), '{}.v.py:{}'.format(contract, line) if line else function]
+
+
+class Profile:
+    """
+    Gas attributed to source lines, summed over the transactions added to it.
+    """
+
+    def __init__(self):
+        # (contract, line) -> [gas, opcodes]
+        self.lines = collections.defaultdict(lambda: [0, 0])
+        # Folded stacks of transaction, functions and lines -> gas
+        self.stacks = collections.Counter()
+        self.transactions = 0
+        self.gas_used = 0
+        self.intrinsic = 0
+        self.refunded = 0
+
+    def frame(self, step):
+        if 'frame' not in step:
+            source = find_source_map(step['code'])
+            address = '0x' + bytes(step['address']).hex()
+            step['frame'] = source.frame(step['pc']) if source else (address, DISPATCHER, None)
+
+        return step['frame']
+
+    def add_step(self, label, step, callers):
+        frame = self.frame(step)
+        entry = self.lines[frame[0], frame[2]]
+        entry[0] += step['gasCost']
+        entry[1] += 1
+
+        names = [label]
+
+        for caller in callers:
+            names += frame_names(self.frame(caller))
+
+        self.stacks[';'.join(names + frame_names(frame))] += step['gasCost']
+
+    def add_transaction(self, chain, tx_hash, label=None):
+        """
+        Replays a transaction of `chain` and adds its gas to the profile.
+        """
+
+        label = label or transaction_label(chain, tx_hash) or 'constructor'
+        traced = [0]
+
+        def on_step(step, callers):
+            traced[0] += step['gasCost']
+            self.add_step(label, step, callers)
+
+        computation, transaction = replay(chain, tx_hash, on_step)
+        intrinsic = transaction.get_intrinsic_gas()
+        gas_used = chain.w3.eth.getTransactionReceipt(tx_hash).gasUsed
+
+        self.stacks[label + ';' + INTRINSIC] += intrinsic
+
+        # The gas burnt by a failed call and the gas of precompiles have no opcodes.
+        if computation.get_gas_used() > traced[0]:
+            self.stacks[label + ';' + UNATTRIBUTED] += computation.get_gas_used() - traced[0]
+
+        self.transactions += 1
+        self.gas_used += gas_used
+        self.intrinsic += intrinsic
+        self.refunded += intrinsic + computation.get_gas_used() - gas_used
+
+    def top_lines(self, count=DEFAULT_TOP, function=None):
+        """
+        @return The `count` most expensive lines as (contract, line, function, gas, opcodes) tuples
+        """
+
+        rows = []
+
+        for (contract, line), (gas, opcodes) in self.lines.items():
+            source = source_map(contract) if line and contract in contract_names(include_mocks=True) else None
+            name = source.functions[line - 1] if source else None
+
+            if function is None or name == function:
+                rows.append((contract, line, name, gas, opcodes))
+
+        return sorted(rows, key=lambda row: -row[3])[:count]
+
+
+class ProfilingChain(Chain):
+    """
+    A chain which profiles every transaction it mines, optionally only those calling one of `functions`.
+    """
+
+    def __init__(self, profile, functions=None, gas_limit=MAINNET_BLOCK_GAS_LIMIT):
+        super().__init__(gas_limit)
+        self.profile = profile
+        self.functions = functions
+
+    def receipt(self, tx_hash):
+        label = transaction_label(self, tx_hash)
+
+        if label and (not self.functions or label.rsplit('.', 1)[-1] in self.functions):
+            self.profile.add_transaction(self, tx_hash, label)
+
+        return super().receipt(tx_hash)
+
+
+def format_table(profile, count=DEFAULT_TOP, function=None):
+    execution = profile.gas_used + profile.refunded - profile.intrinsic
+    lines = [
+        '{} transactions, {} gas used: {} intrinsic, {} execution, {} refunded.'.format(
+            profile.transactions, profile.gas_used, profile.intrinsic, execution, profile.refunded),
+        '',
+        '{:>10} {:>7} {:>8}  {:<36} {:<24} {}'.format('gas', 'share', 'opcodes', 'line', 'function', 'source'),
+    ]
+
+    for contract, line, name, gas, opcodes in profile.top_lines(count, function):
+        location = '{}.v.py:{}'.format(contract, line) if line else contract
+        text = source_map(contract).source[line - 1].strip() if name else ''
+        share = gas * 100.0 / execution if execution else 0
+        lines.append('{:>10} {:>6.2f}% {:>8}  {:<36} {:<24} {}'.format(gas, share, opcodes, location, name or '', text[:60]))
+
+    return '\n'.join(lines)
+
+
+def format_folded(stacks):
+    return ''.join('{} {}\n'.format(stack, gas) for stack, gas in sorted(stacks.items()) if gas > 0)
+
+
+def flame_graph(stacks, title='', width=FLAME_GRAPH_WIDTH, row=FLAME_GRAPH_ROW):
+    """
+    Renders folded stacks as a self-contained SVG flame graph, the callers below their callees.
+    """
+
+    # Each node is [gas, children by name].
+    root = [0, collections.OrderedDict()]
+
+    for stack, gas in sorted(stacks.items()):
+        if gas <= 0:
+            continue
+
+        node = root
+        node[0] += gas
+
+        for name in stack.split(';'):
+            node = node[1].setdefault(name, [0, collections.OrderedDict()])
+            node[0] += gas
+
+    def depth(node):
+        return 1 + max((depth(child) for child in node[1].values()), default=0)
+
+    height = (depth(root) + 1) * row
+    rects = []
+
+    def draw(node, x, level):
+        for name, child in node[1].items():
+            w = child[0] * width / root[0]
+
+            if w >= 0.5:
+                y = height - (level + 1) * row
+                hue = zlib.crc32(name.split('.')[0].encode()) % 40
+                label = name if len(name) * 7 < w else name[:max(0, int(w / 7) - 2)] + '..' if w > 28 else ''
+                tip = '{} ({} gas, {:.2f}%)'.format(name, child[0], child[0] * 100.0 / root[0])
+                rects.append(
+                    '<g><title>{}</title><rect x="{:.1f}" y="{}" width="{:.1f}" height="{}" fill="hsl({},90%,60%)" stroke="white"/>'
+                    '<text x="{:.1f}" y="{}">{}</text></g>'.format(
+                        html.escape(tip), x, y, w, row - 1, hue, x + 3, y + row - 4, html.escape(label)))
+                draw(child, x, level + 1)
+
+            x += w
+
+    draw(root, 0, 0)
+
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{1}" font-family="monospace" font-size="11">\n'
+        '<text x="{2}" y="12" text-anchor="middle">{3}</text>\n{4}\n</svg>\n'
+    ).format(width, height + row, width / 2, html.escape(title), '\n'.join(rects))
+
+
+def run(names, functions=None):
+    """
+    Profiles the transactions of the gas benchmarks of the given contracts.
+    @return The profile of all of them
+    """
+
+    profile = Profile()
+
+    for name in names:
+        BENCHMARKS[name](ProfilingChain(profile, functions))
+
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Attributes the gas of the benchmark transactions to source lines.')
+    parser.add_argument('contracts', nargs='+', choices=CONTRACTS, metavar='contract', help='contracts whose benchmark to profile')
+    parser.add_argument('--transaction', action='append', help='only profile transactions calling this function (repeatable)')
+    parser.add_argument('--function', help='only list the lines of this function')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='number of lines to list')
+    parser.add_argument('--folded', help='write the folded stacks to this file')
+    parser.add_argument('--svg', help='write a flame graph to this file')
+    args = parser.parse_args(argv)
+
+    profile = run(args.contracts, args.transaction)
+    print(format_table(profile, args.top, args.function))
+
+    if args.folded:
+        with open(args.folded, 'w') as f:
+            f.write(format_folded(profile.stacks))
+
+    if args.svg:
+        with open(args.svg, 'w') as f:
+            f.write(flame_graph(profile.stacks, 'Gas of ' + ', '.join(args.contracts)))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
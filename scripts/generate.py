@@ -0,0 +1,503 @@
+"""
+Generates a single crowdsale contract combining the features of a sale.
+
+Each feature of this repository lives in its own contract. Combining, say,
+a timed, capped and whitelisted sale of a mintable token means merging their
+`processTransaction` by hand. This tool emits the combined contract from the
+same code, with only the storage and checks of the selected features:
+
+    python -m scripts.generate timed capped whitelisted --source minted --output my_crowdsale.v.py
+
+Features are `timed`, `capped`, `whitelisted`, `individually_capped` and
+`post_delivery` (which requires `timed`). The tokens are transferred from the
+balance of the crowdsale by default, or with `--source allowance` from a token
+wallet, or with `--source minted` by minting.
+
+The purchase path runs the checks from the cheapest to the most expensive, so
+that a rejected purchase costs as little as possible: the arguments first, then
+the packed period and cap words, then the whitelist and the individual caps,
+which each hash a mapping key. The constructor takes the arguments of the
+selected features in this order:
+
+    _openingTime, _closingTime  (timed)
+    _rate, _wallet, _token
+    _cap                        (capped)
+    _tokenWallet                (allowance)
+
+The events, storage and functions of each feature are taken from its contract
+in `contracts/`, so that the generated contract cannot drift from the
+hand-written ones; only `processTransaction` and the constructor, which merge
+the features, are composed here. A capped or individually capped sale can fill
+purchases partially, and an allowance sale can deliver from pulled tranches, as
+the hand-written contracts do. Merkle whitelists and caps, and batch purchases,
+are not generated.
+"""
+
+import argparse
+import collections
+import functools
+import re
+import sys
+
+from .compilation import contract_path
+
+
+FEATURES = ('timed', 'capped', 'whitelisted', 'individually_capped', 'post_delivery')
+SOURCES = ('transfer', 'allowance', 'minted')
+
+# The token interface of each source of tokens, as declared by the contract delivering them that way.
+INTERFACE = {
+    'transfer': 'crowdsale',
+    'allowance': 'allowance_crowdsale',
+    'minted': 'minted_crowdsale',
+}
+
+DELIVERY = {
+    'transfer': 'TokenContract({token}).transfer({to}, {amount})',
+    'allowance': 'self.deliverTokens({token}, {to}, {amount})',
+    'minted': 'TokenContract({token}).mint({to}, {amount})',
+}
+
+# The declarations each feature takes from its hand-written contract, as (contract, names) pairs.
+OWNABLE_EVENTS = ('individually_capped_crowdsale', ('OwnershipRenounced', 'OwnershipTransferred'))
+WHITELIST_EVENTS = ('whitelisted_crowdsale', ('WhitelistAdded', 'WhitelistRemoved'))
+PURCHASE_EVENT = ('crowdsale', ('TokenPurchase',))
+
+OWNABLE_STORAGE = ('individually_capped_crowdsale', ('owner',))
+WHITELIST_STORAGE = ('whitelisted_crowdsale', ('whitelist',))
+INDIVIDUAL_CAPS_STORAGE = ('individually_capped_crowdsale', ('contributionsAndCaps',))
+POST_DELIVERY_STORAGE = ('post_delivery_crowdsale', ('balances',))
+TIMED_STORAGE = ('timed_crowdsale', ('openingAndClosingTime',))
+ALLOWANCE_STORAGE = ('allowance_crowdsale', ('tokenWalletAndTranches',))
+CROWDSALE_STORAGE = ('timed_crowdsale', ('MAX_RATE', 'tokenAndRate'))
+SETTLEMENT_STORAGE = ('crowdsale', ('walletAndSettlement',))
+PARTIAL_FILLS_STORAGE = ('capped_crowdsale', ('walletAndSettlement',))
+CAPPED_STORAGE = ('capped_crowdsale', ('weiRaisedAndCap',))
+WEI_RAISED_STORAGE = ('crowdsale', ('weiRaised',))
+
+OWNABLE_FUNCTIONS = ('individually_capped_crowdsale', ('renounceOwnership', 'transferOwnership'))
+WHITELIST_FUNCTIONS = ('whitelisted_crowdsale', (
+    'checkIfWhitelisted', 'checkIfWhitelistedBulk', 'addAddressToWhitelist', 'addAddressesToWhitelist',
+    'removeAddressFromWhitelist', 'removeAddressesFromWhitelist', 'addAddressesToWhitelistBulk', 'removeAddressesFromWhitelistBulk',
+))
+INDIVIDUAL_CAPS_FUNCTIONS = ('individually_capped_crowdsale', (
+    'setUserCap', 'setGroupCap', 'setGroupCapBulk', 'getUserCap', 'getUserContribution', 'remainingUserCap',
+    'getUserCapsBulk', 'getUserContributionsBulk', 'caps', 'contributions',
+))
+CAPPED_FUNCTIONS = ('capped_crowdsale', ('cap', 'weiRaised', 'capReached'))
+TIMED_FUNCTIONS = ('timed_crowdsale', ('hasClosed', 'openingTime', 'closingTime'))
+POST_DELIVERY_FUNCTIONS = ('post_delivery_crowdsale', ('getBalancesBulk', 'withdrawTokens', 'distributeTokens'))
+ALLOWANCE_FUNCTIONS = ('allowance_crowdsale', ('getRemainingTokens', 'getTrancheTokens', 'pullTranche', 'returnTranches'))
+
+GETTERS = ('crowdsale', ('unpackAddress', 'token', 'rate', 'wallet', 'accumulateFunds'))
+ALLOWANCE_GETTERS = ('allowance_crowdsale', ('tokenWallet', 'usesTranches'))
+SETTLEMENT_FUNCTIONS = ('crowdsale', ('setAccumulateFunds',))
+PURCHASE_FUNCTIONS = ('crowdsale', ('withdrawFunds', 'buyTokens', '__default__'))
+
+# A sale with partial fills keeps its flag in the settlement word, whose setter must preserve it.
+PARTIAL_FILLS_GETTER = {'capped': ('capped_crowdsale', ('partialFills',)), 'individually_capped': ('individually_capped_crowdsale', ('partialFills',))}
+PARTIAL_FILLS_FUNCTIONS = {'capped': ('capped_crowdsale', ('setAccumulateFunds', 'setPartialFills')), 'individually_capped': ('individually_capped_crowdsale', ('setAccumulateFunds', 'setPartialFills'))}
+
+# Delivers the withdrawn tokens of a post delivery sale from the allowance source, like AllowanceCrowdsale.processPurchase.
+ALLOWANCE_DELIVERY = '''@private
+def deliverTokens(_token: address, _to: address, _amount: uint256) -> bool:
+    #from the tranches pulled into this contract, else from the allowance of the token wallet.
+    tokenWallet: uint256 = self.tokenWalletAndTranches
+
+    if bitwise_and(tokenWallet, 1) == 1:
+        return TokenContract(_token).transfer(_to, _amount)
+
+    return TokenContract(_token).transferFrom(convert(convert(shift(tokenWallet, -96), bytes32), address), _to, _amount)'''
+
+
+@functools.lru_cache(maxsize=None)
+def declarations(name):
+    """
+    Splits the source of the contract `name` into its top-level declarations: the token interface,
+    the events, the storage and the functions, each with the comments and decorators right above it.
+    @return An ordered dict of declared name -> source
+    """
+
+    with open(contract_path(name)) as f:
+        lines = f.read().splitlines()
+
+    result = collections.OrderedDict()
+    header = []
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+
+        if not line.strip():
+            header = []
+            continue
+
+        if line.startswith(('#', '@')):
+            header.append(line)
+            continue
+
+        block = header + [line]
+        header = []
+
+        # The body of a function or of the token interface is indented, blank lines included.
+        while i < len(lines) and (not lines[i].strip() or lines[i][0].isspace()):
+            block.append(lines[i])
+            i += 1
+
+        while not block[-1].strip():
+            block.pop()
+
+        result[re.match(r'(?:def\s+|contract\s+)?(\w+)', line).group(1)] = '\n'.join(block)
+
+    return result
+
+
+def fragment(contract, names):
+    """
+    Returns the declarations `names` of the hand-written `contract`, one-line declarations without comments kept together.
+    """
+
+    blocks = [declarations(contract)[name] for name in names]
+    source = blocks[0]
+
+    for block in blocks[1:]:
+        source += ('\n' if '\n' not in block and not block.startswith('#') else '\n\n') + block
+
+    return source
+
+
+def closing(code, start):
+    """
+    Returns the index after the parenthesis closing the one at `start`.
+    """
+
+    depth = 0
+
+    for i in range(start, len(code)):
+        depth += {'(': 1, ')': -1}.get(code[i], 0)
+
+        if depth == 0:
+            return i + 1
+
+    raise ValueError('Unbalanced parentheses in "{}".'.format(code[start:]))
+
+
+def redeliver(code, source):
+    """
+    Replaces the token transfers of `code`, taken from a contract which transfers its tokens, with the delivery of `source`.
+    """
+
+    pieces = []
+    position = 0
+
+    while True:
+        start = code.find('TokenContract(', position)
+
+        if start < 0:
+            return ''.join(pieces) + code[position:]
+
+        token_end = closing(code, start + len('TokenContract'))
+
+        if not code.startswith('.transfer(', token_end):
+            raise ValueError('Only token transfers can be delivered from another source.')
+
+        arguments_end = closing(code, token_end + len('.transfer'))
+        to, amount = code[token_end + len('.transfer('):arguments_end - 1].split(', ')
+        token = code[start + len('TokenContract('):token_end - 1]
+        pieces += [code[position:start], DELIVERY[source].format(token=token, to=to, amount=amount)]
+        position = arguments_end
+
+
+class Specification:
+    """
+    The features of a sale and the source of its tokens.
+    """
+
+    def __init__(self, features=(), source='transfer', name='GeneratedCrowdsale'):
+        unknown = set(features) - set(FEATURES)
+
+        if unknown:
+            raise ValueError('Unknown features: {}.'.format(', '.join(sorted(unknown))))
+
+        if source not in SOURCES:
+            raise ValueError('Unknown token source "{}".'.format(source))
+
+        if 'post_delivery' in features and 'timed' not in features:
+            raise ValueError('The post_delivery feature requires the timed feature.')
+
+        self.features = frozenset(features)
+        self.source = source
+        self.name = name
+
+    def has(self, feature):
+        return feature in self.features
+
+    @property
+    def ownable(self):
+        return self.has('whitelisted') or self.has('individually_capped')
+
+    @property
+    def partial_fills(self):
+        """
+        Returns the capped feature whose contract provides partial fills, or None.
+        """
+
+        return next((feature for feature in ('capped', 'individually_capped') if self.has(feature)), None)
+
+    def arguments(self):
+        """
+        Returns the names of the constructor arguments, in order.
+        """
+
+        names = ['_openingTime', '_closingTime'] if self.has('timed') else []
+        names += ['_rate', '_wallet', '_token']
+        names += ['_cap'] if self.has('capped') else []
+        names += ['_tokenWallet'] if self.source == 'allowance' else []
+
+        return names
+
+
+def constructor(spec):
+    types = {'_openingTime': 'timestamp', '_closingTime': 'timestamp', '_rate': 'uint256', '_cap': 'uint256'}
+    arguments = ', '.join('{}: {}'.format(name, types.get(name, 'address')) for name in spec.arguments())
+    lines = ['#Crowdsale', '@public', 'def __init__({}):'.format(arguments), '    """', '    @dev Initializes this contract']
+    descriptions = {
+        '_openingTime': 'Crowdsale opening time',
+        '_closingTime': 'Crowdsale closing time',
+        '_rate': 'Number of token units a buyer gets per wei',
+        '_wallet': 'Address where collected funds will be forwarded to',
+        '_token': 'Address of the token being sold',
+        '_cap': 'Max amount of wei to be contributed',
+        '_tokenWallet': 'Address holding the tokens, which has approved allowance to the crowdsale',
+    }
+    lines += ['    @param {} {}'.format(name, descriptions[name]) for name in spec.arguments()]
+    lines += ['    """', '']
+
+    if spec.has('timed'):
+        lines += [
+            '    assert _openingTime >= block.timestamp, "The value for opening time cannot be in the past."',
+            '    assert _closingTime >= _openingTime, "The closing time cannot be before opening time."',
+            '    assert shift(as_unitless_number(_closingTime), -128) == 0, "Invalid closing time."',
+        ]
+
+    lines += [
+        '    assert _rate > 0, "Invalid value supplied for the parameter \\"_rate\\"."',
+        '    assert _wallet != ZERO_ADDRESS, "Invalid wallet address."',
+        '    assert _token != ZERO_ADDRESS, "Invalid token address."',
+        '    assert _rate <= MAX_RATE, "Invalid value supplied for the parameter \\"_rate\\"."',
+    ]
+
+    if spec.has('capped'):
+        lines += ['    assert _cap > 0, "Invalid cap."', '    assert shift(_cap, -128) == 0, "Invalid cap."']
+
+    if spec.source == 'allowance':
+        lines += ['    assert _tokenWallet != ZERO_ADDRESS, "Invalid token wallet."']
+
+    lines += ['']
+
+    if spec.has('timed'):
+        lines += ['    self.openingAndClosingTime = bitwise_or(shift(as_unitless_number(_openingTime), 128), as_unitless_number(_closingTime))']
+
+    lines += [
+        '    self.tokenAndRate = bitwise_or(shift(convert(convert(_token, bytes32), uint256), 96), _rate)',
+        '    self.walletAndSettlement = shift(convert(convert(_wallet, bytes32), uint256), 96)',
+    ]
+
+    if spec.has('capped'):
+        lines += ['    self.weiRaisedAndCap = _cap']
+
+    if spec.source == 'allowance':
+        lines += ['    self.tokenWalletAndTranches = shift(convert(convert(_tokenWallet, bytes32), uint256), 96)']
+
+    if spec.ownable:
+        lines += ['    self.owner = msg.sender']
+
+    return '\n'.join(lines)
+
+
+def process_transaction(spec):
+    # With partial fills, the amount sold can be less than the amount paid.
+    partial = spec.partial_fills is not None
+    amount = 'amount' if partial else 'as_unitless_number(_weiAmount)'
+    wei_amount = 'as_wei_value(amount, "wei")' if partial else '_weiAmount'
+    settlement = ['    settlement: uint256 = self.walletAndSettlement']
+    lines = [
+        '@private',
+        'def processTransaction(_sender: address, _beneficiary: address, _weiAmount: uint256(wei)):',
+        '    #pre validate, from the cheapest check to the most expensive one',
+        '    assert _beneficiary != ZERO_ADDRESS, "Invalid address."',
+        '    assert _weiAmount != 0, "Invalid amount received."',
+    ]
+
+    if partial:
+        lines += ['    amount: uint256 = as_unitless_number(_weiAmount)']
+
+    if spec.has('timed'):
+        lines += [
+            '    period: uint256 = self.openingAndClosingTime',
+            '    assert as_unitless_number(block.timestamp) >= shift(period, -128), "Sorry but the crowdsale has not yet begun."',
+            '    assert as_unitless_number(block.timestamp) <= shift(shift(period, 128), -128), "Sorry but the crowdsale was already concluded."',
+        ]
+
+    if spec.has('capped'):
+        lines += settlement + [
+            '    state: uint256 = self.weiRaisedAndCap',
+            '    remaining: uint256 = shift(shift(state, 128), -128) - shift(state, -128)',
+            '',
+            '    if amount > remaining:',
+            '        #with partial fills, the remaining capacity is sold and the excess refunded.',
+            '        assert bitwise_and(settlement, 2) == 2, "Sorry but this exceeds the cap."',
+            '        assert remaining > 0, "Sorry but this exceeds the cap."',
+            '        amount = remaining',
+            '',
+        ]
+
+    if spec.has('whitelisted'):
+        lines += ['    assert self.whitelist[_beneficiary], "This address is not whitelisted to contribute."']
+
+    if spec.has('individually_capped'):
+        lines += [] if spec.has('capped') else settlement
+        lines += [
+            '    userState: uint256 = self.contributionsAndCaps[_beneficiary]',
+            '    contribution: uint256 = shift(userState, -129)',
+            '    userCap: uint256 = shift(shift(userState, 128), -128)',
+            '',
+            '    if contribution + amount > userCap:',
+            '        #with partial fills, the rest of the user\'s cap is sold and the excess refunded.',
+            '        assert bitwise_and(settlement, 2) == 2, "Maximum user funding cap exceeded."',
+            '        assert contribution < userCap, "Maximum user funding cap exceeded."',
+            '        amount = userCap - contribution',
+        ]
+
+    lines += [
+        '',
+        '    config: uint256 = self.tokenAndRate',
+        '',
+        '    #calculate the number of tokens for the Ether contribution.',
+        '    tokens: uint256 = {} * bitwise_and(config, MAX_RATE)'.format(amount),
+        '',
+    ]
+
+    if spec.has('capped'):
+        lines += ['    self.weiRaisedAndCap = state + shift(amount, 128)']
+    else:
+        lines += ['    self.weiRaised += {}'.format(wei_amount)]
+
+    if spec.has('individually_capped'):
+        lines += ['    self.contributionsAndCaps[_beneficiary] = userState + shift(amount, 129)']
+
+    lines += ['', '    #process purchase']
+
+    if spec.has('post_delivery'):
+        lines += ['    self.balances[_beneficiary] += tokens']
+    elif spec.source == 'allowance':
+        lines += [
+            '    token: address = convert(convert(shift(config, -96), bytes32), address)',
+            '    tokenWallet: uint256 = self.tokenWalletAndTranches',
+            '',
+            '    if bitwise_and(tokenWallet, 1) == 1:',
+            '        assert TokenContract(token).transfer(_beneficiary, tokens), "Could not forward funds due to an unknown error."',
+            '    else:',
+            '        assert TokenContract(token).transferFrom(convert(convert(shift(tokenWallet, -96), bytes32), address), _beneficiary, tokens), "Could not forward funds due to an unknown error."',
+        ]
+    else:
+        delivery = DELIVERY[spec.source].format(token='convert(convert(shift(config, -96), bytes32), address)', to='_beneficiary', amount='tokens')
+        lines += ['    assert {}, "Could not forward funds due to an unknown error."'.format(delivery)]
+
+    lines += [
+        '    log.TokenPurchase(_sender, _beneficiary, {}, tokens)'.format(wei_amount),
+        '',
+        '    #forward funds to the receiving wallet address.',
+    ]
+    lines += [] if partial else settlement + ['']
+    lines += [
+        '    if bitwise_and(settlement, 1) == 0:',
+        '        send(convert(convert(shift(settlement, -96), bytes32), address), {})'.format(wei_amount),
+    ]
+
+    if partial:
+        lines += ['', '    if amount < as_unitless_number(_weiAmount):', '        send(_sender, _weiAmount - as_wei_value(amount, "wei"))']
+
+    return '\n'.join(lines)
+
+
+def generate(spec):
+    """
+    Returns the Vyper source of the contract described by `spec`.
+    """
+
+    command = ' '.join(['python -m scripts.generate'] + [feature for feature in FEATURES if spec.has(feature)] + ['--source', spec.source, '--name', spec.name])
+    header = '\n'.join([
+        '# {}'.format(spec.name),
+        '# This file is released under Apache 2.0 license.',
+        '# @dev Generated by scripts/generate.py from the contracts of each feature, regenerate it instead of editing it:',
+        '#     {}'.format(command),
+    ])
+    events = [OWNABLE_EVENTS] if spec.ownable else []
+    events += [WHITELIST_EVENTS] if spec.has('whitelisted') else []
+    events += [PURCHASE_EVENT]
+
+    storage = [OWNABLE_STORAGE] if spec.ownable else []
+    storage += [WHITELIST_STORAGE] if spec.has('whitelisted') else []
+    storage += [INDIVIDUAL_CAPS_STORAGE] if spec.has('individually_capped') else []
+    storage += [POST_DELIVERY_STORAGE] if spec.has('post_delivery') else []
+    storage += [TIMED_STORAGE] if spec.has('timed') else []
+    storage += [ALLOWANCE_STORAGE] if spec.source == 'allowance' else []
+    storage += [CROWDSALE_STORAGE, PARTIAL_FILLS_STORAGE if spec.partial_fills else SETTLEMENT_STORAGE]
+    storage += [CAPPED_STORAGE if spec.has('capped') else WEI_RAISED_STORAGE]
+
+    functions = [OWNABLE_FUNCTIONS] if spec.ownable else []
+    functions += [WHITELIST_FUNCTIONS] if spec.has('whitelisted') else []
+    functions += [INDIVIDUAL_CAPS_FUNCTIONS] if spec.has('individually_capped') else []
+    functions += [CAPPED_FUNCTIONS] if spec.has('capped') else []
+    functions += [TIMED_FUNCTIONS] if spec.has('timed') else []
+
+    sections = [header, declarations(INTERFACE[spec.source])['TokenContract']]
+    sections += [fragment(*declared) for declared in events + storage + functions]
+
+    if spec.source == 'allowance':
+        sections.append(fragment(*ALLOWANCE_FUNCTIONS))
+
+    if spec.has('post_delivery'):
+        sections += [ALLOWANCE_DELIVERY] if spec.source == 'allowance' else []
+        sections.append(redeliver(fragment(*POST_DELIVERY_FUNCTIONS), spec.source))
+
+    sections += [constructor(spec), fragment(*GETTERS)]
+    sections += [fragment(*PARTIAL_FILLS_GETTER[spec.partial_fills])] if spec.partial_fills else []
+
+    if spec.source == 'allowance':
+        sections.append(fragment(*ALLOWANCE_GETTERS))
+
+    sections.append(process_transaction(spec))
+    sections.append(fragment(*(PARTIAL_FILLS_FUNCTIONS[spec.partial_fills] if spec.partial_fills else SETTLEMENT_FUNCTIONS)))
+    sections.append(fragment(*PURCHASE_FUNCTIONS))
+
+    return '\n\n'.join(sections) + '\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generates a crowdsale contract combining the selected features.')
+    parser.add_argument('features', nargs='*', help='features of the sale: {}'.format(', '.join(FEATURES)))
+    parser.add_argument('--source', choices=SOURCES, default='transfer', help='how the tokens are delivered')
+    parser.add_argument('--name', default='GeneratedCrowdsale', help='name of the contract in its header')
+    parser.add_argument('--output', help='write the contract to this file instead of the standard output')
+    args = parser.parse_args(argv)
+
+    try:
+        source = generate(Specification(args.features, args.source, args.name))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(source)
+    else:
+        print(source, end='')
+
+    print('Constructor arguments: {}.'.format(', '.join(Specification(args.features, args.source).arguments())), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Indexes the TokenPurchase events of deployed crowdsales into a SQLite database.
+
+Every contract in this repository emits
+`TokenPurchase(_purchaser, _beneficiary, _value, _amount)`. The indexer follows
+these events for a set of crowdsale addresses, block range by block range, and
+stores them with indexes on the beneficiary and the block number.
+
+    python -m scripts.indexer purchases.db 0x1234... 0x5678...
+    python -m scripts.indexer purchases.db 0x1234... --rpc http://localhost:8545 --follow
+
+The hashes of the most recent blocks are stored next to the events. On every
+sync the indexer compares the hash of its last block with the chain; after a
+reorganization it walks back to the last common block, at most `--reorg-depth`
+blocks, and deletes what was indexed after it. The hashes are read before the
+events of a block range and checked against them, so a reorganization in the
+middle of a sync is caught too. A restart resumes from the last stored block.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+from web3 import HTTPProvider, Web3
+
+from .evm import checksum_address, keccak
+
+
+TOKEN_PURCHASE_TOPIC = '0x' + keccak(b'TokenPurchase(address,address,uint256,uint256)').hex()
+
+DEFAULT_REORG_DEPTH = 12
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_RETRIES = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS purchases (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    crowdsale TEXT NOT NULL,
+    purchaser TEXT NOT NULL,
+    beneficiary TEXT NOT NULL,
+    value TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS purchases_beneficiary ON purchases (beneficiary, block_number);
+CREATE INDEX IF NOT EXISTS purchases_crowdsale ON purchases (crowdsale, block_number);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+"""
+
+
+class ReorgTooDeep(Exception):
+    """
+    Raised when no block within the reorg depth matches the chain.
+    """
+
+
+class ChainUnstable(Exception):
+    """
+    Raised when the chain is reorganized during every attempt of a sync.
+    """
+
+
+def decode_purchase(entry):
+    """
+    Decodes a TokenPurchase log entry into a row of the `purchases` table.
+    Values and amounts are stored as decimal strings, as they do not fit SQLite integers.
+    """
+
+    data = Web3.toBytes(hexstr=entry['data']) if isinstance(entry['data'], str) else bytes(entry['data'])
+
+    return (
+        entry['blockNumber'],
+        entry['logIndex'],
+        Web3.toHex(entry['transactionHash']),
+        entry['address'],
+        checksum_address(bytes(entry['topics'][1])[12:]),
+        checksum_address(bytes(entry['topics'][2])[12:]),
+        str(int.from_bytes(data[0:32], 'big')),
+        str(int.from_bytes(data[32:64], 'big')),
+    )
+
+
+class Indexer:
+    """
+    Follows the TokenPurchase events of `crowdsales` and writes them to the SQLite database at `path`.
+    """
+
+    def __init__(self, w3, path, crowdsales, start_block=0, reorg_depth=DEFAULT_REORG_DEPTH, batch_size=DEFAULT_BATCH_SIZE, retries=DEFAULT_RETRIES):
+        self.w3 = w3
+        self.crowdsales = [Web3.toChecksumAddress(address) for address in crowdsales]
+        self.start_block = start_block
+        self.reorg_depth = reorg_depth
+        self.batch_size = batch_size
+        self.retries = retries
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def checkpoint(self):
+        """
+        Returns the number of the last indexed block, or None before the first sync.
+        """
+
+        return self.db.execute('SELECT MAX(number) FROM blocks').fetchone()[0]
+
+    def block_hash(self, number):
+        block = self.w3.eth.getBlock(number)
+        return Web3.toHex(block.hash) if block else None
+
+    def same_blocks(self, hashes, entries, end):
+        """
+        Checks that `entries` come from the blocks of `hashes`, and that block `end` was not replaced since.
+        """
+
+        if self.block_hash(end) != hashes[end]:
+            return False
+
+        return all(Web3.toHex(entry['blockHash']) == hashes[entry['blockNumber']] for entry in entries if entry['blockNumber'] in hashes)
+
+    def rollback(self):
+        """
+        Deletes the blocks which are no longer part of the chain, together with their events.
+        @return The number of the last block kept, or None if nothing was kept
+        """
+
+        stored = self.db.execute('SELECT number, hash FROM blocks ORDER BY number DESC').fetchall()
+
+        for number, stored_hash in stored:
+            if self.block_hash(number) == stored_hash:
+                break
+        else:
+            if stored and stored[-1][0] > self.start_block:
+                raise ReorgTooDeep('No indexed block within {} blocks is part of the chain.'.format(self.reorg_depth))
+
+            number = None
+
+        with self.db:
+            self.db.execute('DELETE FROM purchases WHERE block_number > ?', (-1 if number is None else number,))
+            self.db.execute('DELETE FROM blocks WHERE number > ?', (-1 if number is None else number,))
+
+        return number
+
+    def sync(self):
+        """
+        Indexes the events up to the latest block, starting again up to `retries`
+        times when the chain is reorganized in the middle.
+        @return The number of events added
+        """
+
+        added = 0
+
+        for attempt in range(self.retries + 1):
+            count, complete = self.sync_to_head()
+            added += count
+
+            if complete:
+                return added
+
+        raise ChainUnstable('The chain was reorganized during {} attempts to sync.'.format(self.retries + 1))
+
+    def sync_to_head(self):
+        """
+        Indexes the events up to the latest block, stopping at the first block range read during a reorganization.
+        @return The number of events added and whether the latest block was reached
+        """
+
+        last = self.checkpoint()
+
+        if last is not None and self.block_hash(last) != self.db.execute('SELECT hash FROM blocks WHERE number = ?', (last,)).fetchone()[0]:
+            last = self.rollback()
+
+        head = self.w3.eth.blockNumber
+        start = self.start_block if last is None else last + 1
+        added = 0
+
+        while start <= head:
+            end = min(start + self.batch_size - 1, head)
+
+            # Only the most recent blocks can be reorganized, so only their hashes are kept.
+            # They are read before the events, which must come from the same blocks.
+            recent = range(max(start, end - self.reorg_depth + 1), end + 1)
+            hashes = [(number, self.block_hash(number)) for number in recent]
+            entries = self.w3.eth.getLogs({
+                'fromBlock': start,
+                'toBlock': end,
+                'address': self.crowdsales,
+                'topics': [TOKEN_PURCHASE_TOPIC],
+            })
+
+            if not self.same_blocks(dict(hashes), entries, end):
+                # The chain was reorganized meanwhile, nothing of this range is stored.
+                return added, False
+
+            with self.db:
+                self.db.executemany('INSERT OR REPLACE INTO purchases VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [decode_purchase(entry) for entry in entries])
+                self.db.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?)', hashes)
+                self.db.execute('DELETE FROM blocks WHERE number <= ?', (end - self.reorg_depth,))
+
+            added += len(entries)
+            start = end + 1
+
+        return added, True
+
+    def purchases(self, beneficiary=None):
+        """
+        Returns the indexed purchases in chain order, optionally only those of `beneficiary`.
+        """
+
+        query = 'SELECT * FROM purchases'
+        args = ()
+
+        if beneficiary is not None:
+            query += ' WHERE beneficiary = ?'
+            args = (Web3.toChecksumAddress(beneficiary),)
+
+        return self.db.execute(query + ' ORDER BY block_number, log_index', args).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Indexes the TokenPurchase events of crowdsales into a SQLite database.')
+    parser.add_argument('database', help='path of the SQLite database, created if missing')
+    parser.add_argument('crowdsales', nargs='+', help='addresses of the crowdsales to follow')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--start-block', type=int, default=0, help='block to start from on the first sync, e.g. the deployment block')
+    parser.add_argument('--reorg-depth', type=int, default=DEFAULT_REORG_DEPTH, help='number of recent blocks checked for reorganizations')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='number of blocks requested per eth_getLogs call')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help='syncs started again after a reorganization in the middle')
+    parser.add_argument('--follow', action='store_true', help='keep polling for new blocks')
+    parser.add_argument('--interval', type=float, default=5, help='seconds between polls with --follow')
+    args = parser.parse_args(argv)
+
+    w3 = Web3(HTTPProvider(args.rpc))
+    indexer = Indexer(w3, args.database, args.crowdsales, args.start_block, args.reorg_depth, args.batch_size, args.retries)
+
+    try:
+        while True:
+            added = indexer.sync()
+            print('Indexed {} purchases up to block {}.'.format(added, indexer.checkpoint()), file=sys.stderr)
+
+            if not args.follow:
+                return 0
+
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        indexer.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
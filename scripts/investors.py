@@ -0,0 +1,97 @@
+"""
+Reads the state of many investors of a crowdsale through its bulk views,
+500 investors per `eth_call`, instead of one call per investor.
+
+    python -m scripts.investors 0xSale... investors.txt --rpc http://localhost:8545 --output investors.csv
+
+The investors file holds one address per line. The columns depend on the
+contract, which is identified by its code: the cap and the contribution of each
+investor of an `IndividuallyCappedCrowdsale`, whether each address is on the
+whitelist of a `WhitelistedCrowdsale`, and the tokens waiting for delivery to
+each beneficiary of a `PostDeliveryCrowdsale`. The chunks are read concurrently,
+all at the same block.
+"""
+
+import argparse
+import csv
+import sys
+
+from web3 import HTTPProvider, Web3
+
+from . import factory, reader
+from .evm import pack_addresses
+from .merkle import read_lines, unique_addresses
+
+
+# The bulk views of each contract and the columns they fill.
+BULK_VIEWS = {
+    'individually_capped_crowdsale': (('cap', 'getUserCapsBulk'), ('contribution', 'getUserContributionsBulk')),
+    'post_delivery_crowdsale': (('balance', 'getBalancesBulk'),),
+    'whitelisted_crowdsale': (('whitelisted', 'checkIfWhitelistedBulk'),),
+}
+
+MAX_ADDRESSES = 500
+
+
+def read_investors(crowdsale, name, addresses, block_identifier=None, chunk_size=MAX_ADDRESSES, workers=8):
+    """
+    Reads the state of `addresses` with the bulk views of the contract `name` deployed as `crowdsale`.
+    @return A list of (address, value of each column) tuples, in the order of `addresses`
+    """
+
+    views = BULK_VIEWS[name]
+
+    if block_identifier is None:
+        # Every chunk and view reads the same block.
+        block_identifier = crowdsale.web3.eth.blockNumber
+
+    def read(chunk):
+        packed = pack_addresses(chunk)
+        columns = [getattr(crowdsale.functions, view)(packed).call({'gas': reader.CALL_GAS}, block_identifier=block_identifier) for column, view in views]
+        return [(address,) + tuple(values[i] for values in columns) for i, address in enumerate(chunk)]
+
+    return reader.map_chunks(read, addresses, min(chunk_size, MAX_ADDRESSES), workers)
+
+
+def write_csv(f, name, rows):
+    writer = csv.writer(f)
+    writer.writerow(('address',) + tuple(column for column, view in BULK_VIEWS[name]))
+    writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reads the state of many investors of a crowdsale.')
+    parser.add_argument('crowdsale', help='address of the crowdsale')
+    parser.add_argument('investors', help='file with one investor address per line')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--output', help='CSV file to write, printed if omitted')
+    parser.add_argument('--workers', type=int, default=8, help='calls sent at the same time')
+    args = parser.parse_args(argv)
+
+    w3 = Web3(HTTPProvider(args.rpc))
+    address = Web3.toChecksumAddress(args.crowdsale)
+
+    try:
+        name = reader.identify(w3, address)
+        addresses = unique_addresses(read_lines(args.investors))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if name not in BULK_VIEWS:
+        parser.error('{} has no investor state to read, choose a sale of: {}.'.format(name, ', '.join(sorted(BULK_VIEWS))))
+
+    rows = read_investors(factory.at(w3, name, address), name, addresses, workers=args.workers)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            write_csv(f, name, rows)
+
+        print('Read {} investors of {} into {}.'.format(len(rows), name, args.output))
+    else:
+        write_csv(sys.stdout, name, rows)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
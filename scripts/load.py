@@ -0,0 +1,580 @@
+"""
+Fires concurrent purchases at a crowdsale on a local development chain, e.g.
+Ganache, and reports how it behaves under load.
+
+    python -m scripts.load capped_crowdsale --accounts 1000 --purchases 5000 --concurrency 200 --output capped.json
+    python -m scripts.load individually_capped_crowdsale --user-cap 2 --mix buyTokens=3,__default__=1
+
+The tool deploys the crowdsale and a token with the first unlocked account of
+the node. It funds `--accounts` new accounts and sets up the sale so that it
+fills up during the run: the cap of `capped_crowdsale` covers half of the
+purchases, `individually_capped_crowdsale` caps every account at
+`--user-cap`, `whitelisted_crowdsale` leaves some accounts out, and
+`timed_crowdsale` closes after `--duration` seconds.
+
+`--value-spread` varies the ether of each purchase around `--value`, so that
+the purchase which crosses a cap rarely fits it exactly. `--partial-fills`
+lets `capped_crowdsale` and `individually_capped_crowdsale` fill such a
+purchase up to the cap and refund the excess, and `--stop-when-capped` makes the buyers check `capReached` before
+each purchase and give up once the cap is reached, like a front end would.
+
+Each account sends its purchases one after another, signed locally, while up
+to `--concurrency` purchases of different accounts are in flight. The report
+has the transactions per second, the latency percentiles from sending to the
+receipt, the gas per successful purchase, and the reverted purchases split by
+revert reason. The reason is obtained by replaying a reverted purchase at the
+previous block, which matches a node that mines every transaction in its own
+block, such as Ganache.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import sys
+import time
+import urllib.parse
+from decimal import Decimal
+
+from eth_account import Account
+from eth_utils import keccak
+from web3 import HTTPProvider, Web3
+
+from .evm import pack_addresses, to_bytes32
+from .factory import deploy
+from .reader import chunks
+
+
+CONTRACTS = ('crowdsale', 'capped_crowdsale', 'individually_capped_crowdsale', 'timed_crowdsale', 'whitelisted_crowdsale')
+PATHS = ('buyTokens', '__default__')
+
+# Revert reasons grouped by cause, matched against the reason strings of the contracts.
+REVERT_REASONS = (
+    ('cap exceeded', ('exceeds the cap', 'user funding cap exceeded')),
+    ('not whitelisted', ('not whitelisted',)),
+    ('closed', ('already concluded', 'not yet begun')),
+)
+
+# The selector of Error(string), which prefixes revert data with a reason.
+ERROR_SELECTOR = '0x08c379a0'
+BUY_TOKENS_SELECTOR = keccak(b'buyTokens(address)')[:4]
+CAP_REACHED_SELECTOR = '0x' + keccak(b'capReached()')[:4].hex()
+
+RATE = 1
+TOKEN_SUPPLY = 10 ** 30
+DEFAULT_GAS = 200000
+DEFAULT_CONNECTIONS = 50
+PERCENTILES = (50, 90, 99)
+
+
+class RpcError(Exception):
+    """
+    Raised when the node answers a request with an error.
+    """
+
+    def __init__(self, error):
+        super().__init__(error.get('message', 'Unknown error.'))
+        self.error = error
+
+
+class RpcClient:
+    """
+    A JSON-RPC client over keep-alive HTTP connections, without dependencies beyond asyncio.
+    """
+
+    def __init__(self, url, connections=DEFAULT_CONNECTIONS):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or '/'
+        self.connections = connections
+        self.opened = 0
+        self.idle = []
+        self.released = None
+        self.ids = itertools.count(1)
+
+    async def acquire(self):
+        if self.released is None:
+            self.released = asyncio.Condition()
+
+        async with self.released:
+            while not self.idle and self.opened >= self.connections:
+                await self.released.wait()
+
+            if self.idle:
+                return self.idle.pop()
+
+            self.opened += 1
+
+        try:
+            return await asyncio.open_connection(self.host, self.port)
+        except Exception:
+            await self.release(None)
+            raise
+
+    async def release(self, connection):
+        async with self.released:
+            if connection is None:
+                self.opened -= 1
+            else:
+                self.idle.append(connection)
+
+            self.released.notify()
+
+    async def request(self, method, *params):
+        response = await self.post({'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': list(params)})
+
+        if 'error' in response:
+            raise RpcError(response['error'])
+
+        return response['result']
+
+    async def batch(self, calls):
+        """
+        Sends (method, params) pairs in one JSON-RPC batch request.
+        @return The results in the order of `calls`
+        """
+
+        requests = [{'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': list(params)} for method, params in calls]
+        responses = {response['id']: response for response in await self.post(requests)}
+        results = []
+
+        for request in requests:
+            response = responses[request['id']]
+
+            if 'error' in response:
+                raise RpcError(response['error'])
+
+            results.append(response['result'])
+
+        return results
+
+    async def post(self, payload):
+        body = json.dumps(payload).encode()
+        head = 'POST {} HTTP/1.1\r\nHost: {}:{}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'
+        reader, writer = connection = await self.acquire()
+
+        try:
+            writer.write(head.format(self.path, self.host, self.port, len(body)).encode() + body)
+            headers = await read_headers(reader)
+
+            if headers.get('transfer-encoding') == 'chunked':
+                payload = await read_chunked(reader)
+            else:
+                payload = await reader.readexactly(int(headers['content-length']))
+        except Exception:
+            writer.close()
+            await self.release(None)
+            raise
+
+        if headers.get('connection') == 'close':
+            writer.close()
+            await self.release(None)
+        else:
+            await self.release(connection)
+
+        return json.loads(payload.decode())
+
+    def close(self):
+        for reader, writer in self.idle:
+            writer.close()
+
+        self.idle = []
+
+
+async def read_headers(reader):
+    status = await reader.readline()
+
+    if not status:
+        raise ConnectionError('The node closed the connection.')
+
+    headers = {}
+
+    while True:
+        line = (await reader.readline()).decode().strip()
+
+        if not line:
+            return headers
+
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+
+async def read_chunked(reader):
+    payload = b''
+
+    while True:
+        size = int((await reader.readline()).strip(), 16)
+        chunk = await reader.readexactly(size + 2)
+
+        if size == 0:
+            return payload
+
+        payload += chunk[:-2]
+
+
+def quantity(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which `fraction` of the sorted `values` fall, by the nearest rank.
+    """
+
+    if not values:
+        return None
+
+    return values[min(len(values), max(1, math.ceil(fraction * len(values)))) - 1]
+
+
+def revert_reason(error):
+    """
+    Extracts the revert reason from the error of an `eth_call`, either from the
+    message, as Ganache reports it, or from the Error(string) return data.
+    """
+
+    data = error.get('data')
+
+    if isinstance(data, dict):
+        data = next((item.get('return') for item in data.values() if isinstance(item, dict)), None)
+
+    if isinstance(data, str) and data.startswith(ERROR_SELECTOR):
+        raw = bytes.fromhex(data[2 + 8:])
+        length = int.from_bytes(raw[32:64], 'big')
+        return raw[64:64 + length].decode(errors='replace')
+
+    message = error.get('message', '')
+    return message.split(' revert ', 1)[1] if ' revert ' in message else message
+
+
+def classify(reason):
+    lowered = (reason or '').lower()
+
+    for category, fragments in REVERT_REASONS:
+        if any(fragment in lowered for fragment in fragments):
+            return category
+
+    return 'other'
+
+
+def parse_mix(text):
+    """
+    Parses a purchase mix such as `buyTokens=3,__default__=1` into (path, weight) pairs.
+    """
+
+    mix = []
+
+    for item in text.split(','):
+        path, _, weight = item.partition('=')
+
+        if path not in PATHS:
+            raise ValueError('Unknown purchase path "{}". Choose from: {}.'.format(path, ', '.join(PATHS)))
+
+        mix.append((path, float(weight or 1)))
+
+    return mix
+
+
+def to_wei(ether):
+    return int(Decimal(str(ether)) * 10 ** 18)
+
+
+def make_accounts(count, seed):
+    return [Account.privateKeyToAccount(keccak(text='load-{}-{}'.format(seed, i))) for i in range(count)]
+
+
+def plan_purchases(accounts, purchases, mix, seed, value, spread=0):
+    """
+    Assigns `purchases` purchases to the accounts in turn, each with a path drawn from `mix`
+    and a value in wei drawn uniformly within `spread` times `value` around `value`.
+    @return A dict of the list of (path, value) of each account
+    """
+
+    generator = random.Random(seed)
+    paths, weights = zip(*mix)
+    plan = {account.address: [] for account in accounts}
+
+    for i in range(purchases):
+        path = generator.choices(paths, weights)[0]
+        amount = value + int(value * spread * (2 * generator.random() - 1)) if spread else value
+        plan[accounts[i % len(accounts)].address].append((path, amount))
+
+    return plan
+
+
+def setup_sale(w3, name, accounts, args):
+    """
+    Deploys a token and the crowdsale `name`, and prepares it for the accounts.
+    @return The crowdsale contract and its closing time, if any
+    """
+
+    owner = w3.eth.accounts[0]
+    wallet = w3.eth.accounts[1]
+    addresses = [account.address for account in accounts]
+    token = deploy(w3, 'erc20_standard_token', to_bytes32('Load'), to_bytes32('LOAD'), TOKEN_SUPPLY, 18)
+    closing = None
+
+    if name == 'capped_crowdsale':
+        cap = to_wei(args.cap) if args.cap is not None else to_wei(args.value) * args.purchases // 2
+        sale = deploy(w3, name, RATE, wallet, token.address, cap)
+    elif name == 'timed_crowdsale':
+        opening = w3.eth.getBlock('latest').timestamp + 2
+        closing = opening + args.duration
+        sale = deploy(w3, name, opening, closing, RATE, wallet, token.address)
+    else:
+        sale = deploy(w3, name, RATE, wallet, token.address)
+
+    # Accounts are whitelisted and capped 500 at a time with the bulk setters.
+    if name == 'whitelisted_crowdsale':
+        included = addresses[:int(len(addresses) * args.whitelisted)]
+
+        for group in chunks(included, 500):
+            function = sale.functions.addAddressesToWhitelistBulk(pack_addresses(group))
+            w3.eth.waitForTransactionReceipt(function.transact({'from': owner}))
+
+    if name == 'individually_capped_crowdsale':
+        for group in chunks(addresses, 500):
+            function = sale.functions.setGroupCapBulk(pack_addresses(group), to_wei(args.user_cap))
+            w3.eth.waitForTransactionReceipt(function.transact({'from': owner}))
+
+    if args.partial_fills:
+        w3.eth.waitForTransactionReceipt(sale.functions.setPartialFills(True).transact({'from': wallet}))
+
+    w3.eth.waitForTransactionReceipt(token.functions.transfer(sale.address, TOKEN_SUPPLY).transact({'from': owner}))
+
+    return sale, closing
+
+
+async def receipt(client, tx_hash, interval):
+    delay = interval / 10
+
+    while True:
+        result = await client.request('eth_getTransactionReceipt', tx_hash)
+
+        if result is not None:
+            return result
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, interval)
+
+
+async def fund(client, sender, accounts, amount, interval):
+    async def send(account):
+        tx_hash = await client.request('eth_sendTransaction', {'from': sender, 'to': account.address, 'value': hex(amount), 'gas': hex(21000)})
+        await receipt(client, tx_hash, interval)
+
+    await asyncio.gather(*[send(account) for account in accounts])
+
+
+async def purchase(client, account, nonce, path, value, crowdsale, args):
+    """
+    Sends one signed purchase of `value` wei and waits for its receipt.
+    @return A dict with the path, the latency, the gas used, and the revert reason of a failed purchase
+    """
+
+    data = BUY_TOKENS_SELECTOR + bytes.fromhex(account.address[2:]).rjust(32, b'\0') if path == 'buyTokens' else b''
+    tx = {'nonce': nonce, 'gasPrice': args.gas_price, 'gas': args.gas, 'to': crowdsale, 'value': value, 'data': data}
+    raw = Account.signTransaction(tx, account.privateKey).rawTransaction
+
+    start = time.monotonic()
+    mined = await receipt(client, await client.request('eth_sendRawTransaction', Web3.toHex(raw)), args.poll_interval)
+    result = {
+        'path': path,
+        'latency': time.monotonic() - start,
+        'gas': quantity(mined['gasUsed']),
+        'success': quantity(mined['status']) == 1,
+        'block': quantity(mined['blockNumber']),
+    }
+
+    # A purchase filled partially logs less ether than it paid, in the first word of the TokenPurchase data.
+    if result['success'] and args.partial_fills:
+        logs = [log for log in mined['logs'] if log['address'].lower() == crowdsale.lower()]
+        result['refund'] = value - sum(int(log['data'][2:66], 16) for log in logs)
+
+    if not result['success']:
+        call = {'from': account.address, 'to': crowdsale, 'value': hex(tx['value']), 'gas': hex(tx['gas']), 'data': Web3.toHex(data)}
+
+        try:
+            await client.request('eth_call', call, hex(result['block'] - 1))
+            result['reason'] = 'unknown'
+        except RpcError as e:
+            result['reason'] = revert_reason(e.error)
+
+    return result
+
+
+async def run_load(client, crowdsale, accounts, plan, args):
+    """
+    Sends the planned purchases, each account in order and up to `args.concurrency` at a time.
+    With `args.stop_when_capped`, an account gives up its remaining purchases once the cap is reached.
+    @return The results of the purchases and the number of purchases given up
+    """
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = []
+    skipped = 0
+
+    async def account_purchases(account):
+        nonlocal skipped
+        nonce = quantity(await client.request('eth_getTransactionCount', account.address, 'pending'))
+
+        for i, (path, value) in enumerate(plan[account.address]):
+            async with semaphore:
+                if args.stop_when_capped and int(await client.request('eth_call', {'to': crowdsale, 'data': CAP_REACHED_SELECTOR}, 'latest'), 16):
+                    skipped += len(plan[account.address]) - i
+                    return
+
+                results.append(await purchase(client, account, nonce, path, value, crowdsale, args))
+
+            nonce += 1
+
+    await asyncio.gather(*[account_purchases(account) for account in accounts])
+    return results, skipped
+
+
+def summarize(results, seconds, skipped=0):
+    """
+    Aggregates the results of a run into the report written as JSON.
+    """
+
+    succeeded = [result for result in results if result['success']]
+    filled = [result for result in succeeded if result.get('refund')]
+    reverted = [result for result in results if not result['success']]
+    latencies = sorted(result['latency'] * 1000 for result in results)
+    reverts = {}
+
+    for result in reverted:
+        category = reverts.setdefault(classify(result['reason']), {'count': 0, 'reasons': {}})
+        category['count'] += 1
+        category['reasons'][result['reason']] = category['reasons'].get(result['reason'], 0) + 1
+
+    for category in reverts.values():
+        category['rate'] = category['count'] / len(results)
+
+    return {
+        'transactions': len(results),
+        'succeeded': len(succeeded),
+        'reverted': len(reverted),
+        'skipped': skipped,
+        'partially_filled': len(filled),
+        'refunded_wei': sum(result['refund'] for result in filled),
+        'seconds': seconds,
+        'transactions_per_second': len(results) / seconds if seconds else None,
+        'successes_per_second': len(succeeded) / seconds if seconds else None,
+        'latency_ms': dict([('p{}'.format(p), percentile(latencies, p / 100)) for p in PERCENTILES] + [('max', latencies[-1] if latencies else None)]),
+        'gas_per_success': sum(result['gas'] for result in succeeded) / len(succeeded) if succeeded else None,
+        'gas_wasted_on_reverts': sum(result['gas'] for result in reverted),
+        'revert_rate': len(reverted) / len(results) if results else None,
+        'reverts': reverts,
+        'paths': {path: sum(1 for result in results if result['path'] == path) for path in PATHS},
+    }
+
+
+async def load(args):
+    """
+    Sets up the sale, runs the load and returns the report.
+    """
+
+    w3 = Web3(HTTPProvider(args.rpc))
+    accounts = make_accounts(args.accounts, args.seed)
+    plan = plan_purchases(accounts, args.purchases, parse_mix(args.mix), args.seed, to_wei(args.value), args.value_spread)
+    client = RpcClient(args.rpc, args.connections)
+
+    try:
+        funding = max(sum(value + args.gas * args.gas_price for path, value in purchases) for purchases in plan.values())
+        await fund(client, w3.eth.accounts[0], accounts, funding, args.poll_interval)
+
+        # The sale is set up after funding, so that the period of a timed sale starts with the load.
+        sale, closing = setup_sale(w3, args.contract, accounts, args)
+
+        if args.contract == 'timed_crowdsale':
+            await asyncio.sleep(max(0, closing - args.duration - time.time()))
+
+        start = time.monotonic()
+        results, skipped = await run_load(client, sale.address, accounts, plan, args)
+        seconds = time.monotonic() - start
+    finally:
+        client.close()
+
+    report = summarize(results, seconds, skipped)
+    report['config'] = {key: value for key, value in vars(args).items() if key != 'output'}
+    report['crowdsale'] = sale.address
+
+    return report
+
+
+def format_report(report):
+    lines = [
+        '{} purchases in {:.2f} seconds, {:.1f} per second.'.format(report['transactions'], report['seconds'], report['transactions_per_second'] or 0),
+        'Latency (ms): ' + ', '.join('{} {:.0f}'.format(name, value) for name, value in report['latency_ms'].items() if value is not None),
+        'Succeeded: {}, {} gas each on average.'.format(report['succeeded'], round(report['gas_per_success'] or 0)),
+        'Reverted: {}, {} gas in total.'.format(report['reverted'], report['gas_wasted_on_reverts']),
+    ]
+
+    if report['partially_filled']:
+        lines.append('Partially filled: {}, {} wei refunded.'.format(report['partially_filled'], report['refunded_wei']))
+
+    if report['skipped']:
+        lines.append('Skipped after the cap was reached: {}.'.format(report['skipped']))
+
+    for category, details in sorted(report['reverts'].items()):
+        lines.append('    {}: {} ({:.1%})'.format(category, details['count'], details['rate']))
+
+    return '\n'.join(lines)
+
+
+def parser():
+    parser = argparse.ArgumentParser(description='Fires concurrent purchases at a crowdsale on a local development chain.')
+    parser.add_argument('contract', choices=CONTRACTS, help='crowdsale to deploy and load')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--accounts', type=int, default=100, help='number of buyers funded for the run')
+    parser.add_argument('--purchases', type=int, default=1000, help='number of purchases, spread over the accounts')
+    parser.add_argument('--concurrency', type=int, default=100, help='number of purchases in flight at the same time')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS, help='number of HTTP connections to the node')
+    parser.add_argument('--mix', default='buyTokens=1,__default__=1', help='weights of the purchase paths, e.g. buyTokens=3,__default__=1')
+    parser.add_argument('--value', type=Decimal, default=Decimal('0.01'), help='ether paid by each purchase')
+    parser.add_argument('--value-spread', type=float, default=0, help='fraction by which the ether of each purchase varies around --value')
+    parser.add_argument('--cap', type=Decimal, help='cap of capped_crowdsale in ether, half of the purchases by default')
+    parser.add_argument('--partial-fills', action='store_true', help='fill the purchase which crosses a cap up to the cap and refund the excess')
+    parser.add_argument('--stop-when-capped', action='store_true', help='check capReached before each purchase and stop buying once it is reached')
+    parser.add_argument('--user-cap', type=Decimal, default=Decimal('0.02'), help='cap of each account of individually_capped_crowdsale in ether')
+    parser.add_argument('--whitelisted', type=float, default=0.9, help='fraction of the accounts whitelisted by whitelisted_crowdsale')
+    parser.add_argument('--duration', type=int, default=10, help='seconds timed_crowdsale stays open')
+    parser.add_argument('--gas', type=int, default=DEFAULT_GAS, help='gas limit of each purchase')
+    parser.add_argument('--gas-price', type=int, default=10 ** 9, help='gas price of each purchase in wei')
+    parser.add_argument('--poll-interval', type=float, default=0.2, help='longest wait between receipt polls in seconds')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the accounts and of the purchase mix')
+    parser.add_argument('--output', help='write the report to this JSON file')
+
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser().error(str(e))
+
+    if args.partial_fills and args.contract not in ('capped_crowdsale', 'individually_capped_crowdsale'):
+        parser().error('--partial-fills only applies to capped_crowdsale and individually_capped_crowdsale')
+
+    if args.stop_when_capped and args.contract != 'capped_crowdsale':
+        parser().error('--stop-when-capped only applies to capped_crowdsale')
+
+    report = asyncio.get_event_loop().run_until_complete(load(args))
+    print(format_report(report), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
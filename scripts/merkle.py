@@ -0,0 +1,224 @@
+"""
+Builds Merkle trees of investors for WhitelistedCrowdsale and
+IndividuallyCappedCrowdsale.
+
+The owner commits the root of a whitelist tree with `setWhitelistRoot`, and
+each investor buys with `buyTokensWithProof` using the proof generated here.
+Likewise, the root of a caps tree is committed with `setCapsRoot` and used by
+`buyTokensWithCapProof`.
+
+    python -m scripts.merkle whitelist investors.txt --output whitelist.json
+    python -m scripts.merkle caps caps.csv --output caps.json
+
+A whitelist file holds one address per line and a caps file holds one
+`address,cap` pair per line, the cap in wei. Blank lines and lines starting
+with `#` are ignored. The output is a JSON document with the root and the
+proof of every address.
+
+Whitelist leaves are `keccak256(address)` and cap leaves are
+`keccak256(address ++ cap)`, each value padded to 32 bytes. Pairs are hashed
+in ascending order, matching `hashPair` in the contracts.
+"""
+
+import argparse
+import json
+import sys
+
+from .evm import address_bytes, checksum_address, keccak
+
+
+# The length of the proof arrays accepted by the contracts, which allows
+# trees of up to 2 ** 20 (about a million) leaves.
+MAX_PROOF_LENGTH = 20
+
+ZERO_HASH = b'\0' * 32
+
+
+def address_leaf(address):
+    return keccak(b'\0' * 12 + address_bytes(address))
+
+
+def cap_leaf(address, cap):
+    return keccak(b'\0' * 12 + address_bytes(address) + cap.to_bytes(32, 'big'))
+
+
+def hash_pair(a, b):
+    return keccak(a + b) if a <= b else keccak(b + a)
+
+
+class MerkleTree:
+    """
+    A Merkle tree whose odd nodes are promoted to the next level unchanged.
+    """
+
+    def __init__(self, leaves):
+        if not leaves:
+            raise ValueError('Cannot build a Merkle tree without leaves.')
+
+        if len(leaves) > 2 ** MAX_PROOF_LENGTH:
+            raise ValueError('Too many leaves, the contracts accept at most {}.'.format(2 ** MAX_PROOF_LENGTH))
+
+        self.levels = [list(leaves)]
+
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append([
+                hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ])
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def proof(self, index):
+        """
+        Returns the sibling hashes from the leaf at `index` up to the root.
+        """
+
+        proof = []
+
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+
+            if sibling < len(level):
+                proof.append(level[sibling])
+
+            index //= 2
+
+        return proof
+
+
+def verify(leaf, proof, root):
+    computed = leaf
+
+    for node in proof:
+        computed = hash_pair(computed, node)
+
+    return computed == root
+
+
+def contract_proof(proof):
+    """
+    Pads a proof to the fixed length of the contracts' bytes32[20] argument.
+    @return The padded proof and its actual length
+    """
+
+    return proof + [ZERO_HASH] * (MAX_PROOF_LENGTH - len(proof)), len(proof)
+
+
+def unique_addresses(addresses):
+    """
+    Returns the checksummed addresses without duplicates, in their original order.
+    """
+
+    seen = set()
+    result = []
+
+    for value in map(address_bytes, addresses):
+        if value not in seen:
+            seen.add(value)
+            result.append(checksum_address(value))
+
+    return result
+
+
+def whitelist_tree(addresses):
+    """
+    Builds the whitelist tree of `addresses`.
+    @return The tree and a dict of address -> proof
+    """
+
+    addresses = unique_addresses(addresses)
+    tree = MerkleTree([address_leaf(address) for address in addresses])
+
+    return tree, {address: tree.proof(i) for i, address in enumerate(addresses)}
+
+
+def caps_tree(caps):
+    """
+    Builds the caps tree of `caps`, a list of (address, cap in wei) pairs.
+    @return The tree and a dict of address -> (cap, proof)
+    """
+
+    entries = {}
+
+    for address, cap in caps:
+        address = checksum_address(address_bytes(address))
+
+        if address in entries:
+            raise ValueError('The address {} has more than one cap.'.format(address))
+
+        entries[address] = cap
+
+    tree = MerkleTree([cap_leaf(address, cap) for address, cap in entries.items()])
+
+    return tree, {address: (cap, tree.proof(i)) for i, (address, cap) in enumerate(entries.items())}
+
+
+def read_caps(path):
+    for line in read_lines(path):
+        address, cap = (value.strip() for value in line.split(','))
+        yield address, int(cap)
+
+
+def read_lines(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+
+            if line and not line.startswith('#'):
+                yield line
+
+
+def to_hex(proof):
+    return ['0x' + node.hex() for node in proof]
+
+
+def to_json(tree, proofs):
+    return {
+        'root': '0x' + tree.root.hex(),
+        'proofs': {address: to_hex(proof) for address, proof in proofs.items()},
+    }
+
+
+def caps_to_json(tree, caps):
+    return {
+        'root': '0x' + tree.root.hex(),
+        'caps': {address: {'cap': str(cap), 'proof': to_hex(proof)} for address, (cap, proof) in caps.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Builds Merkle trees and proofs for the crowdsale contracts.')
+    commands = parser.add_subparsers(dest='command')
+    whitelist = commands.add_parser('whitelist', help='build a whitelist tree from a file with one address per line')
+    whitelist.add_argument('input')
+    whitelist.add_argument('--output', help='write the tree to this file instead of the standard output')
+    caps = commands.add_parser('caps', help='build a caps tree from a file with one "address,cap" pair per line')
+    caps.add_argument('input')
+    caps.add_argument('--output', help='write the tree to this file instead of the standard output')
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.error('Choose a command.')
+
+    if args.command == 'whitelist':
+        tree, proofs = whitelist_tree(list(read_lines(args.input)))
+        document = json.dumps(to_json(tree, proofs), indent=2)
+    else:
+        tree, proofs = caps_tree(list(read_caps(args.input)))
+        document = json.dumps(caps_to_json(tree, proofs), indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+    print('Root {} with {} leaves.'.format('0x' + tree.root.hex(), len(proofs)), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+Decodes batches of TokenPurchase logs into columns of NumPy arrays, for
+reprocessing the purchases of a sale without decoding each log in Python.
+
+    python -m scripts.purchases purchases.npz 0x1234... 0x5678... --rpc http://localhost:8545 --start-block 4000000
+    python -m scripts.purchases --benchmark 100000
+
+`TokenPurchase(_purchaser, _beneficiary, _value, _amount)` always has the same
+layout: the signature and the two addresses in the topics and the two uint256
+values in the data. The topics and the data of a whole batch are joined into two
+buffers which NumPy views as rows of 96 and 64 bytes, so the addresses are
+slices of the rows and the values are read as big-endian 64 bit words. A value
+column is an (n, 4) `uint64` array of those words, most significant first, so
+that every uint256 stays in a NumPy array. `uint64_values` returns the lowest
+words, which hold the whole values when they fit, as wei amounts below 18 ether
+do, and `python_ints` converts a column to Python ints when they do not.
+
+The benchmark compares the decoder with the generic ABI decoding of web3 on
+synthetic logs.
+"""
+
+import argparse
+import asyncio
+import collections
+import random
+import sys
+import time
+
+import numpy as np
+from hexbytes import HexBytes
+from web3.utils.events import get_event_data
+
+from .evm import checksum_address
+from .indexer import DEFAULT_BATCH_SIZE, TOKEN_PURCHASE_TOPIC
+from .load import DEFAULT_CONNECTIONS, RpcClient
+
+
+COLUMNS = ('purchaser', 'beneficiary', 'value', 'amount', 'block', 'logIndex')
+
+Purchases = collections.namedtuple('Purchases', COLUMNS)
+
+TOKEN_PURCHASE_ABI = {
+    'anonymous': False,
+    'inputs': [
+        {'indexed': True, 'name': '_purchaser', 'type': 'address'},
+        {'indexed': True, 'name': '_beneficiary', 'type': 'address'},
+        {'indexed': False, 'name': '_value', 'type': 'uint256'},
+        {'indexed': False, 'name': '_amount', 'type': 'uint256'},
+    ],
+    'name': 'TokenPurchase',
+    'type': 'event',
+}
+
+TOPIC = np.frombuffer(bytes.fromhex(TOKEN_PURCHASE_TOPIC[2:]), dtype=np.uint8)
+
+
+def join(values):
+    """
+    Joins hex strings, as returned by a node, or bytes, as formatted by web3, into one buffer.
+    """
+
+    if values and isinstance(values[0], str):
+        return bytes.fromhex(''.join(value[2:] for value in values))
+
+    return b''.join(values)
+
+
+def quantities(values):
+    """
+    Returns the block numbers or log indexes of a batch, hex strings or ints, as a uint64 array.
+    """
+
+    if values and isinstance(values[0], str):
+        values = [int(value, 16) for value in values]
+
+    return np.array(values, dtype=np.uint64).reshape(len(values))
+
+
+def uint256_column(words):
+    """
+    Converts an (n, 4) array of big-endian 64 bit words, the uint256 values of a column, to native byte order.
+    @return An (n, 4) uint64 array, the most significant word first
+    """
+
+    return words.astype(np.uint64)
+
+
+def uint64_values(column):
+    """
+    Returns the values of a uint256 column as a uint64 array.
+    @raise OverflowError If a value does not fit in 64 bits
+    """
+
+    if column[:, :3].any():
+        raise OverflowError('Values do not fit in 64 bits, convert them with python_ints.')
+
+    return column[:, 3]
+
+
+def python_ints(column):
+    """
+    Converts a uint256 column to a list of Python ints, one value at a time.
+    """
+
+    return [(high << 192) | (upper << 128) | (lower << 64) | low for high, upper, lower, low in column.tolist()]
+
+
+def decode_purchases(entries):
+    """
+    Decodes TokenPurchase log entries, either raw from eth_getLogs or formatted by web3.
+    @return A `Purchases` tuple of columns: the addresses as (n, 20) uint8 arrays,
+            the values and amounts as (n, 4) uint64 arrays of 64 bit words, the blocks and log indexes as uint64 arrays
+    """
+
+    count = len(entries)
+
+    if any(len(entry['topics']) != 3 for entry in entries):
+        raise ValueError('TokenPurchase logs have 3 topics.')
+
+    topics = join([topic for entry in entries for topic in entry['topics']])
+    data = join([entry['data'] for entry in entries])
+
+    if len(data) != 64 * count:
+        raise ValueError('TokenPurchase logs have 64 bytes of data.')
+
+    topics = np.frombuffer(topics, dtype=np.uint8).reshape(count, 96)
+    words = np.frombuffer(data, dtype='>u8').reshape(count, 8)
+    mismatched = np.flatnonzero((topics[:, :32] != TOPIC).any(axis=1))
+
+    if mismatched.size:
+        raise ValueError('Log {} is not a TokenPurchase event.'.format(mismatched[0]))
+
+    return Purchases(
+        purchaser=topics[:, 44:64],
+        beneficiary=topics[:, 76:96],
+        value=uint256_column(words[:, 0:4]),
+        amount=uint256_column(words[:, 4:8]),
+        block=quantities([entry['blockNumber'] for entry in entries]),
+        logIndex=quantities([entry['logIndex'] for entry in entries]),
+    )
+
+
+def decode_generic(entries):
+    """
+    Decodes TokenPurchase log entries formatted by web3 one by one with its ABI decoder, the path the columns replace.
+    """
+
+    return [get_event_data(TOKEN_PURCHASE_ABI, entry) for entry in entries]
+
+
+def checksum_addresses(column):
+    """
+    Returns the checksummed addresses of an (n, 20) address column.
+    """
+
+    return [checksum_address(value) for value in map(bytes, column)]
+
+
+async def fetch_logs(client, crowdsales, start, end, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Requests the raw TokenPurchase logs of `crowdsales` from `start` to `end`, `batch_size` blocks per request, concurrently.
+    @return The log entries in chain order
+    """
+
+    ranges = [(first, min(first + batch_size - 1, end)) for first in range(start, end + 1, batch_size)]
+    results = await asyncio.gather(*(client.request('eth_getLogs', {
+        'fromBlock': hex(first),
+        'toBlock': hex(last),
+        'address': crowdsales,
+        'topics': [TOKEN_PURCHASE_TOPIC],
+    }) for first, last in ranges))
+
+    return [entry for entries in results for entry in entries]
+
+
+def synthetic_logs(count, seed=0):
+    """
+    Generates `count` TokenPurchase log entries as formatted by web3. The values are below 2 ** 60 wei
+    and the amounts are bought at rates up to 1000, so that some of them exceed 64 bits.
+    """
+
+    generator = random.Random(seed)
+    topic = HexBytes(TOKEN_PURCHASE_TOPIC)
+    entries = []
+
+    for i in range(count):
+        addresses = [HexBytes(bytes(12) + generator.getrandbits(160).to_bytes(20, 'big')) for _ in range(2)]
+        value = generator.getrandbits(60)
+        amount = value * generator.randrange(1, 1001)
+
+        entries.append({
+            'address': '0x' + '12' * 20,
+            'blockHash': HexBytes(bytes(32)),
+            'blockNumber': 4000000 + i // 10,
+            'data': '0x' + value.to_bytes(32, 'big').hex() + amount.to_bytes(32, 'big').hex(),
+            'logIndex': i % 10,
+            'topics': [topic] + addresses,
+            'transactionHash': HexBytes(i.to_bytes(32, 'big')),
+            'transactionIndex': i % 10,
+        })
+
+    return entries
+
+
+def raw_logs(entries):
+    """
+    Converts entries formatted by web3 back to the hex strings returned by eth_getLogs.
+    """
+
+    return [dict(entry, blockNumber=hex(entry['blockNumber']), logIndex=hex(entry['logIndex']), topics=[topic.hex() for topic in entry['topics']]) for entry in entries]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def benchmark(count, seed=0):
+    """
+    Decodes `count` synthetic logs with both decoders.
+    @return An ordered dict of path -> microseconds per log
+    """
+
+    entries = synthetic_logs(count, seed)
+    raw = raw_logs(entries)
+
+    return collections.OrderedDict((
+        ('generic', timed(decode_generic, entries) * 1e6 / count),
+        ('vectorized', timed(decode_purchases, entries) * 1e6 / count),
+        ('vectorized (raw)', timed(decode_purchases, raw) * 1e6 / count),
+    ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Decodes the TokenPurchase logs of crowdsales into NumPy columns.')
+    parser.add_argument('output', nargs='?', help='.npz file to write the columns to')
+    parser.add_argument('crowdsales', nargs='*', help='addresses of the crowdsales')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--start-block', type=int, default=0, help='first block to read')
+    parser.add_argument('--end-block', type=int, help='last block to read, the latest by default')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='number of blocks requested per eth_getLogs call')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS, help='requests sent at the same time')
+    parser.add_argument('--benchmark', type=int, metavar='COUNT', help='compare the decoders on COUNT synthetic logs instead')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        for path, micros in benchmark(args.benchmark).items():
+            print('{:<18} {:>8.2f} us/log'.format(path, micros))
+
+        return 0
+
+    if not args.output or not args.crowdsales:
+        parser.error('the output file and at least one crowdsale are required')
+
+    client = RpcClient(args.rpc, args.connections)
+    crowdsales = [checksum_address(bytes.fromhex(address[2:])) for address in args.crowdsales]
+
+    async def fetch():
+        end = args.end_block if args.end_block is not None else int(await client.request('eth_blockNumber'), 16)
+        return await fetch_logs(client, crowdsales, args.start_block, end, args.batch_size)
+
+    try:
+        entries = asyncio.get_event_loop().run_until_complete(fetch())
+    finally:
+        client.close()
+
+    np.savez(args.output, **decode_purchases(entries)._asdict())
+    print('Decoded {} purchases into {}.'.format(len(entries), args.output))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Reads the state of many crowdsales in one `eth_call`, through
+`contracts/crowdsale_reader.v.py`, instead of calling every getter of every sale.
+
+    python -m scripts.reader 0xSale... 0xSale... --reader 0xReader... --rpc http://localhost:8545
+    python -m scripts.reader 0xSale... 0xSale... --reader 0xReader... --interval 15 --json
+
+    python -m scripts.reader 0xSale... --source my_crowdsale.v.py --reader 0xReader...
+
+Each sale is identified once by its runtime code, and a proxy created by
+`scripts/factory.py` by the code of its template, which tells the reader the
+getters it has. Other crowdsales, such as those generated by
+`scripts/generate.py`, are identified by compiling their sources given with
+`--source`, and read with the getters found in their ABI. Up to 50 sales are
+read in one call; longer lists are split into calls sent concurrently, at the
+same block. Without `--reader`, a reader is deployed with the first unlocked
+account of the node and its address printed.
+"""
+
+import argparse
+import collections
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import HTTPProvider, Web3
+
+from . import factory
+from .compilation import compile_contract, compile_source
+
+
+READER = 'crowdsale_reader'
+
+# Getters to call, as defined by the reader contract.
+WEI_RAISED = 1
+RATE = 2
+CURRENT_RATE = 4
+CAP = 8
+TIMES = 16
+REMAINING_TOKENS = 32
+
+# The functions a contract must have for the reader to call each getter.
+FIELD_FUNCTIONS = (
+    (WEI_RAISED, {'weiRaised'}),
+    (RATE, {'rate'}),
+    (CURRENT_RATE, {'getCurrentRate'}),
+    (CAP, {'cap', 'capReached'}),
+    (TIMES, {'openingTime', 'closingTime', 'hasClosed'}),
+    (REMAINING_TOKENS, {'getRemainingTokens'}),
+)
+
+# The getters of the contracts of this repository, as `abi_fields` finds them.
+CONTRACT_FIELDS = {
+    'allowance_crowdsale': WEI_RAISED | RATE | REMAINING_TOKENS,
+    'capped_crowdsale': WEI_RAISED | RATE | CAP,
+    'crowdsale': WEI_RAISED | RATE,
+    'increasing_price_crowdsale': WEI_RAISED | CURRENT_RATE | TIMES,
+    'individually_capped_crowdsale': WEI_RAISED | RATE,
+    'minted_crowdsale': WEI_RAISED | RATE,
+    'post_delivery_crowdsale': WEI_RAISED | RATE | TIMES,
+    'tiered_price_crowdsale': WEI_RAISED | CURRENT_RATE | TIMES,
+    'timed_crowdsale': WEI_RAISED | RATE | TIMES,
+    'whitelisted_crowdsale': WEI_RAISED | RATE,
+}
+
+# The columns of each sale returned by the reader, and the getters which fill them.
+COLUMNS = ('weiRaised', 'rate', 'cap', 'capReached', 'openingTime', 'closingTime', 'hasClosed', 'remainingTokens')
+COLUMN_FIELDS = (WEI_RAISED, RATE | CURRENT_RATE, CAP, CAP, TIMES, TIMES, TIMES, REMAINING_TOKENS)
+BOOLEAN_COLUMNS = ('capReached', 'hasClosed')
+
+MAX_SALES = 50
+
+# Enough for 50 sales with every getter, and below the block gas limit of Ganache,
+# which some nodes use as the limit of a call.
+CALL_GAS = 6000000
+
+ZERO_ADDRESS = '0x' + '0' * 40
+
+Status = collections.namedtuple('Status', ('address', 'contract') + COLUMNS)
+
+
+@functools.lru_cache(maxsize=None)
+def runtime_codes():
+    return {bytes.fromhex(compile_contract(name)['bytecode_runtime'][2:]): name for name in CONTRACT_FIELDS}
+
+
+def abi_fields(abi):
+    """
+    Returns the getters the reader can call on a contract, from the functions of its ABI.
+    """
+
+    functions = {entry['name'] for entry in abi if entry.get('type') == 'function'}
+
+    return sum(field for field, names in FIELD_FUNCTIONS if names <= functions)
+
+
+def load_sources(paths):
+    """
+    Compiles the sources of crowdsales which are not in this repository, e.g. generated
+    by `scripts/generate.py`, each named after its file.
+    @return A dict of runtime code -> name, and a dict of name -> getters found in the ABI
+    """
+
+    codes, fields = {}, {}
+
+    for path in paths:
+        name = os.path.basename(path).split('.')[0]
+
+        with open(path) as f:
+            interface = compile_source(f.read())
+
+        codes[bytes.fromhex(interface['bytecode_runtime'][2:])] = name
+        fields[name] = abi_fields(interface['abi'])
+
+    return codes, fields
+
+
+def identify(w3, address, codes=None):
+    """
+    Returns the name of the contract deployed at `address`, looking through proxies.
+    @param codes Runtime codes of other contracts and their names, as returned by `load_sources`
+    """
+
+    code = bytes(w3.eth.getCode(address))
+    template = factory.proxy_template(code)
+
+    if template:
+        code = bytes(w3.eth.getCode(template))
+
+    names = runtime_codes()
+
+    if codes:
+        names = {**names, **codes}
+
+    if code not in names:
+        raise ValueError('{} is not a crowdsale of this repository.'.format(address))
+
+    return names[code]
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_chunks(function, items, size, workers=8):
+    """
+    Calls `function` with consecutive chunks of at most `size` items, several at a time,
+    and joins the lists it returns in the order of the items.
+    """
+
+    parts = chunks(list(items), size)
+
+    if len(parts) <= 1:
+        return [result for part in parts for result in function(part)]
+
+    with ThreadPoolExecutor(min(workers, len(parts))) as executor:
+        return [result for results in executor.map(function, parts) for result in results]
+
+
+def decode_status(address, name, values, contract_fields=CONTRACT_FIELDS):
+    fields = contract_fields[name]
+    columns = {}
+
+    for column, field, value in zip(COLUMNS, COLUMN_FIELDS, values):
+        if not fields & field:
+            value = None
+        elif column in BOOLEAN_COLUMNS:
+            value = value == 1
+
+        columns[column] = value
+
+    return Status(address, name, **columns)
+
+
+def read_statuses(reader, sales, block_identifier=None, workers=8, contract_fields=CONTRACT_FIELDS):
+    """
+    Reads the state of `sales`, a list of (address, contract name) pairs.
+    @param contract_fields The getters of each contract, including those of `load_sources`
+    @return A list of `Status`, None for the getters a contract does not have
+    """
+
+    if block_identifier is None:
+        # Every chunk reads the same block.
+        block_identifier = reader.web3.eth.blockNumber if len(sales) > MAX_SALES else 'latest'
+
+    def read(chunk):
+        count = len(chunk)
+        addresses = [address for address, name in chunk] + [ZERO_ADDRESS] * (MAX_SALES - count)
+        fields = [contract_fields[name] for address, name in chunk] + [0] * (MAX_SALES - count)
+        values = reader.functions.getStatuses(count, addresses, fields).call({'gas': CALL_GAS}, block_identifier=block_identifier)
+        width = len(COLUMNS)
+
+        return [decode_status(address, name, values[i * width:(i + 1) * width], contract_fields) for i, (address, name) in enumerate(chunk)]
+
+    return map_chunks(read, sales, MAX_SALES, workers)
+
+
+def format_table(statuses):
+    lines = ['{:<42} {:<30} '.format('address', 'contract') + ' '.join('{:>15}'.format(column) for column in COLUMNS)]
+
+    for status in statuses:
+        values = ('-' if value is None else str(value) for value in status[2:])
+        lines.append('{:<42} {:<30} '.format(status.address, status.contract) + ' '.join('{:>15}'.format(value) for value in values))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reads the state of many crowdsales in one call.')
+    parser.add_argument('sales', nargs='+', help='addresses of the crowdsales')
+    parser.add_argument('--reader', help='address of a deployed crowdsale_reader, deployed if omitted')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--interval', type=float, default=0, help='seconds between reads, read once if omitted')
+    parser.add_argument('--json', action='store_true', help='print JSON lines instead of a table')
+    parser.add_argument('--source', action='append', default=[], help='Vyper source of a crowdsale not in this repository, e.g. generated')
+    args = parser.parse_args(argv)
+
+    w3 = Web3(HTTPProvider(args.rpc))
+
+    if args.reader:
+        reader = factory.at(w3, READER, Web3.toChecksumAddress(args.reader))
+    else:
+        reader = factory.deploy(w3, READER)
+        print('Deployed the reader at {}.'.format(reader.address), file=sys.stderr)
+
+    codes, fields = load_sources(args.source)
+    contract_fields = {**CONTRACT_FIELDS, **fields}
+
+    try:
+        sales = [(address, identify(w3, address, codes)) for address in map(Web3.toChecksumAddress, args.sales)]
+    except ValueError as e:
+        parser.error(str(e))
+
+    while True:
+        statuses = read_statuses(reader, sales, contract_fields=contract_fields)
+
+        if args.json:
+            print(json.dumps([status._asdict() for status in statuses]))
+        else:
+            print(format_table(statuses))
+
+        sys.stdout.flush()
+
+        if not args.interval:
+            return 0
+
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Runs the Python tests in `test/python` on an in-process EVM, one pytest
+process per file, spread over the CPU cores, and reports the wall-clock time
+of every file.
+
+    python -m scripts.run_tests                 # all files, one job per core
+    python -m scripts.run_tests --jobs 2
+    python -m scripts.run_tests test/python/test_crowdsale.py
+
+Files are started from the largest to the smallest, which keeps the slow files
+from finishing last on an otherwise idle machine. The command exits with a
+non-zero status when any file fails, after printing the output of that file.
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = os.path.join(ROOT, 'test', 'python')
+
+
+def collect_files():
+    return sorted(glob.glob(os.path.join(TEST_DIR, 'test_*.py')), key=os.path.getsize, reverse=True)
+
+
+def run_file(path):
+    """
+    Runs the tests of one file in a separate pytest process.
+    @return A (path, seconds, return code, output) tuple
+    """
+
+    start = time.time()
+    process = subprocess.run(
+        [sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider', path],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True,
+    )
+
+    return path, time.time() - start, process.returncode, process.stdout
+
+
+def result_failed(code):
+    # Exit code 5 means that a file has no tests, which is not a failure.
+    return code not in (0, 5)
+
+
+def run(paths, jobs):
+    # The work happens in the pytest processes, threads are enough to wait for them.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run_file, paths))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs the Python tests in parallel and reports the time of every file.')
+    parser.add_argument('files', nargs='*', help='test files to run, all files in test/python by default')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of files run at the same time')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    results = run(args.files or collect_files(), args.jobs)
+    failed = [result for result in results if result_failed(result[2])]
+
+    for path, seconds, code, output in failed:
+        print(output)
+
+    print('{:<45} {:>8}  {}'.format('file', 'seconds', 'result'))
+
+    for path, seconds, code, output in sorted(results, key=lambda result: -result[1]):
+        status = 'FAILED' if result_failed(code) else 'passed'
+        print('{:<45} {:>8.1f}  {}'.format(os.path.relpath(path, ROOT), seconds, status))
+
+    print('{} files in {:.1f} seconds with {} jobs.'.format(len(results), time.time() - start, args.jobs))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+The deployment scenario shared by the gas benchmark and the Python tests: a
+token, a crowdsale and the well-known accounts which buy from it, on an
+in-process EVM.
+"""
+
+from .evm import checksum_address, compile_source, to_bytes32
+from .generate import Specification, generate
+
+
+ZERO_ADDRESS = '0x' + '0' * 40
+RATE = 1
+VALUE = 10 ** 18
+TOKEN_SUPPLY = 10 ** 27
+LIST_LENGTH = 50
+
+
+def addresses(count, offset=0):
+    """
+    Returns `count` distinct addresses that hold no state on the chain.
+    """
+
+    return [checksum_address((0x1000000 + offset + i).to_bytes(20, 'big')) for i in range(count)]
+
+
+def padded(items, length=LIST_LENGTH, filler=ZERO_ADDRESS):
+    return items + [filler] * (length - len(items))
+
+
+class Sale:
+    """
+    Holds the deployed contracts and well-known accounts of one scenario.
+    """
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.owner, self.investor, self.purchaser, self.buyer = chain.accounts[0:4]
+        self.wallet = chain.accounts[9]
+        self.token = None
+        self.crowdsale = None
+
+    def deploy_token(self):
+        self.token = self.chain.deploy('erc20_standard_token', to_bytes32('Name'), to_bytes32('SYMBOL'), TOKEN_SUPPLY, 18)
+        return self.token
+
+    def fund(self):
+        self.chain.transact(self.token.functions.transfer(self.crowdsale.address, TOKEN_SUPPLY))
+
+    def opening_and_closing(self):
+        opening = self.chain.now() + 3600
+        return opening, opening + 7 * 24 * 3600
+
+
+def deploy_generated(chain, features=(), source='transfer'):
+    """
+    Deploys the contract generated for `features` and `source`, ready for purchases
+    by the investor and the buyer.
+    @return The sale
+    """
+
+    spec = Specification(features, source)
+    sale = Sale(chain)
+
+    if source == 'minted':
+        sale.token = chain.deploy('mintable_token', to_bytes32('Name'), to_bytes32('SYMBOL'), 0, TOKEN_SUPPLY, 18)
+    else:
+        sale.deploy_token()
+
+    opening, closing = sale.opening_and_closing()
+    values = {
+        '_openingTime': opening,
+        '_closingTime': closing,
+        '_rate': RATE,
+        '_wallet': sale.wallet,
+        '_token': sale.token.address,
+        '_cap': 100 * VALUE,
+        '_tokenWallet': sale.owner,
+    }
+    sale.crowdsale = chain.deploy_interface(compile_source(generate(spec)), *[values[name] for name in spec.arguments()])
+
+    if source == 'minted':
+        chain.transact(sale.token.functions.transferOwnership(sale.crowdsale.address))
+    elif source == 'allowance':
+        chain.transact(sale.token.functions.approve(sale.crowdsale.address, TOKEN_SUPPLY))
+    else:
+        sale.fund()
+
+    if spec.has('whitelisted'):
+        chain.transact(sale.crowdsale.functions.addAddressesToWhitelist(2, padded([sale.investor, sale.buyer])))
+
+    if spec.has('individually_capped'):
+        chain.transact(sale.crowdsale.functions.setGroupCap(2, padded([sale.investor, sale.buyer]), 10 * VALUE))
+
+    if spec.has('timed'):
+        chain.time_travel(opening + 3600)
+
+    return sale
@@ -0,0 +1,264 @@
+"""
+Reads the state of a crowdsale straight from its storage with batched
+`eth_getStorageAt` requests, instead of calling a getter for every key.
+
+    python -m scripts.storage 0xSale... --investors investors.txt --rpc http://localhost:8545 --output state.json
+
+The slot of every variable is derived from the contract source the way Vyper
+0.1 lays out storage: the variables take consecutive slots in declaration order,
+the entry of a map at `key` is at keccak256(slot ++ key) and item `i` of a list
+at keccak256(slot) + i. Words which pack several values, e.g. the token and the
+rate, are split into named fields. The slots of every investor in the maps, e.g.
+the caps and contributions or the whitelist, are read up to `--batch-size` per
+request and several requests at a time, all at the same block.
+"""
+
+import argparse
+import asyncio
+import collections
+import functools
+import json
+import sys
+from decimal import Decimal
+
+from eth_utils import keccak, to_checksum_address
+from vyper.parser.global_context import GlobalContext
+from vyper.parser.parser import parse
+from vyper.types import BaseType, ListType, MappingType
+from web3 import HTTPProvider, Web3
+
+from . import reader
+from .compilation import contract_path
+from .load import RpcClient
+from .merkle import read_lines, unique_addresses
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CONNECTIONS = 8
+
+# Words packing several values, as (field, offset in bits, width in bits, type), from the comments of the contracts.
+TOKEN_AND_RATE = (('token', 96, 160, 'address'), ('rate', 0, 96, 'uint256'))
+WALLET_AND_SETTLEMENT = (('wallet', 96, 160, 'address'), ('accumulateFunds', 0, 1, 'bool'))
+OPENING_AND_CLOSING_TIME = (('openingTime', 128, 128, 'uint256'), ('closingTime', 0, 128, 'uint256'))
+
+PACKED_FIELDS = {
+    'contributionsAndCaps': (('contribution', 128, 128, 'uint256'), ('cap', 0, 128, 'uint256')),
+    'initialRateAndSlope': (('initialRate', 160, 96, 'uint256'), ('slope', 0, 160, 'uint256')),
+    'openingAndClosingTime': OPENING_AND_CLOSING_TIME,
+    'tiers': (('startTime', 128, 128, 'uint256'), ('rate', 0, 128, 'uint256')),
+    'tokenAndRate': TOKEN_AND_RATE,
+    'tokenWalletAndTranches': (('tokenWallet', 96, 160, 'address'), ('tranches', 0, 1, 'bool')),
+    'walletAndSettlement': WALLET_AND_SETTLEMENT,
+    'weiRaisedAndCap': (('weiRaised', 128, 128, 'uint256'), ('cap', 0, 128, 'uint256')),
+}
+
+# Contracts which use more bits of a word than the others.
+CONTRACT_PACKED_FIELDS = {
+    ('capped_crowdsale', 'walletAndSettlement'): WALLET_AND_SETTLEMENT + (('partialFills', 1, 1, 'bool'),),
+    ('individually_capped_crowdsale', 'walletAndSettlement'): WALLET_AND_SETTLEMENT + (('partialFills', 1, 1, 'bool'),),
+    ('individually_capped_crowdsale', 'contributionsAndCaps'): (('contribution', 129, 127, 'uint256'), ('capSet', 128, 1, 'bool'), ('cap', 0, 128, 'uint256')),
+}
+
+Variable = collections.namedtuple('Variable', ('name', 'slot', 'typ'))
+
+
+@functools.lru_cache(maxsize=None)
+def layout(name):
+    """
+    Derives the storage layout of the contract `name` from its source.
+    @return An ordered dict of variable name -> `Variable`, in the order of the slots
+    """
+
+    with open(contract_path(name)) as f:
+        context = GlobalContext.get_global_context(parse(f.read()))
+
+    records = sorted(context._globals.values(), key=lambda record: record.pos)
+    return collections.OrderedDict((record.name, Variable(record.name, record.pos, record.typ)) for record in records)
+
+
+def word(value):
+    return value.to_bytes(32, 'big')
+
+
+def encode_key(key, typ):
+    if typ.typ == 'address':
+        return b'\0' * 12 + bytes.fromhex(key[2:])
+
+    if typ.typ == 'bytes32':
+        return bytes(key)
+
+    if typ.typ == 'bool':
+        return word(int(key))
+
+    # Negative int128 keys are stored in two's complement.
+    return word(key % 2 ** 256)
+
+
+def slot(variable, *keys):
+    """
+    Computes the slot of `variable` at `keys`, a key for each map and an index for each list.
+    @return The slot and the type of the value stored there
+    """
+
+    position, typ = variable.slot, variable.typ
+
+    for count, key in enumerate(keys):
+        if isinstance(typ, MappingType):
+            position = int.from_bytes(keccak(word(position) + encode_key(key, typ.keytype)), 'big')
+            typ = typ.valuetype
+        elif isinstance(typ, ListType):
+            if not 0 <= key < typ.count:
+                raise IndexError('{} has {} items.'.format(variable.name, typ.count))
+
+            position = int.from_bytes(keccak(word(position)), 'big') + key
+            typ = typ.subtype
+        else:
+            raise TypeError('{} takes {} keys.'.format(variable.name, count))
+
+    if not isinstance(typ, BaseType):
+        raise TypeError('{} takes more than {} keys.'.format(variable.name, len(keys)))
+
+    return position, typ
+
+
+def decode(value, typ):
+    """
+    Decodes a storage word, as an int, to the Python value of the Vyper base type `typ`.
+    """
+
+    if typ == 'address':
+        return to_checksum_address(word(value)[12:])
+
+    if typ == 'bool':
+        return value != 0
+
+    if typ == 'bytes32':
+        return '0x' + word(value).hex()
+
+    if typ in ('int128', 'decimal'):
+        value = value - 2 ** 256 if value >= 2 ** 255 else value
+        return Decimal(value) / 10 ** 10 if typ == 'decimal' else value
+
+    return value
+
+
+def decode_variable(name, variable, value, typ):
+    """
+    Decodes the word of `variable`, split into a dict of fields if it packs several values.
+    """
+
+    fields = CONTRACT_PACKED_FIELDS.get((name, variable.name), PACKED_FIELDS.get(variable.name))
+
+    if fields is None:
+        return decode(value, typ.typ)
+
+    return collections.OrderedDict((field, decode((value >> offset) & (2 ** width - 1), kind)) for field, offset, width, kind in fields)
+
+
+async def fetch_slots(client, address, slots, block, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Reads `slots` of the contract at `address` in batch requests of `batch_size` slots, sent concurrently.
+    @return The value of each slot as an int
+    """
+
+    block = block if isinstance(block, str) else hex(block)
+    batches = [[('eth_getStorageAt', (address, hex(position), block)) for position in slots[i:i + batch_size]] for i in range(0, len(slots), batch_size)]
+    results = await asyncio.gather(*(client.batch(calls) for calls in batches))
+
+    return [int(value, 16) for values in results for value in values]
+
+
+def read_state(url, address, name, investors=(), block=None, batch_size=DEFAULT_BATCH_SIZE, connections=DEFAULT_CONNECTIONS):
+    """
+    Reads every variable of the crowdsale `name` deployed at `address`, with the
+    entries of `investors` in the maps keyed by address.
+    @return The block read and an ordered dict of variable name -> value, maps as dicts of investor -> value
+    """
+
+    client = RpcClient(url, connections)
+    variables = layout(name)
+    keys = []
+
+    for variable in variables.values():
+        if isinstance(variable.typ, MappingType):
+            if variable.typ.keytype.typ == 'address':
+                keys.extend((variable, (investor,)) for investor in investors)
+        elif isinstance(variable.typ, ListType):
+            keys.extend((variable, (i,)) for i in range(variable.typ.count))
+        else:
+            keys.append((variable, ()))
+
+    slots = [slot(variable, *key) for variable, key in keys]
+
+    async def fetch():
+        number = block if block is not None else int(await client.request('eth_blockNumber'), 16)
+        return number, await fetch_slots(client, address, [position for position, typ in slots], number, batch_size)
+
+    try:
+        block, values = asyncio.get_event_loop().run_until_complete(fetch())
+    finally:
+        client.close()
+
+    state = collections.OrderedDict()
+
+    for (variable, key), (position, typ), value in zip(keys, slots, values):
+        decoded = decode_variable(name, variable, value, typ)
+
+        if isinstance(variable.typ, MappingType):
+            state.setdefault(variable.name, collections.OrderedDict())[key[0]] = decoded
+        elif isinstance(variable.typ, ListType):
+            state.setdefault(variable.name, []).append(decoded)
+        else:
+            state[variable.name] = decoded
+
+    return block, state
+
+
+def to_json(value):
+    if isinstance(value, Decimal):
+        return str(value)
+
+    if isinstance(value, dict):
+        return collections.OrderedDict((key, to_json(item)) for key, item in value.items())
+
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reads the state of a crowdsale from its storage.')
+    parser.add_argument('crowdsale', help='address of the crowdsale')
+    parser.add_argument('--investors', help='file with one investor address per line, read from the maps')
+    parser.add_argument('--rpc', default='http://localhost:8545', help='JSON-RPC endpoint of the node')
+    parser.add_argument('--block', type=int, help='block to read, the latest by default')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='slots per batch request')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS, help='batch requests sent at the same time')
+    parser.add_argument('--output', help='JSON file to write, printed if omitted')
+    args = parser.parse_args(argv)
+
+    address = Web3.toChecksumAddress(args.crowdsale)
+
+    try:
+        name = reader.identify(Web3(HTTPProvider(args.rpc)), address)
+        investors = unique_addresses(read_lines(args.investors)) if args.investors else []
+    except ValueError as e:
+        parser.error(str(e))
+
+    block, state = read_state(args.rpc, address, name, investors, args.block, args.batch_size, args.connections)
+    output = json.dumps({'crowdsale': address, 'contract': name, 'block': block, 'state': to_json(state)}, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+        print('Read the state of {} at block {} into {}.'.format(name, block, args.output))
+    else:
+        print(output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,10 @@
 const { ether } = require('./helpers/ether');
 const { assertRevert } = require('./helpers/assertRevert');
 const { ethGetBalance } = require('./helpers/web3');
+const { expectThrow } = require('./helpers/expectThrow');
+const { fixedArray } = require('./helpers/fixedArray');
+const { revertAfterEach } = require('./helpers/snapshot');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
 
 const BigNumber = web3.BigNumber;
 
@@ -11,19 +15,23 @@ const should = require('chai')
 const AllowanceCrowdsale = artifacts.require('allowance_crowdsale.vyper');
 const SimpleToken = artifacts.require('erc20_standard_token.vyper');
 
-contract('AllowanceCrowdsale', function ([_, investor, wallet, purchaser, tokenWallet]) {
+contract('AllowanceCrowdsale', function ([_, investor, wallet, purchaser, tokenWallet, anotherInvestor]) {
   const rate = new BigNumber(1);
   const value = ether(0.42);
   const expectedTokenAmount = rate.mul(value);
   const tokenAllowance = new ether(10000);
   const ZERO_ADDRESS = '0x0000000000000000000000000000000000000000';
 
-  beforeEach(async function () {
+  before(async function () {
     this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenAllowance, 18, { from: tokenWallet });
     this.crowdsale = await AllowanceCrowdsale.new(rate, wallet, this.token.address, tokenWallet);
     await this.token.approve(this.crowdsale.address, tokenAllowance, { from: tokenWallet });
   });
 
+  revertAfterEach();
+
+  shouldBehaveLikeSettlement(wallet, investor, purchaser, value);
+
   describe('accepting payments', function () {
     it('should accept sends', async function () {
       await this.crowdsale.send(value);
@@ -59,6 +67,34 @@ contract('AllowanceCrowdsale', function ([_, investor, wallet, purchaser, tokenW
     });
   });
 
+  describe('batch purchase', function () {
+    const anotherValue = ether(0.2);
+    const total = value.plus(anotherValue);
+
+    beforeEach(async function () {
+      this.beneficiaries = fixedArray([investor, anotherInvestor], 50, ZERO_ADDRESS);
+      this.amounts = fixedArray([value, anotherValue], 50, 0);
+    });
+
+    it('should transfer tokens from the token wallet to each beneficiary', async function () {
+      await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(expectedTokenAmount);
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(rate.mul(anotherValue));
+      (await this.crowdsale.getRemainingTokens()).should.be.bignumber.equal(tokenAllowance.minus(rate.mul(total)));
+    });
+
+    it('should forward the funds of the whole batch to wallet', async function () {
+      const pre = await ethGetBalance(wallet);
+      await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+      const post = await ethGetBalance(wallet);
+      post.minus(pre).should.be.bignumber.equal(total);
+    });
+
+    it('should reject batches whose value does not match the sum of amounts', async function () {
+      await expectThrow(this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total.plus(1), from: purchaser }));
+    });
+  });
+
   describe('check remaining allowance', function () {
     it('should report correct allowace left', async function () {
       const remainingAllowance = tokenAllowance - expectedTokenAmount;
@@ -68,10 +104,43 @@ contract('AllowanceCrowdsale', function ([_, investor, wallet, purchaser, tokenW
     });
   });
 
+  describe('tranches', function () {
+    const tranche = ether(1);
+
+    it('should only let the token wallet pull a tranche', async function () {
+      await expectThrow(this.crowdsale.pullTranche(tranche, { from: purchaser }));
+    });
+
+    it('should deliver purchases from the pulled tranche', async function () {
+      await this.crowdsale.pullTranche(tranche, { from: tokenWallet });
+      (await this.crowdsale.usesTranches()).should.equal(true);
+      await this.crowdsale.buyTokens(investor, { value: value, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(expectedTokenAmount);
+      (await this.crowdsale.getTrancheTokens()).should.be.bignumber.equal(tranche.minus(expectedTokenAmount));
+      (await this.token.allowance(tokenWallet, this.crowdsale.address)).should.be.bignumber.equal(tokenAllowance.minus(tranche));
+      (await this.crowdsale.getRemainingTokens()).should.be.bignumber.equal(tokenAllowance.minus(expectedTokenAmount));
+    });
+
+    it('should reject purchases beyond the pulled tranches', async function () {
+      await this.crowdsale.pullTranche(tranche, { from: tokenWallet });
+      await expectThrow(this.crowdsale.buyTokens(investor, { value: tranche.plus(1), from: purchaser }));
+    });
+
+    it('should return the unsold tokens and go back to the allowance', async function () {
+      await this.crowdsale.pullTranche(tranche, { from: tokenWallet });
+      await this.crowdsale.buyTokens(investor, { value: value, from: purchaser });
+      await this.crowdsale.returnTranches({ from: tokenWallet });
+      (await this.crowdsale.usesTranches()).should.equal(false);
+      (await this.token.balanceOf(tokenWallet)).should.be.bignumber.equal(tokenAllowance.minus(expectedTokenAmount));
+      await this.crowdsale.buyTokens(investor, { value: value, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(expectedTokenAmount.mul(2));
+    });
+  });
+
   describe('when token wallet is different from token address', function () {
     it('creation reverts', async function () {
-        this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenAllowance, 18, { from: tokenWallet });
-        await assertRevert(AllowanceCrowdsale.new(rate, wallet, this.token.address, ZERO_ADDRESS));
+        const token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenAllowance, 18, { from: tokenWallet });
+        await assertRevert(AllowanceCrowdsale.new(rate, wallet, token.address, ZERO_ADDRESS));
     });
   });
 });
@@ -1,6 +1,9 @@
 const { ether } = require('./helpers/ether');
 const { expectThrow } = require('./helpers/expectThrow');
 const { EVMRevert } = require('./helpers/EVMRevert');
+const { revertAfterEach } = require('./helpers/snapshot');
+const { ethGetBalance } = require('./helpers/web3');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
 
 const BigNumber = web3.BigNumber;
 
@@ -11,18 +14,22 @@ require('chai')
 const CappedCrowdsale = artifacts.require('capped_crowdsale.vyper');
 const SimpleToken = artifacts.require('erc20_standard_token.vyper');
 
-contract('CappedCrowdsale', function ([_, wallet]) {
+contract('CappedCrowdsale', function ([_, wallet, investor, purchaser]) {
   const rate = new BigNumber(1);
   const cap = ether(100);
   const lessThanCap = ether(60);
   const tokenSupply = new BigNumber('1e22');
 
-  beforeEach(async function () {
+  before(async function () {
     this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
     this.crowdsale = await CappedCrowdsale.new(rate, wallet, this.token.address, cap);
     await this.token.transfer(this.crowdsale.address, tokenSupply);
   });
 
+  revertAfterEach();
+
+  shouldBehaveLikeSettlement(wallet, investor, purchaser, ether(1));
+
   describe('creating a valid crowdsale', function () {
     it('should fail with zero cap', async function () {
       await expectThrow(
@@ -54,6 +61,52 @@ contract('CappedCrowdsale', function ([_, wallet]) {
     });
   });
 
+  describe('filling purchases partially', function () {
+    it('should reject purchases that exceed cap by default', async function () {
+      (await this.crowdsale.partialFills()).should.equal(false);
+      await this.crowdsale.send(lessThanCap);
+      await expectThrow(this.crowdsale.send(lessThanCap), EVMRevert);
+    });
+
+    it('should only let the wallet fill purchases partially', async function () {
+      await expectThrow(this.crowdsale.setPartialFills(true, { from: purchaser }), EVMRevert);
+    });
+
+    describe('when enabled', function () {
+      beforeEach(async function () {
+        await this.crowdsale.setPartialFills(true, { from: wallet });
+      });
+
+      it('should sell the remaining capacity and refund the excess', async function () {
+        await this.crowdsale.send(lessThanCap);
+
+        const pre = await ethGetBalance(wallet);
+        const { logs } = await this.crowdsale.buyTokens(investor, { value: lessThanCap, from: purchaser });
+        const post = await ethGetBalance(wallet);
+
+        const remaining = cap.minus(lessThanCap);
+        post.minus(pre).should.be.bignumber.equal(remaining);
+        logs[0].args._value.should.be.bignumber.equal(remaining);
+        (await this.token.balanceOf(investor)).should.be.bignumber.equal(remaining.mul(rate));
+        (await ethGetBalance(this.crowdsale.address)).should.be.bignumber.equal(0);
+        (await this.crowdsale.capReached()).should.equal(true);
+      });
+
+      it('should keep accumulating funds', async function () {
+        await this.crowdsale.setAccumulateFunds(true, { from: wallet });
+        await this.crowdsale.send(cap.plus(lessThanCap));
+
+        (await this.crowdsale.partialFills()).should.equal(true);
+        (await ethGetBalance(this.crowdsale.address)).should.be.bignumber.equal(cap);
+      });
+
+      it('should reject payments once cap is reached', async function () {
+        await this.crowdsale.send(cap);
+        await expectThrow(this.crowdsale.send(1), EVMRevert);
+      });
+    });
+  });
+
   describe('ending', function () {
     it('should not reach cap if sent under cap', async function () {
       await this.crowdsale.send(lessThanCap);
@@ -0,0 +1,86 @@
+const { ether } = require('./helpers/ether');
+const { expectThrow } = require('./helpers/expectThrow');
+const { EVMRevert } = require('./helpers/EVMRevert');
+const { inLogs } = require('./helpers/expectEvent');
+const { ethGetBalance } = require('./helpers/web3');
+
+const BigNumber = web3.BigNumber;
+
+require('chai')
+  .use(require('chai-bignumber')(BigNumber))
+  .should();
+
+const CrowdsaleFactory = artifacts.require('crowdsale_factory.vyper');
+const CappedCrowdsale = artifacts.require('capped_crowdsale.vyper');
+const WhitelistedCrowdsale = artifacts.require('whitelisted_crowdsale.vyper');
+const SimpleToken = artifacts.require('erc20_standard_token.vyper');
+
+contract('CrowdsaleFactory', function ([_, wallet, investor, purchaser, creator]) {
+  const rate = new BigNumber(1);
+  const cap = ether(100);
+  const value = ether(1);
+  const tokenSupply = new BigNumber('1e22');
+
+  beforeEach(async function () {
+    this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+    this.factory = await CrowdsaleFactory.new();
+    this.template = await CappedCrowdsale.new(rate, wallet, this.token.address, cap);
+  });
+
+  describe('creating a crowdsale', function () {
+    beforeEach(async function () {
+      const { logs } = await this.factory.createCappedCrowdsale(this.template.address, rate, wallet, this.token.address, cap, { from: creator });
+      const event = inLogs(logs, 'CrowdsaleCreated', { _template: this.template.address, _creator: creator });
+
+      this.crowdsale = CappedCrowdsale.at(event.args._crowdsale);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+    });
+
+    it('should initialize the crowdsale', async function () {
+      (await this.crowdsale.rate()).should.be.bignumber.equal(rate);
+      (await this.crowdsale.cap()).should.be.bignumber.equal(cap);
+      (await this.crowdsale.wallet()).should.equal(wallet);
+      (await this.crowdsale.token()).should.equal(this.token.address);
+    });
+
+    it('should accept payments', async function () {
+      const pre = await ethGetBalance(wallet);
+      await this.crowdsale.buyTokens(investor, { value, from: purchaser });
+      const post = await ethGetBalance(wallet);
+
+      post.minus(pre).should.be.bignumber.equal(value);
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(value.mul(rate));
+      (await this.template.weiRaised()).should.be.bignumber.equal(0);
+    });
+
+    it('should not be initialized twice', async function () {
+      await expectThrow(this.crowdsale.initialize(rate, purchaser, this.token.address, cap), EVMRevert);
+      await expectThrow(this.template.initialize(rate, purchaser, this.token.address, cap), EVMRevert);
+    });
+  });
+
+  describe('checking the arguments', function () {
+    it('should fail with zero cap', async function () {
+      await expectThrow(this.factory.createCappedCrowdsale(this.template.address, rate, wallet, this.token.address, 0), EVMRevert);
+    });
+
+    it('should fail with zero rate', async function () {
+      await expectThrow(this.factory.createCappedCrowdsale(this.template.address, 0, wallet, this.token.address, cap), EVMRevert);
+    });
+
+    it('should fail without a template', async function () {
+      await expectThrow(this.factory.createCappedCrowdsale(0, rate, wallet, this.token.address, cap), EVMRevert);
+    });
+  });
+
+  describe('creating an owned crowdsale', function () {
+    it('should be owned by its creator', async function () {
+      const template = await WhitelistedCrowdsale.new(rate, wallet, this.token.address);
+      const { logs } = await this.factory.createOwnedCrowdsale(template.address, rate, wallet, this.token.address, { from: creator });
+      const crowdsale = WhitelistedCrowdsale.at(inLogs(logs, 'CrowdsaleCreated').args._crowdsale);
+
+      (await crowdsale.owner()).should.equal(creator);
+      (await template.owner()).should.equal(_);
+    });
+  });
+});
@@ -0,0 +1,61 @@
+const { ether } = require('./helpers/ether');
+const { fixedArray, ZERO_ADDRESS } = require('./helpers/fixedArray');
+const { latestTime } = require('./helpers/latestTime');
+const { duration } = require('./helpers/increaseTime');
+
+const BigNumber = web3.BigNumber;
+
+require('chai')
+  .use(require('chai-bignumber')(BigNumber))
+  .should();
+
+const CrowdsaleReader = artifacts.require('crowdsale_reader.vyper');
+const CappedCrowdsale = artifacts.require('capped_crowdsale.vyper');
+const TimedCrowdsale = artifacts.require('timed_crowdsale.vyper');
+const SimpleToken = artifacts.require('erc20_standard_token.vyper');
+
+// Getters of each sale, as defined by crowdsale_reader.v.py
+const WEI_RAISED = 1;
+const RATE = 2;
+const CAP = 8;
+const TIMES = 16;
+
+contract('CrowdsaleReader', function ([_, wallet, investor, purchaser]) {
+  const rate = new BigNumber(1);
+  const cap = ether(100);
+  const value = ether(1);
+  const tokenSupply = new BigNumber('1e22');
+
+  before(async function () {
+    this.openingTime = (await latestTime()) + duration.weeks(1);
+    this.closingTime = this.openingTime + duration.weeks(1);
+
+    this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+    this.capped = await CappedCrowdsale.new(rate, wallet, this.token.address, cap);
+    this.timed = await TimedCrowdsale.new(this.openingTime, this.closingTime, rate, wallet, this.token.address);
+    this.reader = await CrowdsaleReader.new();
+
+    await this.token.transfer(this.capped.address, tokenSupply);
+    await this.capped.buyTokens(investor, { value, from: purchaser });
+  });
+
+  it('should read the getters of each sale', async function () {
+    const sales = fixedArray([this.capped.address, this.timed.address], 50, ZERO_ADDRESS);
+    const fields = fixedArray([WEI_RAISED | RATE | CAP, WEI_RAISED | RATE | TIMES], 50, 0);
+    const statuses = await this.reader.getStatuses(2, sales, fields);
+
+    statuses[0].should.be.bignumber.equal(value);
+    statuses[1].should.be.bignumber.equal(rate);
+    statuses[2].should.be.bignumber.equal(cap);
+    statuses[3].should.be.bignumber.equal(0);
+    statuses[4].should.be.bignumber.equal(0);
+
+    statuses[8].should.be.bignumber.equal(0);
+    statuses[9].should.be.bignumber.equal(rate);
+    statuses[10].should.be.bignumber.equal(0);
+    statuses[12].should.be.bignumber.equal(this.openingTime);
+    statuses[13].should.be.bignumber.equal(this.closingTime);
+    statuses[14].should.be.bignumber.equal(0);
+    statuses[16].should.be.bignumber.equal(0);
+  });
+});
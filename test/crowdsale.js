@@ -1,5 +1,9 @@
 const { ether } = require('./helpers/ether');
 const { ethGetBalance } = require('./helpers/web3');
+const { expectThrow } = require('./helpers/expectThrow');
+const { fixedArray, ZERO_ADDRESS } = require('./helpers/fixedArray');
+const { revertAfterEach } = require('./helpers/snapshot');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
 
 const BigNumber = web3.BigNumber;
 
@@ -10,18 +14,22 @@ const should = require('chai')
 const Crowdsale = artifacts.require('crowdsale.vyper');
 const SimpleToken = artifacts.require('erc20_standard_token.vyper');
 
-contract('Crowdsale', function ([_, investor, wallet, purchaser]) {
+contract('Crowdsale', function ([_, investor, wallet, purchaser, anotherInvestor]) {
   const rate = new BigNumber(1);
   const value = ether(42);
   const tokenSupply = new BigNumber('1e22');
   const expectedTokenAmount = rate.mul(value);
 
-  beforeEach(async function () {
+  before(async function () {
     this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
     this.crowdsale = await Crowdsale.new(rate, wallet, this.token.address);
     await this.token.transfer(this.crowdsale.address, tokenSupply);
   });
 
+  revertAfterEach();
+
+  shouldBehaveLikeSettlement(wallet, investor, purchaser, ether(1));
+
   describe('accepting payments', function () {
     it('should accept payments', async function () {
       await this.crowdsale.send(value);
@@ -78,4 +86,47 @@ contract('Crowdsale', function ([_, investor, wallet, purchaser]) {
       post.minus(pre).should.be.bignumber.equal(value);
     });
   });
+
+  describe('batch purchase', function () {
+    const anotherValue = ether(7);
+    const total = value.plus(anotherValue);
+
+    beforeEach(async function () {
+      this.beneficiaries = fixedArray([investor, anotherInvestor], 50, ZERO_ADDRESS);
+      this.amounts = fixedArray([value, anotherValue], 50, 0);
+    });
+
+    it('should log a purchase for each beneficiary', async function () {
+      const { logs } = await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+      const events = logs.filter(e => e.event === 'TokenPurchase');
+      events.length.should.equal(2);
+      events[0].args._purchaser.should.equal(purchaser);
+      events[0].args._beneficiary.should.equal(investor);
+      events[0].args._value.should.be.bignumber.equal(value);
+      events[1].args._beneficiary.should.equal(anotherInvestor);
+      events[1].args._amount.should.be.bignumber.equal(rate.mul(anotherValue));
+    });
+
+    it('should assign tokens to each beneficiary', async function () {
+      await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(expectedTokenAmount);
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(rate.mul(anotherValue));
+      (await this.crowdsale.weiRaised()).should.be.bignumber.equal(total);
+    });
+
+    it('should forward the funds of the whole batch to wallet', async function () {
+      const pre = await ethGetBalance(wallet);
+      await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+      const post = await ethGetBalance(wallet);
+      post.minus(pre).should.be.bignumber.equal(total);
+    });
+
+    it('should reject batches whose value does not match the sum of amounts', async function () {
+      await expectThrow(this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: value, from: purchaser }));
+    });
+
+    it('should reject empty batches', async function () {
+      await expectThrow(this.crowdsale.buyTokensBatch(0, this.beneficiaries, this.amounts, { value: 0, from: purchaser }));
+    });
+  });
 });
@@ -0,0 +1,11 @@
+// Pads a list to the fixed length of a Vyper list argument, e.g. address[50]
+function fixedArray (items, length, filler) {
+  return items.concat(Array(length - items.length).fill(filler));
+}
+
+const ZERO_ADDRESS = '0x0000000000000000000000000000000000000000';
+
+module.exports = {
+  fixedArray,
+  ZERO_ADDRESS,
+};
@@ -0,0 +1,68 @@
+// Mirrors scripts/merkle.py: leaves are keccak256 of addresses (and caps) padded
+// to 32 bytes and pairs are hashed in ascending order.
+const ZERO_HASH = '0x' + '0'.repeat(64);
+const MAX_PROOF_LENGTH = 20;
+
+function keccak (hex) {
+  return web3.sha3(hex, { encoding: 'hex' });
+}
+
+function addressLeaf (address) {
+  return keccak('0x' + address.replace('0x', '').toLowerCase().padStart(64, '0'));
+}
+
+function capLeaf (address, cap) {
+  const word = value => value.replace('0x', '').toLowerCase().padStart(64, '0');
+  return keccak('0x' + word(address) + word(new web3.BigNumber(cap).toString(16)));
+}
+
+function hashPair (a, b) {
+  return a <= b ? keccak(a + b.slice(2)) : keccak(b + a.slice(2));
+}
+
+function merkleTree (leaves) {
+  const levels = [leaves];
+
+  while (levels[levels.length - 1].length > 1) {
+    const level = levels[levels.length - 1];
+    const next = [];
+
+    for (let i = 0; i < level.length; i += 2) {
+      next.push(i + 1 < level.length ? hashPair(level[i], level[i + 1]) : level[i]);
+    }
+
+    levels.push(next);
+  }
+
+  return {
+    root: levels[levels.length - 1][0],
+    proof (index) {
+      const proof = [];
+
+      for (const level of levels.slice(0, -1)) {
+        const sibling = index ^ 1;
+
+        if (sibling < level.length) {
+          proof.push(level[sibling]);
+        }
+
+        index = Math.floor(index / 2);
+      }
+
+      return proof;
+    },
+  };
+}
+
+// Pads a proof to the bytes32[20] argument of the contracts
+function fixedProof (proof) {
+  return proof.concat(Array(MAX_PROOF_LENGTH - proof.length).fill(ZERO_HASH));
+}
+
+module.exports = {
+  addressLeaf,
+  capLeaf,
+  merkleTree,
+  fixedProof,
+  ZERO_HASH,
+};
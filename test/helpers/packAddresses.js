@@ -0,0 +1,8 @@
+// Encodes addresses for the bytes argument of the bulk setters, each left-padded to 32 bytes
+function packAddresses (addresses) {
+  return '0x' + addresses.map(address => address.replace('0x', '').padStart(64, '0')).join('');
+}
+
+module.exports = {
+  packAddresses,
+};
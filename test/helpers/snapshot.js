@@ -0,0 +1,44 @@
+function send (method, params) {
+  return new Promise((resolve, reject) => {
+    web3.currentProvider.sendAsync({
+      jsonrpc: '2.0',
+      method: method,
+      params: params || [],
+      id: Date.now(),
+    }, (err, res) => {
+      return err ? reject(err) : resolve(res.result);
+    });
+  });
+}
+
+// Saves the state of the chain and returns the id of the snapshot
+function takeSnapshot () {
+  return send('evm_snapshot');
+}
+
+// Restores the state saved by `takeSnapshot`. A snapshot can only be restored once.
+function revertToSnapshot (id) {
+  return send('evm_revert', [id]);
+}
+
+/**
+ * Restores the chain after each test of the enclosing suite, so that the contracts
+ * can be deployed once in `before` instead of in `beforeEach`.
+ * Time is not restored by every version of ganache, so suites which travel in time
+ * should keep deploying in `beforeEach`.
+ */
+function revertAfterEach () {
+  beforeEach(async function () {
+    this.snapshotId = await takeSnapshot();
+  });
+
+  afterEach(async function () {
+    await revertToSnapshot(this.snapshotId);
+  });
+}
+
+module.exports = {
+  takeSnapshot,
+  revertToSnapshot,
+  revertAfterEach,
+};
@@ -2,6 +2,7 @@ const { ether } = require('./helpers/ether');
 const { advanceBlock } = require('./helpers/advanceToBlock');
 const { increaseTimeTo, duration } = require('./helpers/increaseTime');
 const { latestTime } = require('./helpers/latestTime');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
 
 const BigNumber = web3.BigNumber;
 
@@ -87,5 +88,37 @@ contract('IncreasingPriceCrowdsale', function ([_, investor, wallet, purchaser])
       balance = await this.token.balanceOf(investor);
       balance.should.be.bignumber.equal(value.mul(rateAtTime450000));
     });
+
+    it('should report the rate at any time without advancing the chain', async function () {
+      (await this.crowdsale.getRateAt(this.startTime + 150)).should.be.bignumber.equal(rateAtTime150);
+      (await this.crowdsale.getRateAt(this.startTime + 150000)).should.be.bignumber.equal(rateAtTime150000);
+      (await this.crowdsale.getRateAt(this.startTime + 450000)).should.be.bignumber.equal(rateAtTime450000);
+    });
+
+    it('should clamp the rate to the crowdsale period', async function () {
+      (await this.crowdsale.getRateAt(this.startTime - 1000)).should.be.bignumber.equal(initialRate);
+      (await this.crowdsale.getRateAt(this.afterClosingTime)).should.be.bignumber.equal(finalRate);
+    });
+
+    it('should report the initial and final rates', async function () {
+      (await this.crowdsale.initialRate()).should.be.bignumber.equal(initialRate);
+      (await this.crowdsale.finalRate()).should.be.bignumber.equal(finalRate);
+    });
+  });
+
+  describe('after start', function () {
+    beforeEach(async function () {
+      await advanceBlock();
+      this.startTime = (await latestTime()) + duration.weeks(1);
+      this.closingTime = this.startTime + duration.weeks(1);
+      this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+      this.crowdsale = await IncreasingPriceCrowdsale.new(
+        this.startTime, this.closingTime, wallet, this.token.address, new BigNumber(9166), new BigNumber(5500)
+      );
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+      await increaseTimeTo(this.startTime);
+    });
+
+    shouldBehaveLikeSettlement(wallet, investor, purchaser, value);
   });
 });
@@ -2,6 +2,10 @@ const { ether } = require('./helpers/ether');
 const { expectThrow } = require('./helpers/expectThrow');
 const { EVMRevert } = require('./helpers/EVMRevert');
 const { shouldBehaveLikeOwnable } = require('./ownable.behavior.js');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
+const { capLeaf, merkleTree, fixedProof, ZERO_HASH } = require('./helpers/merkleTree');
+const { packAddresses } = require('./helpers/packAddresses');
+const { ethGetBalance } = require('./helpers/web3');
 
 const BigNumber = web3.BigNumber;
 
@@ -32,6 +36,7 @@ contract('IndividuallyCappedCrowdsale', function ([_, wallet, alice, bob, charli
     });
 
     shouldBehaveLikeOwnable([_, wallet, alice, bob, charlie]);
+    shouldBehaveLikeSettlement(wallet, alice, bob, lessThanCapBoth);
 
     describe('accepting payments', function () {
       it('should accept payments within cap', async function () {
@@ -70,6 +75,52 @@ contract('IndividuallyCappedCrowdsale', function ([_, wallet, alice, bob, charli
         const retrievedContribution = await this.crowdsale.getUserContribution(alice);
         retrievedContribution.should.be.bignumber.equal(lessThanCapAlice);
       });
+
+      it('should report the remaining cap', async function () {
+        await this.crowdsale.buyTokens(alice, { value: lessThanCapAlice });
+        (await this.crowdsale.remainingUserCap(alice)).should.be.bignumber.equal(capAlice.minus(lessThanCapAlice));
+        (await this.crowdsale.remainingUserCap(charlie)).should.be.bignumber.equal(0);
+
+        await this.crowdsale.setUserCap(alice, lessThanCapBoth);
+        (await this.crowdsale.remainingUserCap(alice)).should.be.bignumber.equal(0);
+      });
+    });
+
+    describe('filling purchases partially', function () {
+      it('should be disabled by default', async function () {
+        (await this.crowdsale.partialFills()).should.equal(false);
+      });
+
+      it('should only let the wallet fill purchases partially', async function () {
+        await expectThrow(this.crowdsale.setPartialFills(true, { from: alice }), EVMRevert);
+      });
+
+      describe('when enabled', function () {
+        beforeEach(async function () {
+          await this.crowdsale.setPartialFills(true, { from: wallet });
+        });
+
+        it('should sell the rest of the cap and refund the excess', async function () {
+          await this.crowdsale.buyTokens(alice, { value: lessThanCapAlice, from: bob });
+
+          const pre = await ethGetBalance(wallet);
+          const { logs } = await this.crowdsale.buyTokens(alice, { value: lessThanCapAlice, from: bob });
+          const post = await ethGetBalance(wallet);
+
+          const remaining = capAlice.minus(lessThanCapAlice);
+          post.minus(pre).should.be.bignumber.equal(remaining);
+          logs[0].args._value.should.be.bignumber.equal(remaining);
+          (await this.crowdsale.getUserContribution(alice)).should.be.bignumber.equal(capAlice);
+          (await this.crowdsale.weiRaised()).should.be.bignumber.equal(capAlice);
+          (await ethGetBalance(this.crowdsale.address)).should.be.bignumber.equal(0);
+        });
+
+        it('should reject payments once the cap is reached', async function () {
+          await this.crowdsale.buyTokens(bob, { value: capBob });
+          await expectThrow(this.crowdsale.buyTokens(bob, { value: 1 }), EVMRevert);
+          await expectThrow(this.crowdsale.buyTokens(charlie, { value: lessThanCapBoth }), EVMRevert);
+        });
+      });
     });
   });
 
@@ -109,4 +160,129 @@ contract('IndividuallyCappedCrowdsale', function ([_, wallet, alice, bob, charli
     //   });
     // });
   });
+
+  describe('bulk capping', function () {
+    beforeEach(async function () {
+      this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+      this.crowdsale = await CappedCrowdsale.new(rate, wallet, this.token.address);
+      await this.crowdsale.setGroupCapBulk(packAddresses([bob, charlie]), capBob);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+    });
+
+    describe('accepting payments', function () {
+      it('should accept payments within cap', async function () {
+        await this.crowdsale.buyTokens(bob, { value: lessThanCapBoth });
+        await this.crowdsale.buyTokens(charlie, { value: lessThanCapBoth });
+      });
+
+      it('should reject payments outside cap', async function () {
+        await this.crowdsale.buyTokens(bob, { value: capBob });
+        await expectThrow(this.crowdsale.buyTokens(bob, { value: 1 }), EVMRevert);
+      });
+
+      it('should reject payments of users not in the group', async function () {
+        await expectThrow(this.crowdsale.buyTokens(alice, { value: 1 }), EVMRevert);
+      });
+    });
+
+    describe('managing caps', function () {
+      it('should only allow the owner to set caps', async function () {
+        await expectThrow(this.crowdsale.setGroupCapBulk(packAddresses([alice]), capAlice, { from: alice }), EVMRevert);
+      });
+    });
+
+    describe('reporting state', function () {
+      it('should report correct cap', async function () {
+        (await this.crowdsale.getUserCap(bob)).should.be.bignumber.equal(capBob);
+        (await this.crowdsale.getUserCap(charlie)).should.be.bignumber.equal(capBob);
+      });
+
+      it('should report the caps and contributions of many users at once', async function () {
+        await this.crowdsale.buyTokens(bob, { value: lessThanCapBoth });
+        const users = packAddresses([bob, alice, charlie]);
+        const caps = await this.crowdsale.getUserCapsBulk(users);
+        const contributions = await this.crowdsale.getUserContributionsBulk(users);
+
+        caps.length.should.equal(500);
+        caps[0].should.be.bignumber.equal(capBob);
+        caps[1].should.be.bignumber.equal(0);
+        caps[2].should.be.bignumber.equal(capBob);
+        contributions[0].should.be.bignumber.equal(lessThanCapBoth);
+        contributions[2].should.be.bignumber.equal(0);
+      });
+    });
+  });
+
+  describe('merkle capping', function () {
+    beforeEach(async function () {
+      this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+      this.crowdsale = await CappedCrowdsale.new(rate, wallet, this.token.address);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+
+      this.tree = merkleTree([capLeaf(alice, capAlice), capLeaf(bob, capBob), capLeaf(charlie, capBob)]);
+      this.proofAlice = fixedProof(this.tree.proof(0));
+      this.proofAliceLength = this.tree.proof(0).length;
+
+      await this.crowdsale.setCapsRoot(this.tree.root);
+    });
+
+    describe('accepting payments', function () {
+      it('should accept payments within cap', async function () {
+        await this.crowdsale.buyTokensWithCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength, { value: lessThanCapAlice });
+      });
+
+      it('should store the cap on the first purchase', async function () {
+        (await this.crowdsale.getUserCap(alice)).should.be.bignumber.equal(0);
+        await this.crowdsale.buyTokensWithCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength, { value: lessThanCapBoth });
+        (await this.crowdsale.getUserCap(alice)).should.be.bignumber.equal(capAlice);
+        await this.crowdsale.buyTokens(alice, { value: lessThanCapBoth });
+      });
+
+      it('should reject payments outside cap', async function () {
+        await this.crowdsale.buyTokensWithCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength, { value: capAlice });
+        await expectThrow(this.crowdsale.buyTokens(alice, { value: 1 }), EVMRevert);
+      });
+
+      it('should reject caps that are not in the tree', async function () {
+        await expectThrow(
+          this.crowdsale.buyTokensWithCapProof(alice, capAlice.plus(1), this.proofAlice, this.proofAliceLength, { value: lessThanCapBoth }),
+          EVMRevert,
+        );
+        await expectThrow(
+          this.crowdsale.buyTokensWithCapProof(bob, capAlice, this.proofAlice, this.proofAliceLength, { value: lessThanCapBoth }),
+          EVMRevert,
+        );
+      });
+
+      it('should not restore a revoked cap from the tree', async function () {
+        await this.crowdsale.buyTokensWithCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength, { value: lessThanCapBoth });
+        await this.crowdsale.setUserCap(alice, 0);
+        await expectThrow(
+          this.crowdsale.buyTokensWithCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength, { value: lessThanCapBoth }),
+          EVMRevert,
+        );
+      });
+
+      it('should reject proofs once the root is cleared', async function () {
+        await this.crowdsale.setCapsRoot(ZERO_HASH);
+        await expectThrow(
+          this.crowdsale.buyTokensWithCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength, { value: lessThanCapBoth }),
+          EVMRevert,
+        );
+      });
+    });
+
+    describe('managing the root', function () {
+      it('should only allow the owner to change the root', async function () {
+        await expectThrow(this.crowdsale.setCapsRoot(ZERO_HASH, { from: alice }), EVMRevert);
+      });
+    });
+
+    describe('reporting state', function () {
+      it('should correctly report proofs', async function () {
+        (await this.crowdsale.checkCapProof(alice, capAlice, this.proofAlice, this.proofAliceLength)).should.equal(true);
+        (await this.crowdsale.checkCapProof(alice, capBob, this.proofAlice, this.proofAliceLength)).should.equal(false);
+      });
+    });
+  });
 });
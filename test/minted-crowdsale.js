@@ -2,29 +2,68 @@ const { ether } = require('./helpers/ether');
 const MintedCrowdsale = artifacts.require('minted_crowdsale.vyper');
 const MintableToken = artifacts.require('mintable_token.vyper');
 const { ethGetBalance } = require('./helpers/web3');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
+const { expectThrow } = require('./helpers/expectThrow');
+const { revertAfterEach } = require('./helpers/snapshot');
+const { fixedArray, ZERO_ADDRESS } = require('./helpers/fixedArray');
 const BigNumber = web3.BigNumber;
 
 const should = require('chai')
   .use(require('chai-bignumber')(BigNumber))
   .should();
 
-contract('MintedCrowdsale', function ([_, investor, wallet, purchaser]) {
+contract('MintedCrowdsale', function ([_, investor, wallet, purchaser, anotherInvestor]) {
   const rate = new BigNumber(1000);
   const value = ether(5);
   const expectedTokenAmount = rate.mul(value);
 
+  describe('minting in batches', function () {
+    before(async function () {
+      this.token = await MintableToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), 0, ether(10), 18);
+      this.recipients = fixedArray([investor, anotherInvestor], 50, ZERO_ADDRESS);
+      this.amounts = fixedArray([ether(3), ether(4)], 50, 0);
+    });
+
+    revertAfterEach();
+
+    it('should mint for each recipient and update the total supply once', async function () {
+      await this.token.mintBatch(2, this.recipients, this.amounts);
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(ether(3));
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(ether(4));
+      (await this.token.totalSupply()).should.be.bignumber.equal(ether(7));
+    });
+
+    it('should only let the owner mint', async function () {
+      await expectThrow(this.token.mintBatch(2, this.recipients, this.amounts, { from: purchaser }));
+    });
+
+    it('should not exceed the maximum supply', async function () {
+      await this.token.mintBatch(2, this.recipients, this.amounts);
+      await expectThrow(this.token.mintBatch(2, this.recipients, this.amounts));
+    });
+
+    it('should not mint after minting is finished', async function () {
+      await this.token.finishMinting();
+      await expectThrow(this.token.mintBatch(2, this.recipients, this.amounts));
+    });
+  });
+
   describe('using MintableToken', function () {
-    beforeEach(async function () {
+    before(async function () {
       this.token = await MintableToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), 0, ether(10000000), 18);
       this.crowdsale = await MintedCrowdsale.new(rate, wallet, this.token.address);
       await this.token.transferOwnership(this.crowdsale.address);
     });
 
+    revertAfterEach();
+
     it('should be token owner', async function () {
       const owner = await this.token.owner();
       owner.should.equal(this.crowdsale.address);
     });
 
+    shouldBehaveLikeSettlement(wallet, investor, purchaser, value);
+
     describe('as a minted crowdsale', function () {
         describe('accepting payments', function () {
           it('should accept payments', async function () {
@@ -58,5 +97,41 @@ contract('MintedCrowdsale', function ([_, investor, wallet, purchaser]) {
           });
         });
       });
+
+    describe('batch purchase', function () {
+      const anotherValue = ether(2);
+      const total = value.plus(anotherValue);
+
+      beforeEach(async function () {
+        this.beneficiaries = fixedArray([investor, anotherInvestor], 50, ZERO_ADDRESS);
+        this.amounts = fixedArray([value, anotherValue], 50, 0);
+      });
+
+      it('should mint tokens for each beneficiary', async function () {
+        await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+        (await this.token.balanceOf(investor)).should.be.bignumber.equal(expectedTokenAmount);
+        (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(rate.mul(anotherValue));
+        (await this.token.totalSupply()).should.be.bignumber.equal(rate.mul(total));
+      });
+
+      it('should forward the funds of the whole batch to wallet', async function () {
+        const pre = await ethGetBalance(wallet);
+        await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+        const post = await ethGetBalance(wallet);
+        post.minus(pre).should.be.bignumber.equal(total);
+      });
+
+      it('should log a purchase for each beneficiary', async function () {
+        const { logs } = await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+        const events = logs.filter(e => e.event === 'TokenPurchase');
+        events.length.should.equal(2);
+        events[1].args._beneficiary.should.equal(anotherInvestor);
+        events[1].args._amount.should.be.bignumber.equal(rate.mul(anotherValue));
+      });
+
+      it('should reject batches whose value does not match the sum of amounts', async function () {
+        await expectThrow(this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: value, from: purchaser }));
+      });
+    });
   });
 });
@@ -4,6 +4,9 @@ const { latestTime } = require('./helpers/latestTime');
 const { expectThrow } = require('./helpers/expectThrow');
 const { EVMRevert } = require('./helpers/EVMRevert');
 const { ether } = require('./helpers/ether');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
+const { fixedArray, ZERO_ADDRESS } = require('./helpers/fixedArray');
+const { packAddresses } = require('./helpers/packAddresses');
 
 const BigNumber = web3.BigNumber;
 
@@ -14,7 +17,7 @@ require('chai')
 const PostDeliveryCrowdsale = artifacts.require('post_delivery_crowdsale.vyper');
 const SimpleToken = artifacts.require('erc20_standard_token.vyper');
 
-contract('PostDeliveryCrowdsale', function ([_, investor, wallet, purchaser]) {
+contract('PostDeliveryCrowdsale', function ([_, investor, wallet, purchaser, anotherInvestor]) {
   const rate = new BigNumber(1);
   const value = ether(42);
   const tokenSupply = new BigNumber('1e22');
@@ -65,4 +68,76 @@ contract('PostDeliveryCrowdsale', function ([_, investor, wallet, purchaser]) {
     const balance = await this.token.balanceOf(investor);
     balance.should.be.bignumber.equal(value);
   });
+
+  describe('after start', function () {
+    beforeEach(async function () {
+      await increaseTimeTo(this.openingTime);
+    });
+
+    shouldBehaveLikeSettlement(wallet, investor, purchaser, ether(1));
+  });
+
+  describe('batch purchase', function () {
+    const anotherValue = ether(3);
+    const total = value.plus(anotherValue);
+
+    beforeEach(async function () {
+      this.beneficiaries = fixedArray([investor, anotherInvestor], 50, ZERO_ADDRESS);
+      this.amounts = fixedArray([value, anotherValue], 50, 0);
+    });
+
+    it('should record the balance of each beneficiary until the crowdsale ends', async function () {
+      await increaseTimeTo(this.openingTime);
+      await this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser });
+      (await this.crowdsale.balances(investor)).should.be.bignumber.equal(value);
+      (await this.crowdsale.balances(anotherInvestor)).should.be.bignumber.equal(anotherValue);
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(0);
+
+      const balances = await this.crowdsale.getBalancesBulk(packAddresses([anotherInvestor, purchaser, investor]));
+      balances[0].should.be.bignumber.equal(anotherValue);
+      balances[1].should.be.bignumber.equal(0);
+      balances[2].should.be.bignumber.equal(value);
+
+      await increaseTimeTo(this.afterClosingTime);
+      await this.crowdsale.withdrawTokens({ from: anotherInvestor });
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(anotherValue);
+    });
+
+    it('should reject batches after the crowdsale ends', async function () {
+      await increaseTimeTo(this.afterClosingTime);
+      await expectThrow(this.crowdsale.buyTokensBatch(2, this.beneficiaries, this.amounts, { value: total, from: purchaser }), EVMRevert);
+    });
+  });
+
+  describe('distribution', function () {
+    const anotherValue = ether(3);
+
+    beforeEach(async function () {
+      await increaseTimeTo(this.openingTime);
+      await this.crowdsale.buyTokens(investor, { value: value, from: purchaser });
+      await this.crowdsale.buyTokens(anotherInvestor, { value: anotherValue, from: purchaser });
+      this.beneficiaries = fixedArray([investor, anotherInvestor], 50, ZERO_ADDRESS);
+    });
+
+    it('should not distribute tokens before crowdsale ends', async function () {
+      await expectThrow(this.crowdsale.distributeTokens(2, this.beneficiaries, { from: purchaser }), EVMRevert);
+    });
+
+    it('should let anyone deliver the tokens of many beneficiaries after crowdsale ends', async function () {
+      await increaseTimeTo(this.afterClosingTime);
+      await this.crowdsale.distributeTokens(2, this.beneficiaries, { from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(value);
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(anotherValue);
+      (await this.crowdsale.balances(investor)).should.be.bignumber.equal(0);
+      await expectThrow(this.crowdsale.withdrawTokens({ from: investor }), EVMRevert);
+    });
+
+    it('should skip beneficiaries who have already withdrawn', async function () {
+      await increaseTimeTo(this.afterClosingTime);
+      await this.crowdsale.withdrawTokens({ from: investor });
+      await this.crowdsale.distributeTokens(2, this.beneficiaries, { from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(value);
+      (await this.token.balanceOf(anotherInvestor)).should.be.bignumber.equal(anotherValue);
+    });
+  });
 });
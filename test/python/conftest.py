@@ -0,0 +1,15 @@
+"""
+Fixtures shared by the Python tests.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def sale(deployment):
+    """
+    The sale deployed once by the `deployment` fixture of a module, reverted to that state after each test.
+    """
+
+    with deployment.chain.reverting():
+        yield deployment
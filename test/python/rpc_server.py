@@ -0,0 +1,100 @@
+"""
+Serves an in-process chain over JSON-RPC, for the tools which talk to a node over HTTP.
+Reverts are reported like Ganache does, with the reason in the error message.
+Batch requests are answered, and eth_getStorageAt, which eth-tester lacks, is read from py-evm.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_tester.exceptions import TransactionFailed
+
+
+def to_json(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+
+    if isinstance(value, int):
+        return hex(value)
+
+    if isinstance(value, bytes):
+        return '0x' + bytes(value).hex()
+
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+
+    return {key: to_json(item) for key, item in dict(value).items()}
+
+
+def get_storage_at(chain, address, slot, block='latest'):
+    backend = chain.tester.backend.chain
+
+    if block in ('latest', 'pending'):
+        header = backend.get_canonical_head()
+    else:
+        header = backend.get_canonical_block_by_number(int(block, 16) if isinstance(block, str) else block).header
+
+    value = backend.get_vm(header).state.account_db.get_storage(bytes.fromhex(address[2:]), int(slot, 16))
+
+    return '0x' + value.to_bytes(32, 'big').hex()
+
+
+class RpcServer:
+    """
+    Serves `chain` on a free local port until `close` is called.
+    `posts` counts the HTTP requests, a batch being one request.
+    """
+
+    def __init__(self, chain):
+        lock = threading.Lock()
+        server = self
+        self.posts = 0
+
+        def answer(request):
+            response = {'jsonrpc': '2.0', 'id': request.get('id')}
+            method, params = request['method'], request.get('params', [])
+
+            try:
+                if method == 'eth_getStorageAt':
+                    response['result'] = get_storage_at(chain, *params)
+                else:
+                    response['result'] = to_json(chain.w3.manager.request_blocking(method, params))
+            except TransactionFailed as e:
+                reason = e.args[0].decode() if e.args and isinstance(e.args[0], bytes) else str(e)
+                response['error'] = {'code': -32000, 'message': 'VM Exception while processing transaction: revert ' + reason}
+            except Exception as e:
+                response['error'] = {'code': -32000, 'message': str(e)}
+
+            return response
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode())
+
+                # The in-process chain is not thread safe.
+                with lock:
+                    server.posts += 1
+                    response = [answer(item) for item in request] if isinstance(request, list) else answer(request)
+
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
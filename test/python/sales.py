@@ -0,0 +1,13 @@
+"""
+The sale scenario of the Python tests which run the EVM. Those tests import this
+module before the scripts, so that they are skipped when eth-tester or Vyper is
+not installed.
+"""
+
+import pytest
+
+pytest.importorskip('eth_tester')
+pytest.importorskip('vyper')
+
+from scripts.evm import MAINNET_BLOCK_GAS_LIMIT, Chain, TransactionReverted
+from scripts.sale import RATE, TOKEN_SUPPLY, VALUE, Sale, addresses, deploy_generated, padded
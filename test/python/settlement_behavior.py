@@ -0,0 +1,53 @@
+"""
+Port of settlement.behavior.js. Test classes inheriting from `SettlementBehavior`
+run these tests against the `sale` fixture of their module, which must be open for purchases.
+"""
+
+import pytest
+
+from scripts.evm import TransactionReverted
+
+
+VALUE = 10 ** 18
+
+
+class SettlementBehavior:
+    def test_forwards_funds_on_each_purchase_by_default(self, sale):
+        balance = sale.chain.w3.eth.getBalance
+        assert sale.crowdsale.functions.accumulateFunds().call() is False
+
+        pre = balance(sale.wallet)
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+        assert balance(sale.wallet) - pre == VALUE
+
+    def test_only_the_wallet_accumulates_funds(self, sale):
+        with pytest.raises(TransactionReverted):
+            sale.chain.transact(sale.crowdsale.functions.setAccumulateFunds(True), sale.purchaser)
+
+    def test_rejects_withdrawal_without_funds(self, sale):
+        with pytest.raises(TransactionReverted):
+            sale.chain.transact(sale.crowdsale.functions.withdrawFunds(), sale.purchaser)
+
+    def test_keeps_funds_when_accumulating(self, sale):
+        balance = sale.chain.w3.eth.getBalance
+        sale.chain.transact(sale.crowdsale.functions.setAccumulateFunds(True), sale.wallet)
+
+        pre = balance(sale.wallet)
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+        assert balance(sale.wallet) == pre
+        assert balance(sale.crowdsale.address) == VALUE
+        assert sale.crowdsale.functions.weiRaised().call() == VALUE
+
+    def test_withdrawal_forwards_all_accumulated_funds(self, sale):
+        balance = sale.chain.w3.eth.getBalance
+        sale.chain.transact(sale.crowdsale.functions.setAccumulateFunds(True), sale.wallet)
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+        pre = balance(sale.wallet)
+        sale.chain.transact(sale.crowdsale.functions.withdrawFunds(), sale.purchaser)
+
+        assert balance(sale.wallet) - pre == 2 * VALUE
+        assert balance(sale.crowdsale.address) == 0
@@ -0,0 +1,62 @@
+"""
+Port of the tranche tests of allowance-crowdsale.js.
+"""
+
+import pytest
+
+from sales import RATE, TOKEN_SUPPLY, Chain, Sale, TransactionReverted
+
+
+VALUE = 42 * 10 ** 16
+TRANCHE = 10 ** 18
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('allowance_crowdsale', RATE, sale.wallet, sale.token.address, sale.owner)
+    sale.chain.transact(sale.token.functions.approve(sale.crowdsale.address, TOKEN_SUPPLY))
+
+    return sale
+
+
+def buy(sale, value=VALUE):
+    return sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, value)
+
+
+def pull(sale, sender=None):
+    return sale.chain.transact(sale.crowdsale.functions.pullTranche(TRANCHE), sender or sale.owner)
+
+
+def test_only_the_token_wallet_pulls_tranches(sale):
+    with pytest.raises(TransactionReverted):
+        pull(sale, sale.purchaser)
+
+    assert sale.crowdsale.functions.tokenWallet().call() == sale.owner
+    assert not sale.crowdsale.functions.usesTranches().call()
+
+
+def test_purchases_are_delivered_from_the_tranche(sale):
+    pull(sale)
+    buy(sale)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.crowdsale.functions.getTrancheTokens().call() == TRANCHE - VALUE * RATE
+    assert sale.token.functions.allowance(sale.owner, sale.crowdsale.address).call() == TOKEN_SUPPLY - TRANCHE
+    assert sale.crowdsale.functions.getRemainingTokens().call() == TOKEN_SUPPLY - VALUE * RATE
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, TRANCHE)
+
+
+def test_returned_tranches_go_back_to_the_allowance(sale):
+    pull(sale)
+    buy(sale)
+    sale.chain.transact(sale.crowdsale.functions.returnTranches(), sale.owner)
+
+    assert not sale.crowdsale.functions.usesTranches().call()
+    assert sale.token.functions.balanceOf(sale.owner).call() == TOKEN_SUPPLY - VALUE * RATE
+
+    buy(sale)
+    assert sale.token.functions.balanceOf(sale.investor).call() == 2 * VALUE * RATE
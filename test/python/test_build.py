@@ -0,0 +1,56 @@
+import json
+import shutil
+
+import pytest
+
+pytest.importorskip('vyper')
+
+from scripts import build
+from scripts.compilation import contract_path
+
+
+@pytest.fixture
+def sources(tmpdir):
+    paths = []
+
+    for name in ('crowdsale', 'erc20_standard_token'):
+        path = str(tmpdir.join(name + '.v.py'))
+        shutil.copy(contract_path(name), path)
+        paths.append(path)
+
+    return paths
+
+
+def run(tmpdir, sources):
+    return build.build(sources, str(tmpdir.join('contracts')), str(tmpdir.join('cache')), jobs=2)
+
+
+def test_builds_truper_artifacts(tmpdir, sources):
+    assert run(tmpdir, sources)['compiled'] == sources
+
+    with open(str(tmpdir.join('contracts', 'crowdsale.vyper.json'))) as f:
+        artifact = json.load(f)
+
+    assert artifact['contractName'] == 'crowdsale.vyper'
+    assert artifact['bytecode'].startswith('0x')
+    assert 'buyTokens' in [item.get('name') for item in artifact['abi']]
+
+
+def test_rebuilds_only_changed_sources(tmpdir, sources):
+    run(tmpdir, sources)
+    assert run(tmpdir, sources)['unchanged'] == sources
+
+    with open(sources[0]) as f:
+        original = f.read()
+
+    with open(sources[0], 'a') as f:
+        f.write('\n# changed\n')
+
+    result = run(tmpdir, sources)
+    assert result['compiled'] == [sources[0]]
+    assert result['unchanged'] == [sources[1]]
+
+    with open(sources[0], 'w') as f:
+        f.write(original)
+
+    assert run(tmpdir, sources)['cached'] == [sources[0]]
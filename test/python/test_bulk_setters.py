@@ -0,0 +1,70 @@
+import pytest
+
+from sales import MAINNET_BLOCK_GAS_LIMIT, RATE, Chain, Sale, TransactionReverted, addresses
+
+from scripts.evm import pack_addresses
+
+
+def test_pack_addresses_pads_each_address_to_32_bytes():
+    packed = pack_addresses(addresses(3))
+
+    assert len(packed) == 96
+    assert packed[:12] == b'\0' * 12
+    assert packed[32:44] == b'\0' * 12
+
+
+@pytest.fixture(scope='module')
+def chain():
+    return Chain(MAINNET_BLOCK_GAS_LIMIT)
+
+
+@pytest.fixture(scope='module')
+def whitelisted(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('whitelisted_crowdsale', RATE, sale.wallet, sale.token.address)
+
+    return sale.crowdsale
+
+
+def test_bulk_whitelist_accepts_500_addresses(chain, whitelisted):
+    group = addresses(500)
+    chain.transact(whitelisted.functions.addAddressesToWhitelistBulk(pack_addresses(group)))
+
+    assert all(whitelisted.functions.whitelist(address).call() for address in group[::50] + group[-1:])
+
+    chain.transact(whitelisted.functions.removeAddressesFromWhitelistBulk(pack_addresses(group[:10])))
+
+    assert not whitelisted.functions.whitelist(group[0]).call()
+    assert whitelisted.functions.whitelist(group[10]).call()
+
+
+def test_bulk_whitelist_rejects_malformed_lists(chain, whitelisted):
+    add = whitelisted.functions.addAddressesToWhitelistBulk
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(add(pack_addresses(addresses(2))[:-1]))
+
+    # A word whose upper 12 bytes are set is not an address.
+    with pytest.raises(TransactionReverted):
+        chain.transact(add(b'\xff' * 32))
+
+
+def test_bulk_whitelist_rejects_more_than_500_addresses(chain, whitelisted):
+    with pytest.raises(TransactionReverted):
+        chain.transact(whitelisted.functions.addAddressesToWhitelistBulk(pack_addresses(addresses(501))))
+
+
+def test_bulk_caps(chain):
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    group = addresses(200, offset=1000)
+
+    chain.transact(sale.crowdsale.functions.setGroupCapBulk(pack_addresses(group), 1000))
+
+    assert sale.crowdsale.functions.getUserCap(group[0]).call() == 1000
+    assert sale.crowdsale.functions.getUserCap(group[-1]).call() == 1000
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(sale.crowdsale.functions.setGroupCapBulk(pack_addresses(group), 1000), sale.investor)
@@ -0,0 +1,68 @@
+"""
+Port of the partial fill tests of capped-crowdsale.js.
+"""
+
+import pytest
+
+from sales import RATE, Chain, Sale, TransactionReverted
+
+
+CAP = 100 * 10 ** 18
+LESS_THAN_CAP = 60 * 10 ** 18
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('capped_crowdsale', RATE, sale.wallet, sale.token.address, CAP)
+    sale.fund()
+
+    return sale
+
+
+def buy(sale, value):
+    return sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, value)
+
+
+def test_purchases_exceeding_the_cap_are_rejected_by_default(sale):
+    buy(sale, LESS_THAN_CAP)
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, LESS_THAN_CAP)
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.purchaser)
+
+    assert sale.crowdsale.functions.partialFills().call() is False
+
+
+def test_partial_fill_sells_the_remaining_capacity_and_refunds_the_excess(sale):
+    balance = sale.chain.w3.eth.getBalance
+    sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    buy(sale, LESS_THAN_CAP)
+
+    pre = balance(sale.wallet)
+    receipt = buy(sale, LESS_THAN_CAP)
+    event, = sale.crowdsale.events.TokenPurchase().processReceipt(receipt)
+
+    assert event.args._value == CAP - LESS_THAN_CAP
+    assert balance(sale.wallet) - pre == CAP - LESS_THAN_CAP
+    assert balance(sale.crowdsale.address) == 0
+    assert sale.crowdsale.functions.capReached().call()
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, 1)
+
+
+def test_partial_fills_and_accumulation_are_set_independently(sale):
+    sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    sale.chain.transact(sale.crowdsale.functions.setAccumulateFunds(True), sale.wallet)
+    buy(sale, CAP + LESS_THAN_CAP)
+
+    assert sale.chain.w3.eth.getBalance(sale.crowdsale.address) == CAP
+
+    sale.chain.transact(sale.crowdsale.functions.setAccumulateFunds(False), sale.wallet)
+
+    assert sale.crowdsale.functions.partialFills().call() is True
+    assert sale.crowdsale.functions.wallet().call() == sale.wallet
@@ -0,0 +1,74 @@
+"""
+Port of crowdsale.js. The contracts are deployed once for the module and the
+chain is reverted after each test.
+"""
+
+import pytest
+
+from sales import RATE, Chain, Sale, TransactionReverted, padded
+
+from settlement_behavior import SettlementBehavior
+
+
+VALUE = 42 * 10 ** 18
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    return sale
+
+
+def purchase_events(sale, receipt):
+    return [event.args for event in sale.crowdsale.events.TokenPurchase().processReceipt(receipt)]
+
+
+class TestSettlement(SettlementBehavior):
+    pass
+
+
+def test_accepts_payments(sale):
+    sale.chain.send(sale.crowdsale.address, VALUE)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+
+def test_high_level_purchase(sale):
+    pre = sale.chain.w3.eth.getBalance(sale.wallet)
+    receipt = sale.chain.send(sale.crowdsale.address, VALUE, sale.investor)
+
+    assert purchase_events(sale, receipt) == [{'_purchaser': sale.investor, '_beneficiary': sale.investor, '_value': VALUE, '_amount': VALUE * RATE}]
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.chain.w3.eth.getBalance(sale.wallet) - pre == VALUE
+
+
+def test_low_level_purchase(sale):
+    pre = sale.chain.w3.eth.getBalance(sale.wallet)
+    receipt = sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+    assert purchase_events(sale, receipt) == [{'_purchaser': sale.purchaser, '_beneficiary': sale.investor, '_value': VALUE, '_amount': VALUE * RATE}]
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.chain.w3.eth.getBalance(sale.wallet) - pre == VALUE
+
+
+def test_batch_purchase(sale):
+    another_value = 7 * 10 ** 18
+    function = sale.crowdsale.functions.buyTokensBatch(2, padded([sale.investor, sale.buyer]), padded([VALUE, another_value], filler=0))
+    pre = sale.chain.w3.eth.getBalance(sale.wallet)
+    receipt = sale.chain.transact(function, sale.purchaser, VALUE + another_value)
+
+    assert [event['_beneficiary'] for event in purchase_events(sale, receipt)] == [sale.investor, sale.buyer]
+    assert sale.token.functions.balanceOf(sale.buyer).call() == another_value * RATE
+    assert sale.crowdsale.functions.weiRaised().call() == VALUE + another_value
+    assert sale.chain.w3.eth.getBalance(sale.wallet) - pre == VALUE + another_value
+
+
+@pytest.mark.parametrize('count, value', [(2, VALUE), (0, 0)])
+def test_rejects_invalid_batches(sale, count, value):
+    function = sale.crowdsale.functions.buyTokensBatch(count, padded([sale.investor, sale.buyer]), padded([VALUE, VALUE], filler=0))
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(function, sale.purchaser, value)
@@ -0,0 +1,120 @@
+import pytest
+
+from sales import RATE, VALUE, Chain, Sale, TransactionReverted
+
+from scripts import factory
+
+from rpc_server import RpcServer
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    registry = factory.load_registry(None)
+
+    for name in sorted(factory.FACTORY_FUNCTIONS):
+        factory.ensure_deployed(sale.chain.w3, registry, name)
+
+    return sale, registry
+
+
+@pytest.fixture
+def setup(deployment):
+    sale, registry = deployment
+
+    with sale.chain.reverting():
+        yield sale, registry
+
+
+def create(sale, registry, name, args, sender=None):
+    w3 = sale.chain.w3
+    return factory.create(w3, factory.at(w3, factory.FACTORY, registry['factory']), name, registry['templates'][name], args, sender)
+
+
+def create_reverts(sale, registry, name, args):
+    function = getattr(factory.at(sale.chain.w3, factory.FACTORY, registry['factory']).functions, factory.FACTORY_FUNCTIONS[name])
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(function(registry['templates'][name], *args))
+
+
+@pytest.mark.parametrize('name', sorted(factory.FACTORY_FUNCTIONS))
+def test_creates_initialized_crowdsales(setup, name):
+    sale, registry = setup
+    args = factory.example_arguments(name, sale.chain.now(), sale.wallet, sale.token.address)
+    crowdsale, _ = create(sale, registry, name, args, sale.owner)
+
+    assert crowdsale.functions.wallet().call() == sale.wallet
+    assert crowdsale.functions.token().call() == sale.token.address
+    assert crowdsale.functions.weiRaised().call() == 0
+    assert len(sale.chain.w3.eth.getCode(crowdsale.address)) < 100
+
+    if factory.FACTORY_FUNCTIONS[name] == 'createOwnedCrowdsale':
+        assert crowdsale.functions.owner().call() == sale.owner
+        args.append(sale.owner)
+
+    template = factory.at(sale.chain.w3, name, registry['templates'][name])
+
+    for initialized in (crowdsale, template):
+        with pytest.raises(TransactionReverted):
+            sale.chain.transact(initialized.functions.initialize(*args))
+
+
+def test_initializer_checks_the_arguments(setup):
+    sale, registry = setup
+
+    now = sale.chain.now()
+
+    create_reverts(sale, registry, 'capped_crowdsale', [RATE, sale.wallet, sale.token.address, 0])
+    create_reverts(sale, registry, 'crowdsale', [0, sale.wallet, sale.token.address])
+    create_reverts(sale, registry, 'timed_crowdsale', [now + 7200, now + 3600, RATE, sale.wallet, sale.token.address])
+    create_reverts(sale, registry, 'whitelisted_crowdsale', [RATE, '0x' + '0' * 40, sale.token.address])
+
+
+def test_proxies_keep_separate_storage(setup):
+    sale, registry = setup
+    first, _ = create(sale, registry, 'capped_crowdsale', [RATE, sale.wallet, sale.token.address, 3 * VALUE])
+    second, _ = create(sale, registry, 'capped_crowdsale', [2, sale.purchaser, sale.token.address, 5 * VALUE])
+    sale.crowdsale = first
+    sale.fund()
+
+    sale.chain.transact(first.functions.buyTokens(sale.investor), sale.buyer, VALUE)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert first.functions.weiRaised().call() == VALUE
+    assert second.functions.weiRaised().call() == 0
+    assert second.functions.cap().call() == 5 * VALUE
+    assert second.functions.wallet().call() == sale.purchaser
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(first.functions.buyTokens(sale.investor), sale.buyer, 3 * VALUE)
+
+
+def test_command_reuses_the_registry(tmpdir, capsys):
+    chain = Chain()
+    server = RpcServer(chain)
+    registry = str(tmpdir.join('templates.json'))
+    args = ['crowdsale', '1', chain.accounts[9], chain.accounts[8], '--rpc', server.url, '--registry', registry]
+
+    try:
+        factory.main(args)
+        first = factory.load_registry(registry)
+        factory.main(args)
+    finally:
+        server.close()
+
+    assert factory.load_registry(registry) == first
+    assert capsys.readouterr().out.count('Created crowdsale at') == 2
+
+
+def test_arguments_are_parsed_by_type():
+    args = factory.parse_arguments('tiered_price_crowdsale', ['100', '0x' + '11' * 20, '0x' + '22' * 20, '2', '10,20', '5,4'])
+
+    assert args[0] == 100
+    assert args[1] == '0x' + '11' * 20
+    assert args[4] == [10, 20] + [0] * 30
+    assert args[5] == [5, 4] + [0] * 30
+
+    with pytest.raises(ValueError):
+        factory.parse_arguments('crowdsale', ['1'])
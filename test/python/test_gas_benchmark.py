@@ -0,0 +1,36 @@
+import pytest
+
+from sales import Chain
+
+from scripts import gas_benchmark
+
+
+def test_compare_reports_paths_above_threshold():
+    baseline = {'crowdsale': {'buyTokens': 1000, '__default__': 1000}}
+    current = {'crowdsale': {'buyTokens': 1011, '__default__': 1010, 'buyTokens(repeat)': 5000}}
+
+    regressions = gas_benchmark.compare(baseline, current, threshold=1.0)
+
+    assert regressions == [('crowdsale', 'buyTokens', 1000, 1011)]
+
+
+def test_compare_ignores_cheaper_paths():
+    baseline = {'crowdsale': {'buyTokens': 1000}}
+    current = {'crowdsale': {'buyTokens': 900}}
+
+    assert gas_benchmark.compare(baseline, current, threshold=0) == []
+
+
+def test_crowdsale_benchmark_measures_purchase_paths():
+    results = gas_benchmark.bench_crowdsale(Chain())
+
+    assert {'buyTokens', 'buyTokens(repeat)', '__default__'} <= set(results)
+    assert results['buyTokens(repeat)'] < results['buyTokens']
+    assert all(gas > 21000 for gas in results.values())
+
+
+def test_baseline_covers_every_benchmark():
+    baseline = gas_benchmark.load_baseline(gas_benchmark.BASELINE_PATH)
+
+    assert baseline is not None
+    assert set(baseline['gas']) == set(gas_benchmark.BENCHMARKS)
@@ -0,0 +1,72 @@
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from sales import RATE, VALUE, Chain, Sale
+
+from scripts import gas_profile
+from scripts.evm import compile_contract, contract_names
+
+
+@pytest.mark.parametrize('name', contract_names(include_mocks=True))
+def test_source_maps_match_the_runtime_bytecode(name):
+    source = gas_profile.source_map(name)
+
+    assert '0x' + source.bytecode.hex() == compile_contract(name)['bytecode_runtime']
+    assert all(1 <= line <= len(source.source) for line in source.lines)
+
+
+@pytest.fixture(scope='module')
+def purchase():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('capped_crowdsale', RATE, sale.wallet, sale.token.address, 100 * VALUE)
+    sale.fund()
+    receipt = sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+    return sale.chain, receipt
+
+
+def test_profile_attributes_all_gas_of_a_purchase(purchase):
+    chain, receipt = purchase
+    block = chain.w3.eth.blockNumber
+    profile = gas_profile.Profile()
+    profile.add_transaction(chain, receipt.transactionHash)
+
+    assert sum(profile.stacks.values()) - profile.refunded == receipt.gasUsed
+    assert profile.gas_used == receipt.gasUsed
+    assert chain.w3.eth.blockNumber == block
+
+    lines = {(contract, name) for contract, line, name, gas, opcodes in profile.top_lines(10)}
+    assert ('capped_crowdsale', 'processTransaction') in lines
+    assert ('erc20_standard_token', 'transfer') in lines
+
+
+def test_callee_lines_are_stacked_on_the_calling_line(purchase):
+    chain, receipt = purchase
+    profile = gas_profile.Profile()
+    profile.add_transaction(chain, receipt.transactionHash)
+    nested = [stack.split(';') for stack in profile.stacks if 'erc20_standard_token.transfer' in stack]
+
+    assert nested
+    assert all(frames[0] == 'capped_crowdsale.buyTokens' for frames in nested)
+    assert all(frames[1] == 'capped_crowdsale.processTransaction' for frames in nested)
+    assert all(frames[2].startswith('capped_crowdsale.v.py:') for frames in nested)
+
+
+def test_flame_graph_is_valid_svg():
+    stacks = {'tx;a;a.v.py:1': 300, 'tx;a;a.v.py:2': 100, 'tx;(intrinsic)': 21000, 'tx;b': 0}
+    root = ElementTree.fromstring(gas_profile.flame_graph(stacks, 'Gas & more'))
+
+    assert len(root.findall('{http://www.w3.org/2000/svg}g')) == 5
+    assert gas_profile.format_folded(stacks).splitlines()[0] == 'tx;(intrinsic) 21000'
+
+
+def test_command_profiles_the_selected_transactions(tmpdir, capsys):
+    folded, svg = str(tmpdir.join('profile.folded')), str(tmpdir.join('profile.svg'))
+    gas_profile.main(['crowdsale', '--transaction', 'buyTokens', '--function', 'processTransaction', '--folded', folded, '--svg', svg])
+    table = capsys.readouterr().out
+
+    assert 'crowdsale.v.py:' in table
+    assert all(line.startswith('crowdsale.buyTokens;') for line in open(folded))
+    ElementTree.parse(svg)
@@ -0,0 +1,171 @@
+import pytest
+
+from sales import MAINNET_BLOCK_GAS_LIMIT, RATE, VALUE, Chain, TransactionReverted, deploy_generated, padded
+
+from scripts import gas_benchmark
+from scripts.compilation import compile_contract, compile_source
+from scripts.generate import Specification, generate, main
+
+
+# The Merkle proofs, batch purchases and initializers of the hand-written contracts, which are not generated.
+NOT_GENERATED = {
+    'initialize', 'buyTokensBatch',
+    'WhitelistRootChanged', 'whitelistRoot', 'setWhitelistRoot', 'checkWhitelistProof', 'buyTokensWithProof',
+    'CapsRootChanged', 'capsRoot', 'setCapsRoot', 'checkCapProof', 'buyTokensWithCapProof',
+}
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    return deploy_generated(Chain(), ('timed', 'capped', 'whitelisted'), 'minted')
+
+
+def buy(sale, beneficiary, value=VALUE):
+    return sale.chain.transact(sale.crowdsale.functions.buyTokens(beneficiary), sale.purchaser, value)
+
+
+def test_rejects_invalid_specifications():
+    with pytest.raises(ValueError):
+        Specification(['post_delivery'])
+
+    with pytest.raises(ValueError):
+        Specification(['refundable'])
+
+    with pytest.raises(ValueError):
+        Specification(source='burned')
+
+
+def test_command_generates_a_sale_without_features(capsys):
+    main(['--source', 'minted'])
+
+    output = capsys.readouterr()
+
+    assert 'def processTransaction' in output.out
+    assert 'Constructor arguments: _rate, _wallet, _token.' in output.err
+
+    with pytest.raises(SystemExit):
+        main(['refundable'])
+
+
+def test_purchase_runs_the_checks_from_the_cheapest():
+    source = generate(Specification(['individually_capped', 'whitelisted', 'capped', 'timed']))
+    checks = ['self.openingAndClosingTime', 'self.weiRaisedAndCap', 'self.whitelist[', 'self.contributionsAndCaps[']
+    body = source[source.index('def processTransaction'):]
+
+    assert sorted(checks, key=body.index) == checks
+
+
+def test_generated_contracts_expose_the_hand_written_interface():
+    for name, (features, source) in gas_benchmark.GENERATED_SALES.items():
+        if name.startswith('timed_capped'):
+            continue
+
+        generated = {entry.get('name') for entry in compile_source(generate(Specification(features, source)))['abi']}
+        written = {entry.get('name') for entry in compile_contract(name)['abi']}
+
+        assert written - NOT_GENERATED <= generated, name
+
+
+def test_combined_sale_mints_for_whitelisted_beneficiaries(sale):
+    buy(sale, sale.investor)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.crowdsale.functions.weiRaised().call() == VALUE
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, sale.chain.accounts[5])
+
+
+def test_combined_sale_enforces_the_cap_and_the_period(sale):
+    with pytest.raises(TransactionReverted):
+        buy(sale, sale.investor, 100 * VALUE + 1)
+
+    sale.chain.time_travel(sale.crowdsale.functions.closingTime().call() + 1)
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, sale.investor)
+
+
+def test_capped_sales_fill_partially():
+    sale = deploy_generated(Chain(), ('capped', 'individually_capped'))
+    sale.chain.transact(sale.crowdsale.functions.setUserCap(sale.investor, 200 * VALUE), sale.owner)
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, sale.buyer, 10 * VALUE + 1)
+
+    sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    receipt = buy(sale, sale.buyer, 10 * VALUE + 1)
+    event, = sale.crowdsale.events.TokenPurchase().processReceipt(receipt)
+
+    assert event.args._value == 10 * VALUE
+    assert sale.crowdsale.functions.getUserContribution(sale.buyer).call() == 10 * VALUE
+    assert sale.crowdsale.functions.remainingUserCap(sale.buyer).call() == 0
+
+    receipt = buy(sale, sale.investor, 100 * VALUE)
+    event, = sale.crowdsale.events.TokenPurchase().processReceipt(receipt)
+
+    assert event.args._value == 90 * VALUE
+    assert sale.crowdsale.functions.capReached().call()
+    assert sale.chain.w3.eth.getBalance(sale.crowdsale.address) == 0
+
+
+def test_revoked_caps_keep_the_contribution():
+    sale = deploy_generated(Chain(), ('individually_capped',))
+    buy(sale, sale.investor)
+    sale.chain.transact(sale.crowdsale.functions.setUserCap(sale.investor, 0), sale.owner)
+
+    assert sale.crowdsale.functions.getUserContribution(sale.investor).call() == VALUE
+    assert sale.crowdsale.functions.getUserCap(sale.investor).call() == 0
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, sale.investor)
+
+
+def test_allowance_sale_delivers_from_tranches():
+    sale = deploy_generated(Chain(), (), 'allowance')
+    sale.chain.transact(sale.crowdsale.functions.pullTranche(VALUE * RATE), sale.owner)
+    buy(sale, sale.investor)
+
+    assert sale.crowdsale.functions.usesTranches().call()
+    assert sale.crowdsale.functions.getTrancheTokens().call() == 0
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, sale.investor)
+
+    sale.chain.transact(sale.crowdsale.functions.returnTranches(), sale.owner)
+    buy(sale, sale.investor)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == 2 * VALUE * RATE
+
+
+def test_post_delivery_withdraws_after_closing():
+    sale = deploy_generated(Chain(), ('timed', 'post_delivery'), 'allowance')
+    buy(sale, sale.investor)
+    buy(sale, sale.buyer)
+
+    assert sale.crowdsale.functions.balances(sale.investor).call() == VALUE * RATE
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(sale.crowdsale.functions.withdrawTokens(), sale.investor)
+
+    sale.chain.time_travel(sale.crowdsale.functions.closingTime().call() + 1)
+    sale.chain.transact(sale.crowdsale.functions.withdrawTokens(), sale.investor)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+
+    sale.chain.transact(sale.crowdsale.functions.distributeTokens(2, padded([sale.investor, sale.buyer])), sale.purchaser)
+
+    assert sale.token.functions.balanceOf(sale.buyer).call() == VALUE * RATE
+
+
+def test_generated_contracts_are_no_worse_than_hand_written():
+    baseline = gas_benchmark.load_baseline(gas_benchmark.BASELINE_PATH)['gas']
+    results = gas_benchmark.bench_generated_crowdsale(Chain(MAINNET_BLOCK_GAS_LIMIT))
+
+    for name in gas_benchmark.GENERATED_SALES:
+        for path, gas in baseline.get(name, {}).items():
+            key = '{}[{}]'.format(path, name)
+
+            if key in results:
+                assert results[key] <= gas, key
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from sales import Chain, Sale, TransactionReverted
+
+
+def expected_rate(opening, closing, initial, final, time):
+    time = min(max(time, opening), closing)
+    return initial - (time - opening) * (initial - final) // (closing - opening)
+
+
+@pytest.fixture(scope='module')
+def sale():
+    sale = Sale(Chain())
+    sale.deploy_token()
+
+    return sale
+
+
+def deploy(sale, duration, initial, final):
+    opening = sale.chain.now() + 3600
+    closing = opening + duration
+    crowdsale = sale.chain.deploy('increasing_price_crowdsale', opening, closing, sale.wallet, sale.token.address, initial, final)
+
+    return crowdsale, opening, closing
+
+
+@pytest.mark.parametrize('duration, initial, final', [
+    (7 * 24 * 3600, 9166, 5500),
+    (1, 2, 1),
+    (3, 10 ** 18, 1),
+    (365 * 24 * 3600, 2 ** 96 - 1, 7),
+    (2 ** 32 - 1, 2 ** 96 - 1, 1),
+    (1000, 5, 5),
+])
+def test_rates_match_the_linear_formula(sale, duration, initial, final):
+    crowdsale, opening, closing = deploy(sale, duration, initial, final)
+    times = [opening - 1, opening, opening + 1, closing - 1, closing, closing + 1000]
+    times += [opening + random.Random(duration).randrange(duration + 1) for _ in range(20)]
+
+    for time in times:
+        assert crowdsale.functions.getRateAt(time).call() == expected_rate(opening, closing, initial, final, time)
+
+    assert crowdsale.functions.initialRate().call() == initial
+    assert crowdsale.functions.finalRate().call() == final
+
+
+def test_purchase_uses_the_current_rate(sale):
+    crowdsale, opening, closing = deploy(sale, 7 * 24 * 3600, 9166, 5500)
+    sale.chain.transact(sale.token.functions.transfer(crowdsale.address, 10 ** 24))
+    sale.chain.time_travel(opening + 150000)
+
+    receipt = sale.chain.transact(crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 100)
+    now = sale.chain.w3.eth.getBlock(receipt.blockNumber).timestamp
+
+    assert crowdsale.functions.getCurrentRate().call() == expected_rate(opening, closing, 9166, 5500, sale.chain.now())
+    assert sale.token.functions.balanceOf(sale.investor).call() == 100 * expected_rate(opening, closing, 9166, 5500, now)
+
+
+def test_period_longer_than_exact_slope_is_rejected(sale):
+    with pytest.raises(TransactionReverted):
+        deploy(sale, 2 ** 32, 9166, 5500)
@@ -0,0 +1,134 @@
+import pytest
+
+from sales import RATE, Chain, Sale
+
+from scripts.indexer import ChainUnstable, Indexer, ReorgTooDeep
+
+
+@pytest.fixture
+def sale():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    return sale
+
+
+def buy(sale, value, beneficiary=None):
+    return sale.chain.transact(sale.crowdsale.functions.buyTokens(beneficiary or sale.investor), sale.purchaser, value)
+
+
+def mine(sale, count, value=1):
+    for _ in range(count):
+        sale.chain.send(sale.wallet, value, sale.owner)
+
+
+def test_sync_indexes_purchases(sale, tmpdir):
+    receipt = buy(sale, 100)
+    buy(sale, 200, sale.buyer)
+    indexer = Indexer(sale.chain.w3, str(tmpdir.join('purchases.db')), [sale.crowdsale.address], batch_size=2)
+
+    assert indexer.sync() == 2
+    assert indexer.checkpoint() == sale.chain.w3.eth.blockNumber
+
+    rows = indexer.purchases(sale.investor)
+    assert len(rows) == 1
+    assert rows[0][0] == receipt.blockNumber
+    assert rows[0][3:] == (sale.crowdsale.address, sale.purchaser, sale.investor, '100', str(100 * RATE))
+    assert len(indexer.purchases()) == 2
+
+
+def test_restart_resumes_from_the_checkpoint(sale, tmpdir):
+    path = str(tmpdir.join('purchases.db'))
+    buy(sale, 100)
+    indexer = Indexer(sale.chain.w3, path, [sale.crowdsale.address])
+    indexer.sync()
+    indexer.close()
+
+    buy(sale, 200)
+    indexer = Indexer(sale.chain.w3, path, [sale.crowdsale.address])
+
+    assert indexer.sync() == 1
+    assert [row[6] for row in indexer.purchases()] == ['100', '200']
+    assert indexer.sync() == 0
+
+
+def test_reorg_rolls_back_orphaned_purchases(sale, tmpdir):
+    indexer = Indexer(sale.chain.w3, str(tmpdir.join('purchases.db')), [sale.crowdsale.address], reorg_depth=5)
+    buy(sale, 100)
+    snapshot = sale.chain.snapshot()
+    buy(sale, 200)
+    mine(sale, 2)
+    indexer.sync()
+
+    sale.chain.revert(snapshot)
+    buy(sale, 300, sale.buyer)
+    mine(sale, 3)
+
+    assert indexer.sync() == 1
+    assert [row[6] for row in indexer.purchases()] == ['100', '300']
+    assert indexer.checkpoint() == sale.chain.w3.eth.blockNumber
+
+
+def test_reorg_deeper_than_the_depth_is_reported(sale, tmpdir):
+    indexer = Indexer(sale.chain.w3, str(tmpdir.join('purchases.db')), [sale.crowdsale.address], reorg_depth=2)
+    snapshot = sale.chain.snapshot()
+    mine(sale, 4)
+    indexer.sync()
+
+    sale.chain.revert(snapshot)
+    mine(sale, 6, value=2)
+
+    with pytest.raises(ReorgTooDeep):
+        indexer.sync()
+
+
+def test_reorg_between_the_hashes_and_the_events_is_retried(sale, tmpdir, monkeypatch):
+    indexer = Indexer(sale.chain.w3, str(tmpdir.join('purchases.db')), [sale.crowdsale.address], reorg_depth=5)
+    buy(sale, 100)
+    snapshot = sale.chain.snapshot()
+    buy(sale, 200)
+    get_logs = sale.chain.w3.eth.getLogs
+
+    def forking(params):
+        entries = get_logs(params)
+        monkeypatch.setattr(sale.chain.w3.eth, 'getLogs', get_logs)
+
+        # The events of the old chain were read, a fork replaces it before the hashes are checked.
+        sale.chain.revert(snapshot)
+        buy(sale, 300, sale.buyer)
+        mine(sale, 2)
+
+        return entries
+
+    monkeypatch.setattr(sale.chain.w3.eth, 'getLogs', forking)
+
+    assert indexer.sync() == 2
+    assert [row[6] for row in indexer.purchases()] == ['100', '300']
+    assert indexer.checkpoint() == sale.chain.w3.eth.blockNumber
+
+
+def test_chain_reorganized_during_every_attempt_is_reported(sale, tmpdir, monkeypatch):
+    indexer = Indexer(sale.chain.w3, str(tmpdir.join('purchases.db')), [sale.crowdsale.address], reorg_depth=5, retries=2)
+    buy(sale, 100)
+    snapshot = sale.chain.snapshot()
+    mine(sale, 1)
+    get_logs = sale.chain.w3.eth.getLogs
+    calls = []
+
+    def forking(params):
+        entries = get_logs(params)
+        calls.append(params)
+        sale.chain.revert(snapshot)
+        mine(sale, 1, value=len(calls) + 1)
+
+        return entries
+
+    monkeypatch.setattr(sale.chain.w3.eth, 'getLogs', forking)
+
+    with pytest.raises(ChainUnstable):
+        indexer.sync()
+
+    assert len(calls) == 3
+    assert indexer.purchases() == []
@@ -0,0 +1,76 @@
+"""
+Port of the partial fill tests of individually-capped-crowdsale.js.
+"""
+
+import pytest
+
+from sales import RATE, Chain, Sale, TransactionReverted
+
+
+CAP = 10 * 10 ** 18
+LESS_THAN_CAP = 6 * 10 ** 18
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.chain.transact(sale.crowdsale.functions.setUserCap(sale.investor, CAP))
+    sale.fund()
+
+    return sale
+
+
+def buy(sale, value):
+    return sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, value)
+
+
+def test_remaining_cap_is_never_negative(sale):
+    buy(sale, LESS_THAN_CAP)
+
+    assert sale.crowdsale.functions.remainingUserCap(sale.investor).call() == CAP - LESS_THAN_CAP
+    assert sale.crowdsale.functions.remainingUserCap(sale.buyer).call() == 0
+
+    sale.chain.transact(sale.crowdsale.functions.setUserCap(sale.investor, 1))
+
+    assert sale.crowdsale.functions.remainingUserCap(sale.investor).call() == 0
+
+
+def test_purchases_exceeding_the_cap_are_rejected_by_default(sale):
+    buy(sale, LESS_THAN_CAP)
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, LESS_THAN_CAP)
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.owner)
+
+
+def test_partial_fill_sells_the_rest_of_the_cap_and_refunds_the_excess(sale):
+    balance = sale.chain.w3.eth.getBalance
+    sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    buy(sale, LESS_THAN_CAP)
+
+    pre = balance(sale.wallet)
+    receipt = buy(sale, LESS_THAN_CAP)
+    event, = sale.crowdsale.events.TokenPurchase().processReceipt(receipt)
+
+    assert event.args._value == CAP - LESS_THAN_CAP
+    assert balance(sale.wallet) - pre == CAP - LESS_THAN_CAP
+    assert sale.token.functions.balanceOf(sale.investor).call() == CAP * RATE
+    assert sale.crowdsale.functions.weiRaised().call() == CAP
+    assert sale.crowdsale.functions.remainingUserCap(sale.investor).call() == 0
+
+    with pytest.raises(TransactionReverted):
+        buy(sale, 1)
+
+
+def test_accumulating_sale_keeps_only_the_filled_part(sale):
+    sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    sale.chain.transact(sale.crowdsale.functions.setAccumulateFunds(True), sale.wallet)
+    buy(sale, CAP + LESS_THAN_CAP)
+
+    assert sale.chain.w3.eth.getBalance(sale.crowdsale.address) == CAP
+    assert sale.crowdsale.functions.partialFills().call() is True
+    assert sale.crowdsale.functions.accumulateFunds().call() is True
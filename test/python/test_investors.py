@@ -0,0 +1,86 @@
+import pytest
+
+from sales import MAINNET_BLOCK_GAS_LIMIT, RATE, VALUE, Chain, Sale, TransactionReverted, addresses, padded
+
+from scripts import investors
+from scripts.evm import pack_addresses
+
+from rpc_server import RpcServer
+
+
+@pytest.fixture(scope='module')
+def capped():
+    sale = Sale(Chain(MAINNET_BLOCK_GAS_LIMIT))
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    group = addresses(1200)
+
+    for start in range(0, len(group), 500):
+        sale.chain.transact(sale.crowdsale.functions.setGroupCapBulk(pack_addresses(group[start:start + 500]), 10 * VALUE))
+
+    for beneficiary in (group[0], group[700], group[-1]):
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(beneficiary), sale.purchaser, VALUE)
+
+    return sale, group
+
+
+def test_bulk_caps_and_contributions(capped):
+    sale, group = capped
+    packed = pack_addresses(group[:3] + [sale.investor])
+
+    assert sale.crowdsale.functions.getUserCapsBulk(packed).call()[:5] == [10 * VALUE] * 3 + [0, 0]
+    assert sale.crowdsale.functions.getUserContributionsBulk(packed).call()[:5] == [VALUE, 0, 0, 0, 0]
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(sale.crowdsale.functions.getUserCapsBulk(packed[:-1]))
+
+
+def test_large_lists_are_read_in_chunks_in_order(capped):
+    sale, group = capped
+    rows = investors.read_investors(sale.crowdsale, 'individually_capped_crowdsale', group + [sale.investor])
+
+    assert [row[0] for row in rows] == group + [sale.investor]
+    assert all(row[1] == 10 * VALUE for row in rows[:-1])
+    assert rows[-1][1] == 0
+    assert [row[0] for row in rows if row[2]] == [group[0], group[700], group[-1]]
+
+    small = investors.read_investors(sale.crowdsale, 'individually_capped_crowdsale', group[:120], chunk_size=50)
+    assert small == rows[:120]
+
+
+def test_bulk_whitelist_status():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('whitelisted_crowdsale', RATE, sale.wallet, sale.token.address)
+    group = addresses(20)
+    sale.chain.transact(sale.crowdsale.functions.addAddressesToWhitelist(10, padded(group[:10])))
+
+    rows = investors.read_investors(sale.crowdsale, 'whitelisted_crowdsale', group)
+
+    assert [row[1] for row in rows] == [True] * 10 + [False] * 10
+    assert sale.crowdsale.functions.checkIfWhitelistedBulk(b'').call() == [False] * 500
+
+
+def test_command_writes_pending_balances(tmpdir, capsys):
+    sale = Sale(Chain())
+    sale.deploy_token()
+    opening, closing = sale.opening_and_closing()
+    sale.crowdsale = sale.chain.deploy('post_delivery_crowdsale', opening, closing, RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    sale.chain.time_travel(opening + 60)
+    group = addresses(3)
+    sale.chain.transact(sale.crowdsale.functions.buyTokensBatch(2, padded(group[:2]), padded([VALUE, 2 * VALUE], filler=0)), sale.purchaser, 3 * VALUE)
+
+    investors_file = tmpdir.join('investors.txt')
+    investors_file.write('# investors\n' + '\n'.join(group) + '\n' + group[0].lower() + '\n')
+    server = RpcServer(sale.chain)
+
+    try:
+        investors.main([sale.crowdsale.address, str(investors_file), '--rpc', server.url])
+    finally:
+        server.close()
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines == ['address,balance', '{},{}'.format(group[0], VALUE), '{},{}'.format(group[1], 2 * VALUE), '{},0'.format(group[2])]
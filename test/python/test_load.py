@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from sales import Chain
+
+from scripts import load
+from scripts.load import classify, parse_mix, percentile, revert_reason, summarize
+from rpc_server import RpcServer
+
+
+ACCOUNTS = 8
+
+
+@pytest.fixture
+def server():
+    chain = Chain()
+
+    # The in-process chain only runs calls from accounts it knows, which the reverted purchases are replayed with.
+    for account in load.make_accounts(ACCOUNTS, 1):
+        chain.tester.add_account(account.privateKey.hex())
+
+    server = RpcServer(chain)
+    yield server
+    server.close()
+
+
+def run(server, tmpdir, *args):
+    output = str(tmpdir.join('report.json'))
+    load.main(list(args) + ['--rpc', server.url, '--output', output, '--poll-interval', '0.01'])
+
+    with open(output) as f:
+        return json.load(f)
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.9) == 7
+    assert percentile([], 0.5) is None
+
+
+def test_revert_reasons_are_read_from_messages_and_data():
+    data = '0x08c379a0' + (32).to_bytes(32, 'big').hex() + (5).to_bytes(32, 'big').hex() + b'Oops!'.hex().ljust(64, '0')
+
+    assert revert_reason({'message': 'VM Exception while processing transaction: revert Sorry but this exceeds the cap.'}) == 'Sorry but this exceeds the cap.'
+    assert revert_reason({'message': 'execution reverted', 'data': data}) == 'Oops!'
+    assert classify('Maximum user funding cap exceeded.') == 'cap exceeded'
+    assert classify('This address is not whitelisted to contribute.') == 'not whitelisted'
+    assert classify('Sorry but the crowdsale was already concluded.') == 'closed'
+    assert classify('Out of gas') == 'other'
+
+
+def test_mix_rejects_unknown_paths():
+    assert parse_mix('buyTokens=3,__default__') == [('buyTokens', 3.0), ('__default__', 1.0)]
+
+    with pytest.raises(ValueError):
+        parse_mix('buyTokensBatch=1')
+
+
+def test_summary_splits_reverts_by_reason():
+    results = [
+        {'path': 'buyTokens', 'latency': 0.1, 'gas': 50000, 'success': True},
+        {'path': '__default__', 'latency': 0.2, 'gas': 25000, 'success': False, 'reason': 'Sorry but this exceeds the cap.'},
+    ]
+    report = summarize(results, 2.0)
+
+    assert report['transactions_per_second'] == 1.0
+    assert report['gas_per_success'] == 50000
+    assert report['gas_wasted_on_reverts'] == 25000
+    assert report['reverts']['cap exceeded']['rate'] == 0.5
+    assert report['latency_ms']['max'] == 200
+
+
+def test_capped_sale_reverts_purchases_beyond_the_cap(server, tmpdir):
+    report = run(server, tmpdir, 'capped_crowdsale', '--accounts', str(ACCOUNTS), '--purchases', str(2 * ACCOUNTS), '--concurrency', '8')
+
+    assert report['transactions'] == 16
+    assert report['succeeded'] == 8
+    assert report['reverts']['cap exceeded']['count'] == 8
+    assert report['gas_per_success'] > 21000
+    assert report['config']['contract'] == 'capped_crowdsale'
+
+
+def test_individually_capped_sale_reverts_purchases_beyond_each_cap(server, tmpdir):
+    report = run(server, tmpdir, 'individually_capped_crowdsale', '--accounts', '4', '--purchases', '12', '--mix', 'buyTokens=1')
+
+    assert report['succeeded'] == 8
+    assert report['reverts']['cap exceeded']['reasons'] == {'Maximum user funding cap exceeded.': 4}
+    assert report['paths'] == {'buyTokens': 12, '__default__': 0}
+
+
+def test_partial_fills_reduce_the_gas_wasted_at_the_cap(server, tmpdir):
+    args = ['capped_crowdsale', '--accounts', '4', '--purchases', '16', '--cap', '0.075', '--value-spread', '0.2', '--stop-when-capped', '--concurrency', '1']
+    rejecting = run(server, tmpdir, *args)
+    filling = run(server, tmpdir, *args, '--partial-fills')
+
+    assert rejecting['partially_filled'] == 0
+    assert filling['partially_filled'] == 1
+    assert filling['refunded_wei'] > 0
+    assert filling['skipped'] > rejecting['skipped']
+    assert filling['gas_wasted_on_reverts'] < rejecting['gas_wasted_on_reverts']
+
+
+def test_partial_fills_fill_each_user_cap(server, tmpdir):
+    args = ['individually_capped_crowdsale', '--accounts', '4', '--purchases', '12', '--value-spread', '0.4', '--concurrency', '4']
+    rejecting = run(server, tmpdir, *args)
+    filling = run(server, tmpdir, *args, '--partial-fills')
+
+    assert filling['partially_filled'] > 0
+    assert filling['succeeded'] > rejecting['succeeded']
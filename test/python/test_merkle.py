@@ -0,0 +1,147 @@
+import pytest
+
+from sales import RATE, Chain, Sale, TransactionReverted, addresses
+
+from scripts import merkle
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 7, 100])
+def test_every_proof_verifies(count):
+    tree, proofs = merkle.whitelist_tree(addresses(count))
+
+    for address, proof in proofs.items():
+        assert merkle.verify(merkle.address_leaf(address), proof, tree.root)
+
+
+def test_proof_does_not_verify_other_addresses():
+    tree, proofs = merkle.whitelist_tree(addresses(10))
+    outsider = addresses(1, offset=100)[0]
+
+    for proof in proofs.values():
+        assert not merkle.verify(merkle.address_leaf(outsider), proof, tree.root)
+
+
+def test_duplicates_are_ignored():
+    tree, proofs = merkle.whitelist_tree(addresses(3) + addresses(3))
+
+    assert len(proofs) == 3
+    assert len(tree.levels[0]) == 3
+
+
+def test_empty_tree_is_rejected():
+    with pytest.raises(ValueError):
+        merkle.MerkleTree([])
+
+
+@pytest.fixture(scope='module')
+def whitelisted_sale():
+    chain = Chain()
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('whitelisted_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    return sale
+
+
+def test_contract_accepts_proofs(whitelisted_sale):
+    sale, chain = whitelisted_sale, whitelisted_sale.chain
+    tree, proofs = merkle.whitelist_tree(addresses(37) + [sale.investor])
+    chain.transact(sale.crowdsale.functions.setWhitelistRoot(tree.root))
+
+    for address in (sale.investor, addresses(37)[0], addresses(37)[36]):
+        proof, length = merkle.contract_proof(proofs[address])
+        assert sale.crowdsale.functions.checkWhitelistProof(address, proof, length).call()
+
+    proof, length = merkle.contract_proof(proofs[sale.investor])
+    chain.transact(sale.crowdsale.functions.buyTokensWithProof(sale.investor, proof, length), sale.purchaser, 100)
+    assert sale.token.functions.balanceOf(sale.investor).call() == 100 * RATE
+
+
+def test_contract_rejects_invalid_proofs(whitelisted_sale):
+    sale, chain = whitelisted_sale, whitelisted_sale.chain
+    tree, proofs = merkle.whitelist_tree(addresses(5))
+    chain.transact(sale.crowdsale.functions.setWhitelistRoot(tree.root))
+
+    proof, length = merkle.contract_proof(proofs[addresses(5)[0]])
+    assert not sale.crowdsale.functions.checkWhitelistProof(sale.buyer, proof, length).call()
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(sale.crowdsale.functions.buyTokensWithProof(sale.buyer, proof, length), sale.purchaser, 100)
+
+
+def test_caps_tree_rejects_duplicate_addresses():
+    address = addresses(1)[0]
+
+    with pytest.raises(ValueError):
+        merkle.caps_tree([(address, 1), (address.lower(), 2)])
+
+
+@pytest.fixture(scope='module')
+def capped_sale():
+    chain = Chain()
+    sale = Sale(chain)
+    sale.deploy_token()
+    sale.crowdsale = chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    return sale
+
+
+def test_contract_stores_cap_on_first_purchase(capped_sale):
+    sale, chain = capped_sale, capped_sale.chain
+    caps = [(address, 1000) for address in addresses(20)] + [(sale.investor, 500)]
+    tree, proofs = merkle.caps_tree(caps)
+    chain.transact(sale.crowdsale.functions.setCapsRoot(tree.root))
+
+    cap, proof = proofs[sale.investor]
+    proof, length = merkle.contract_proof(proof)
+    assert sale.crowdsale.functions.checkCapProof(sale.investor, cap, proof, length).call()
+    assert not sale.crowdsale.functions.checkCapProof(sale.investor, cap + 1, proof, length).call()
+
+    buy = sale.crowdsale.functions.buyTokensWithCapProof(sale.investor, cap, proof, length)
+    chain.transact(buy, sale.purchaser, 300)
+    assert sale.crowdsale.functions.getUserCap(sale.investor).call() == 500
+
+    chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 200)
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 1)
+
+
+def test_contract_rejects_inflated_caps(capped_sale):
+    sale, chain = capped_sale, capped_sale.chain
+    tree, proofs = merkle.caps_tree([(sale.buyer, 500), (addresses(1)[0], 1000)])
+    chain.transact(sale.crowdsale.functions.setCapsRoot(tree.root))
+
+    cap, proof = proofs[sale.buyer]
+    proof, length = merkle.contract_proof(proof)
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(sale.crowdsale.functions.buyTokensWithCapProof(sale.buyer, 1000, proof, length), sale.purchaser, 600)
+
+
+def test_contract_does_not_restore_revoked_caps(capped_sale):
+    sale, chain = capped_sale, capped_sale.chain
+    tree, proofs = merkle.caps_tree([(sale.buyer, 500), (sale.investor, 1000)])
+    chain.transact(sale.crowdsale.functions.setCapsRoot(tree.root))
+
+    cap, proof = proofs[sale.buyer]
+    proof, length = merkle.contract_proof(proof)
+    buy = sale.crowdsale.functions.buyTokensWithCapProof(sale.buyer, cap, proof, length)
+    chain.transact(buy, sale.purchaser, 100)
+    chain.transact(sale.crowdsale.functions.setUserCap(sale.buyer, 0))
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(buy, sale.purchaser, 100)
+
+    assert sale.crowdsale.functions.getUserCap(sale.buyer).call() == 0
+    assert sale.crowdsale.functions.getUserContribution(sale.buyer).call() == 100
+
+    # A cap set by the owner before the first purchase also takes precedence over the tree.
+    cap, proof = proofs[sale.investor]
+    proof, length = merkle.contract_proof(proof)
+    chain.transact(sale.crowdsale.functions.setGroupCap(1, [sale.investor] * 50, 0))
+
+    with pytest.raises(TransactionReverted):
+        chain.transact(sale.crowdsale.functions.buyTokensWithCapProof(sale.investor, cap, proof, length), sale.purchaser, 100)
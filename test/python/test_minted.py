@@ -0,0 +1,67 @@
+"""
+Port of the batch tests of minted-crowdsale.js.
+"""
+
+import pytest
+
+from sales import Chain, Sale, TransactionReverted, padded
+
+from scripts.evm import to_bytes32
+
+
+RATE = 1000
+VALUE = 5 * 10 ** 18
+ANOTHER_VALUE = 2 * 10 ** 18
+MAXIMUM_SUPPLY = 10 ** 28
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.token = sale.chain.deploy('mintable_token', to_bytes32('Name'), to_bytes32('SYMBOL'), 0, MAXIMUM_SUPPLY, 18)
+    sale.crowdsale = sale.chain.deploy('minted_crowdsale', RATE, sale.wallet, sale.token.address)
+
+    return sale
+
+
+def mint_batch(sale, amounts, sender=None):
+    function = sale.token.functions.mintBatch(2, padded([sale.investor, sale.buyer]), padded(amounts, filler=0))
+    return sale.chain.transact(function, sender)
+
+
+def buy_batch(sale, count):
+    beneficiaries, amounts = [sale.investor, sale.buyer][:count], [VALUE, ANOTHER_VALUE][:count]
+    function = sale.crowdsale.functions.buyTokensBatch(count, padded(beneficiaries), padded(amounts, filler=0))
+    return sale.chain.transact(function, sale.purchaser, sum(amounts))
+
+
+def test_mint_batch_updates_each_balance_and_the_total_supply(sale):
+    mint_batch(sale, [3, 4])
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == 3
+    assert sale.token.functions.balanceOf(sale.buyer).call() == 4
+    assert sale.token.functions.totalSupply().call() == 7
+
+
+def test_mint_batch_checks_the_owner_and_the_maximum_supply(sale):
+    with pytest.raises(TransactionReverted):
+        mint_batch(sale, [3, 4], sale.purchaser)
+
+    with pytest.raises(TransactionReverted):
+        mint_batch(sale, [MAXIMUM_SUPPLY, 1])
+
+    sale.chain.transact(sale.token.functions.finishMinting())
+
+    with pytest.raises(TransactionReverted):
+        mint_batch(sale, [3, 4])
+
+
+@pytest.mark.parametrize('count', [1, 2])
+def test_batch_purchase_mints_for_each_beneficiary(sale, count):
+    sale.chain.transact(sale.token.functions.transferOwnership(sale.crowdsale.address))
+    receipt = buy_batch(sale, count)
+    events = sale.crowdsale.events.TokenPurchase().processReceipt(receipt)
+
+    assert [event.args._beneficiary for event in events] == [sale.investor, sale.buyer][:count]
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.token.functions.totalSupply().call() == sum([VALUE, ANOTHER_VALUE][:count]) * RATE
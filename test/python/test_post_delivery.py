@@ -0,0 +1,58 @@
+"""
+Port of the distribution tests of post-delivery-crowdsale.js.
+"""
+
+import pytest
+
+from sales import RATE, Chain, Sale, TransactionReverted, padded
+
+
+VALUE = 42 * 10 ** 18
+ANOTHER_VALUE = 3 * 10 ** 18
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    opening, closing = sale.opening_and_closing()
+    sale.crowdsale = sale.chain.deploy('post_delivery_crowdsale', opening, closing, RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    sale.chain.time_travel(opening)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.buyer), sale.purchaser, ANOTHER_VALUE)
+    sale.closing = closing
+
+    return sale
+
+
+def distribute(sale):
+    function = sale.crowdsale.functions.distributeTokens(2, padded([sale.investor, sale.buyer]))
+    return sale.chain.transact(function, sale.purchaser)
+
+
+def test_distribution_is_rejected_before_closing(sale):
+    with pytest.raises(TransactionReverted):
+        distribute(sale)
+
+
+def test_anyone_delivers_the_tokens_of_many_beneficiaries(sale):
+    sale.chain.time_travel(sale.closing + 1)
+    distribute(sale)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.token.functions.balanceOf(sale.buyer).call() == ANOTHER_VALUE * RATE
+    assert sale.crowdsale.functions.balances(sale.investor).call() == 0
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(sale.crowdsale.functions.withdrawTokens(), sale.investor)
+
+
+def test_beneficiaries_who_withdrew_are_skipped(sale):
+    sale.chain.time_travel(sale.closing + 1)
+    sale.chain.transact(sale.crowdsale.functions.withdrawTokens(), sale.investor)
+    distribute(sale)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() == VALUE * RATE
+    assert sale.token.functions.balanceOf(sale.buyer).call() == ANOTHER_VALUE * RATE
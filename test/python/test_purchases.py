@@ -0,0 +1,111 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from sales import RATE, Chain, Sale
+
+from scripts import purchases
+from scripts.indexer import TOKEN_PURCHASE_TOPIC, decode_purchase
+
+from rpc_server import RpcServer
+
+
+@pytest.fixture(scope='module')
+def sale():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.crowdsale = sale.chain.deploy('crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    for value, beneficiary in ((100, sale.investor), (200, sale.buyer), (300, sale.investor)):
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(beneficiary), sale.purchaser, value)
+
+    return sale
+
+
+def get_logs(sale):
+    return sale.chain.w3.eth.getLogs({'fromBlock': 0, 'address': sale.crowdsale.address, 'topics': [TOKEN_PURCHASE_TOPIC]})
+
+
+def test_columns_match_the_indexer_rows(sale):
+    entries = get_logs(sale)
+    columns = purchases.decode_purchases(entries)
+    rows = [decode_purchase(entry) for entry in entries]
+
+    assert columns.value.dtype == np.uint64
+    assert purchases.checksum_addresses(columns.purchaser) == [row[4] for row in rows]
+    assert purchases.checksum_addresses(columns.beneficiary) == [row[5] for row in rows]
+    assert [str(value) for value in purchases.uint64_values(columns.value)] == [row[6] for row in rows] == ['100', '200', '300']
+    assert [str(amount) for amount in purchases.python_ints(columns.amount)] == [row[7] for row in rows]
+    assert columns.block.tolist() == [row[0] for row in rows]
+    assert columns.logIndex.tolist() == [row[1] for row in rows]
+
+
+def test_raw_and_formatted_logs_decode_alike():
+    entries = purchases.synthetic_logs(50)
+    columns = purchases.decode_purchases(entries)
+    raw = purchases.decode_purchases(purchases.raw_logs(entries))
+    generic = purchases.decode_generic(entries)
+
+    for name in purchases.COLUMNS:
+        assert np.array_equal(getattr(columns, name), getattr(raw, name))
+
+    assert purchases.checksum_addresses(columns.beneficiary) == [event.args._beneficiary for event in generic]
+    assert purchases.python_ints(columns.value) == [event.args._value for event in generic]
+    assert purchases.python_ints(columns.amount) == [event.args._amount for event in generic]
+    assert columns.block.tolist() == [event.blockNumber for event in generic]
+
+
+def test_values_above_64_bits_stay_in_words():
+    entries = purchases.synthetic_logs(3)
+    large = 2 ** 200 + 5
+    entries[1]['data'] = '0x' + (2 ** 64).to_bytes(32, 'big').hex() + large.to_bytes(32, 'big').hex()
+    columns = purchases.decode_purchases(entries)
+
+    assert columns.amount.dtype == np.uint64
+    assert columns.amount.shape == (3, 4)
+    assert columns.amount[1].tolist() == [2 ** 8, 0, 0, 5]
+    assert purchases.python_ints(columns.value)[1] == 2 ** 64
+    assert purchases.python_ints(columns.amount) == [int(entry['data'][66:], 16) for entry in entries]
+
+    with pytest.raises(OverflowError):
+        purchases.uint64_values(columns.value)
+
+    assert purchases.uint64_values(columns.value[::2]).tolist() == [int(entries[i]['data'][2:66], 16) for i in (0, 2)]
+
+
+def test_other_logs_are_rejected():
+    entries = purchases.synthetic_logs(3)
+    entries[2]['topics'] = [entries[2]['topics'][1]] * 3
+
+    with pytest.raises(ValueError, match='Log 2'):
+        purchases.decode_purchases(entries)
+
+    with pytest.raises(ValueError):
+        purchases.decode_purchases(entries[:1] + [dict(entries[1], data='0x')])
+
+    assert purchases.decode_purchases([]).value.shape == (0, 4)
+
+
+def test_command_fetches_raw_logs_into_npz(sale, tmpdir):
+    path = str(tmpdir.join('purchases.npz'))
+    server = RpcServer(sale.chain)
+
+    try:
+        purchases.main([path, sale.crowdsale.address, '--rpc', server.url, '--batch-size', '2'])
+    finally:
+        server.close()
+
+    columns = np.load(path)
+    expected = purchases.decode_purchases(get_logs(sale))
+
+    for name in purchases.COLUMNS:
+        assert np.array_equal(columns[name], getattr(expected, name))
+
+
+def test_benchmark_reports_both_paths(capsys):
+    purchases.main(['--benchmark', '20'])
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert [line.split()[0] for line in lines] == ['generic', 'vectorized', 'vectorized']
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from sales import TOKEN_SUPPLY, VALUE, Chain, Sale, deploy_generated
+
+from scripts import factory, reader
+from scripts.compilation import compile_contract
+from scripts.generate import Specification, generate
+
+from rpc_server import RpcServer
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sales = {}
+
+    for name in sorted(reader.CONTRACT_FIELDS):
+        args = factory.example_arguments(name, sale.chain.now(), sale.wallet, sale.token.address)
+        sales[name] = sale.chain.deploy(name, *args)
+
+    sales['allowance_crowdsale'] = sale.chain.deploy('allowance_crowdsale', 1, sale.wallet, sale.token.address, sale.owner)
+    sale.chain.transact(sale.token.functions.approve(sales['allowance_crowdsale'].address, TOKEN_SUPPLY // 2))
+    sale.crowdsale = sales['capped_crowdsale']
+    sale.chain.transact(sale.token.functions.transfer(sale.crowdsale.address, TOKEN_SUPPLY // 2))
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+    return sale, sales, sale.chain.deploy(reader.READER)
+
+
+def test_sales_are_identified_by_their_code(deployment):
+    sale, sales, contract = deployment
+    registry = {'factory': None, 'templates': {'crowdsale': sales['crowdsale'].address}}
+    crowdsale_factory, template = factory.ensure_deployed(sale.chain.w3, registry, 'crowdsale')
+    proxy, _ = factory.create(sale.chain.w3, crowdsale_factory, 'crowdsale', template, [1, sale.wallet, sale.token.address])
+
+    assert all(reader.identify(sale.chain.w3, crowdsale.address) == name for name, crowdsale in sales.items())
+    assert reader.identify(sale.chain.w3, proxy.address) == 'crowdsale'
+
+    with pytest.raises(ValueError):
+        reader.identify(sale.chain.w3, sale.token.address)
+
+
+def test_fields_are_the_getters_of_each_contract():
+    for name, fields in reader.CONTRACT_FIELDS.items():
+        assert reader.abi_fields(compile_contract(name)['abi']) == fields, name
+
+
+def test_statuses_match_the_getters(deployment):
+    sale, sales, contract = deployment
+    statuses = reader.read_statuses(contract, [(crowdsale.address, name) for name, crowdsale in sorted(sales.items())])
+
+    for status in statuses:
+        functions = sales[status.contract].functions
+
+        assert status.weiRaised == functions.weiRaised().call()
+
+        if status.contract in ('increasing_price_crowdsale', 'tiered_price_crowdsale'):
+            assert status.rate == functions.getCurrentRate().call()
+        else:
+            assert status.rate == functions.rate().call()
+
+        if status.openingTime is not None:
+            assert (status.openingTime, status.closingTime) == (functions.openingTime().call(), functions.closingTime().call())
+            assert status.hasClosed is False
+
+    by_name = {status.contract: status for status in statuses}
+
+    assert by_name['capped_crowdsale'].weiRaised == VALUE
+    assert by_name['capped_crowdsale'].capReached is True
+    assert by_name['allowance_crowdsale'].remainingTokens == TOKEN_SUPPLY // 2
+    assert by_name['crowdsale'].cap is None
+    assert by_name['crowdsale'].openingTime is None
+
+
+def test_long_lists_are_read_in_chunks_at_one_block(deployment, monkeypatch):
+    sale, sales, contract = deployment
+    manager = sale.chain.w3.manager
+    request_blocking = manager.request_blocking
+    calls = []
+
+    def counting(method, params):
+        if method == 'eth_call':
+            calls.append(params[1])
+
+        return request_blocking(method, params)
+
+    monkeypatch.setattr(manager, 'request_blocking', counting)
+    pairs = sorted((crowdsale.address, name) for name, crowdsale in sales.items())
+
+    assert len(reader.read_statuses(contract, pairs)) == len(pairs)
+    assert len(calls) == 1
+
+    del calls[:]
+    statuses = reader.read_statuses(contract, pairs * 12)
+
+    assert [(status.address, status.contract) for status in statuses] == pairs * 12
+    assert len(calls) == 3
+    assert len(set(calls)) == 1
+
+
+def test_fifty_sales_fit_in_the_call_gas(deployment):
+    sale, sales, contract = deployment
+    tiered = sales['tiered_price_crowdsale'].address
+    fields = [reader.CONTRACT_FIELDS['tiered_price_crowdsale']] * reader.MAX_SALES
+
+    assert contract.functions.getStatuses(reader.MAX_SALES, [tiered] * reader.MAX_SALES, fields).estimateGas() < reader.CALL_GAS
+
+
+def test_command_deploys_a_reader_and_prints_json(capsys):
+    sale = Sale(Chain())
+    sale.deploy_token()
+    crowdsale = sale.chain.deploy('capped_crowdsale', 1, sale.wallet, sale.token.address, VALUE)
+    server = RpcServer(sale.chain)
+
+    try:
+        reader.main([crowdsale.address, '--rpc', server.url, '--json'])
+    finally:
+        server.close()
+
+    output = capsys.readouterr()
+    status, = json.loads(output.out)
+
+    assert 'Deployed the reader at' in output.err
+    assert status['contract'] == 'capped_crowdsale'
+    assert status['cap'] == VALUE
+    assert status['openingTime'] is None
+
+
+def test_command_reads_generated_sales_from_their_source(capsys, tmpdir):
+    features = ('timed', 'capped', 'whitelisted')
+    sale = deploy_generated(Chain(), features)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+    path = tmpdir.join('timed_capped_whitelisted.v.py')
+    path.write(generate(Specification(features)))
+    server = RpcServer(sale.chain)
+
+    try:
+        with pytest.raises(SystemExit):
+            reader.main([sale.crowdsale.address, '--rpc', server.url])
+
+        reader.main([sale.crowdsale.address, '--rpc', server.url, '--json', '--source', str(path)])
+    finally:
+        server.close()
+
+    status, = json.loads(capsys.readouterr().out)
+
+    assert status['contract'] == 'timed_capped_whitelisted'
+    assert status['weiRaised'] == VALUE
+    assert status['cap'] == 100 * VALUE
+    assert status['closingTime'] == sale.crowdsale.functions.closingTime().call()
+    assert status['remainingTokens'] is None
@@ -0,0 +1,84 @@
+import pytest
+
+from sales import RATE, VALUE, Chain, Sale, TransactionReverted
+
+
+MAX_RATE = 2 ** 96 - 1
+
+
+@pytest.fixture
+def sale():
+    sale = Sale(Chain())
+    sale.deploy_token()
+
+    return sale
+
+
+def test_packed_configuration_reads_back(sale):
+    crowdsale = sale.chain.deploy('crowdsale', MAX_RATE, sale.wallet, sale.token.address)
+
+    assert crowdsale.functions.token().call() == sale.token.address
+    assert crowdsale.functions.rate().call() == MAX_RATE
+    assert crowdsale.functions.wallet().call() == sale.wallet
+    assert crowdsale.functions.accumulateFunds().call() is False
+
+
+def test_rate_must_fit_in_96_bits(sale):
+    with pytest.raises(TransactionReverted):
+        sale.chain.deploy('crowdsale', MAX_RATE + 1, sale.wallet, sale.token.address)
+
+
+def test_accumulate_flag_keeps_wallet(sale):
+    crowdsale = sale.chain.deploy('crowdsale', RATE, sale.wallet, sale.token.address)
+
+    sale.chain.transact(crowdsale.functions.setAccumulateFunds(True), sale.wallet)
+    assert crowdsale.functions.accumulateFunds().call() is True
+    assert crowdsale.functions.wallet().call() == sale.wallet
+
+    sale.chain.transact(crowdsale.functions.setAccumulateFunds(False), sale.wallet)
+    assert crowdsale.functions.accumulateFunds().call() is False
+    assert crowdsale.functions.wallet().call() == sale.wallet
+
+
+def test_packed_cap_and_amount_raised(sale):
+    sale.crowdsale = sale.chain.deploy('capped_crowdsale', RATE, sale.wallet, sale.token.address, 3 * VALUE)
+    sale.fund()
+
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 2 * VALUE)
+
+    assert sale.crowdsale.functions.cap().call() == 3 * VALUE
+    assert sale.crowdsale.functions.weiRaised().call() == 2 * VALUE
+    assert not sale.crowdsale.functions.capReached().call()
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 2 * VALUE)
+
+
+def test_packed_times_and_rates(sale):
+    opening, closing = sale.opening_and_closing()
+    crowdsale = sale.chain.deploy('increasing_price_crowdsale', opening, closing, sale.wallet, sale.token.address, 9166, 5500)
+
+    assert crowdsale.functions.openingTime().call() == opening
+    assert crowdsale.functions.closingTime().call() == closing
+    assert crowdsale.functions.initialRate().call() == 9166
+    assert crowdsale.functions.finalRate().call() == 5500
+
+
+def test_packed_user_cap_and_contribution(sale):
+    sale.crowdsale = sale.chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    functions = sale.crowdsale.functions
+
+    sale.chain.transact(functions.setUserCap(sale.investor, 3 * VALUE))
+    sale.chain.transact(functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+    sale.chain.transact(functions.setUserCap(sale.investor, 2 * VALUE))
+
+    assert functions.caps(sale.investor).call() == 2 * VALUE
+    assert functions.contributions(sale.investor).call() == VALUE
+    assert functions.getUserContribution(sale.investor).call() == VALUE
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(functions.buyTokens(sale.investor), sale.purchaser, VALUE + 1)
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.transact(functions.setUserCap(sale.investor, 2 ** 128))
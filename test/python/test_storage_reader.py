@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from sales import MAINNET_BLOCK_GAS_LIMIT, RATE, VALUE, Chain, Sale, addresses, padded
+
+from scripts import factory, reader, storage
+from scripts.evm import pack_addresses
+
+from rpc_server import RpcServer
+
+
+@pytest.fixture
+def served():
+    sale = Sale(Chain(MAINNET_BLOCK_GAS_LIMIT))
+    sale.deploy_token()
+    server = RpcServer(sale.chain)
+    yield sale, server
+    server.close()
+
+
+def test_layout_follows_the_declaration_order():
+    variables = storage.layout('individually_capped_crowdsale')
+
+    assert list(variables)[:3] == ['contributionsAndCaps', 'capsRoot', 'owner']
+    assert [variable.slot for variable in variables.values()] == list(range(len(variables)))
+
+
+def test_slots_need_a_key_for_each_map_and_list():
+    variables = storage.layout('tiered_price_crowdsale')
+
+    assert storage.slot(variables['tierCount'])[0] == 1
+
+    with pytest.raises(TypeError):
+        storage.slot(variables['tiers'])
+
+    with pytest.raises(IndexError):
+        storage.slot(variables['tiers'], 32)
+
+    with pytest.raises(TypeError):
+        storage.slot(variables['tierCount'], 0)
+
+
+@pytest.mark.parametrize('name', sorted(reader.CONTRACT_FIELDS))
+def test_state_matches_the_getters(served, name):
+    sale, server = served
+    args = factory.example_arguments(name, sale.chain.now(), sale.wallet, sale.token.address)
+    crowdsale = sale.chain.deploy(name, *args)
+    block, state = storage.read_state(server.url, crowdsale.address, name)
+    fields = {}
+
+    for value in state.values():
+        if isinstance(value, dict):
+            fields.update(value)
+
+    assert block == sale.chain.w3.eth.blockNumber
+    assert state.get('token', fields.get('token')) == crowdsale.functions.token().call()
+    assert fields['wallet'] == crowdsale.functions.wallet().call()
+    assert fields['accumulateFunds'] is False
+    assert state.get('weiRaised', fields.get('weiRaised')) == 0
+
+    if 'rate' in fields and name != 'tiered_price_crowdsale':
+        assert fields['rate'] == crowdsale.functions.rate().call()
+
+    if 'openingTime' in fields:
+        assert fields['openingTime'] == crowdsale.functions.openingTime().call()
+        assert fields['closingTime'] == crowdsale.functions.closingTime().call()
+
+
+def test_maps_are_read_in_batches_at_one_block(served):
+    sale, server = served
+    sale.crowdsale = sale.chain.deploy('individually_capped_crowdsale', RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    group = addresses(1500)
+
+    for start in range(0, len(group), 500):
+        sale.chain.transact(sale.crowdsale.functions.setGroupCapBulk(pack_addresses(group[start:start + 500]), 10 * VALUE))
+
+    sale.chain.transact(sale.crowdsale.functions.setPartialFills(True), sale.wallet)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(group[7]), sale.purchaser, VALUE)
+    posts = server.posts
+    block, state = storage.read_state(server.url, sale.crowdsale.address, 'individually_capped_crowdsale', group + [sale.investor])
+
+    # The block number, then 1,505 slots in two batches.
+    assert server.posts - posts == 3
+    assert state['owner'] == sale.owner
+    assert state['walletAndSettlement']['partialFills'] is True
+    assert state['weiRaised'] == VALUE
+    assert len(state['contributionsAndCaps']) == 1501
+    assert state['contributionsAndCaps'][group[7]] == {'contribution': VALUE, 'capSet': True, 'cap': 10 * VALUE}
+    assert state['contributionsAndCaps'][group[-1]] == {'contribution': 0, 'capSet': True, 'cap': sale.crowdsale.functions.getUserCap(group[-1]).call()}
+    assert state['contributionsAndCaps'][sale.investor] == {'contribution': 0, 'capSet': False, 'cap': 0}
+
+
+def test_lists_and_earlier_blocks(served):
+    sale, server = served
+    opening, closing = sale.opening_and_closing()
+    starts, rates = [opening, opening + 3600], [3, 2]
+    sale.crowdsale = sale.chain.deploy('tiered_price_crowdsale', closing, sale.wallet, sale.token.address, 2, padded(starts, 32, 0), padded(rates, 32, 0))
+    deployed = sale.chain.w3.eth.blockNumber
+    sale.fund()
+    sale.chain.time_travel(opening + 60)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+    block, state = storage.read_state(server.url, sale.crowdsale.address, 'tiered_price_crowdsale')
+    _, before = storage.read_state(server.url, sale.crowdsale.address, 'tiered_price_crowdsale', block=deployed)
+
+    assert state['tierCount'] == 2
+    assert state['tiers'][:3] == [{'startTime': opening, 'rate': 3}, {'startTime': opening + 3600, 'rate': 2}, {'startTime': 0, 'rate': 0}]
+    assert state['weiRaised'] == VALUE
+    assert before['weiRaised'] == 0
+
+
+def test_command_writes_json(served, tmpdir):
+    sale, server = served
+    opening, closing = sale.opening_and_closing()
+    sale.crowdsale = sale.chain.deploy('post_delivery_crowdsale', opening, closing, RATE, sale.wallet, sale.token.address)
+    sale.fund()
+    sale.chain.time_travel(opening + 60)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+    investors = tmpdir.join('investors.txt')
+    investors.write('\n'.join([sale.investor, sale.buyer]) + '\n')
+    output = tmpdir.join('state.json')
+
+    storage.main([sale.crowdsale.address, '--investors', str(investors), '--rpc', server.url, '--output', str(output), '--batch-size', '2'])
+
+    result = json.loads(output.read())
+
+    assert result['contract'] == 'post_delivery_crowdsale'
+    assert result['state']['balances'] == {sale.investor: VALUE, sale.buyer: 0}
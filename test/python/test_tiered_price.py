@@ -0,0 +1,79 @@
+import bisect
+import random
+
+import pytest
+
+from sales import Chain, Sale, TransactionReverted, padded
+
+
+# Gas given to the rate queries, so that eth-tester does not estimate the gas of each call first.
+CALL_GAS = 1000000
+
+def expected_rate(starts, rates, closing, time):
+    time = min(time, closing)
+    return rates[max(bisect.bisect_right(starts, time) - 1, 0)]
+
+
+@pytest.fixture(scope='module')
+def sale():
+    sale = Sale(Chain())
+    sale.deploy_token()
+
+    return sale
+
+
+def deploy(sale, starts, rates, closing):
+    return sale.chain.deploy('tiered_price_crowdsale', closing, sale.wallet, sale.token.address, len(starts),
+                             padded(starts, 32, 0), padded(rates, 32, 0))
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 7, 8, 31, 32])
+def test_rates_match_the_schedule(sale, count):
+    generator = random.Random(count)
+    opening = sale.chain.now() + 3600
+    starts = [opening] + sorted(generator.sample(range(opening + 1, opening + 10 ** 6), count - 1))
+    rates = [generator.randrange(1, 2 ** 128) for _ in range(count)]
+    closing = starts[-1] + 1000
+    crowdsale = deploy(sale, starts, rates, closing)
+
+    times = [opening - 1, closing, closing + 1]
+    times += [start + delta for start in starts for delta in (-1, 0, 1)]
+
+    for time in times:
+        assert crowdsale.functions.getRateAt(time).call({'gas': CALL_GAS}) == expected_rate(starts, rates, closing, time)
+
+    assert crowdsale.functions.tierCount().call() == count
+    assert [crowdsale.functions.getTierStartTime(i).call({'gas': CALL_GAS}) for i in range(count)] == starts
+    assert [crowdsale.functions.getTierRate(i).call({'gas': CALL_GAS}) for i in range(count)] == rates
+
+
+def test_purchase_uses_the_current_tier(sale):
+    opening = sale.chain.now() + 3600
+    starts = [opening + i * 1000 for i in range(8)]
+    rates = [100 - i for i in range(8)]
+    crowdsale = deploy(sale, starts, rates, opening + 10000)
+    sale.chain.transact(sale.token.functions.transfer(crowdsale.address, 10 ** 24))
+    sale.chain.time_travel(starts[5] + 10)
+
+    before = sale.token.functions.balanceOf(sale.investor).call()
+    sale.chain.transact(crowdsale.functions.buyTokens(sale.investor), sale.purchaser, 100)
+
+    assert sale.token.functions.balanceOf(sale.investor).call() - before == 100 * rates[5]
+    assert crowdsale.functions.getCurrentRate().call() == rates[5]
+
+
+@pytest.mark.parametrize('starts, rates', [
+    ([], []),
+    ([0, 0], [2, 1]),
+    ([0, 20, 10], [3, 2, 1]),
+    ([0, 10], [2, 0]),
+    ([0, 10], [2, 2 ** 128]),
+    (list(range(0, 330, 10)), [1] * 33),
+])
+def test_invalid_tiers_are_rejected(sale, starts, rates):
+    opening = sale.chain.now() + 3600
+    starts = [opening + start for start in starts]
+
+    with pytest.raises(TransactionReverted):
+        sale.chain.deploy('tiered_price_crowdsale', opening + 1000, sale.wallet, sale.token.address, len(starts),
+                          padded(starts[:32], 32, 0), padded(rates[:32], 32, 0))
@@ -0,0 +1,62 @@
+"""
+Port of timed-crowdsale.js. Snapshots also restore the time of the chain, so the
+contracts are deployed once even though the tests travel in time.
+"""
+
+import pytest
+
+from sales import RATE, Chain, Sale, TransactionReverted
+
+from settlement_behavior import SettlementBehavior
+
+
+VALUE = 42 * 10 ** 18
+
+
+@pytest.fixture(scope='module')
+def deployment():
+    sale = Sale(Chain())
+    sale.deploy_token()
+    sale.opening, sale.closing = sale.opening_and_closing()
+    sale.crowdsale = sale.chain.deploy('timed_crowdsale', sale.opening, sale.closing, RATE, sale.wallet, sale.token.address)
+    sale.fund()
+
+    return sale
+
+
+def purchase(sale):
+    sale.chain.send(sale.crowdsale.address, VALUE)
+    sale.chain.transact(sale.crowdsale.functions.buyTokens(sale.investor), sale.purchaser, VALUE)
+
+
+class TestSettlementAfterStart(SettlementBehavior):
+    @pytest.fixture
+    def sale(self, sale):
+        sale.chain.time_travel(sale.opening)
+        return sale
+
+
+def test_ends_only_after_end(sale):
+    assert sale.crowdsale.functions.hasClosed().call() is False
+
+    sale.chain.time_travel(sale.closing + 1)
+
+    # Time travel only changes the pending block.
+    assert sale.crowdsale.functions.hasClosed().call(block_identifier='pending') is True
+
+
+def test_rejects_payments_before_start(sale):
+    with pytest.raises(TransactionReverted):
+        purchase(sale)
+
+
+def test_accepts_payments_after_start(sale):
+    sale.chain.time_travel(sale.opening)
+    purchase(sale)
+
+
+def test_rejects_payments_after_end(sale):
+    sale.chain.time_travel(sale.closing + 1)
+
+    with pytest.raises(TransactionReverted):
+        purchase(sale)
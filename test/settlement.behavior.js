@@ -0,0 +1,63 @@
+const { expectThrow } = require('./helpers/expectThrow');
+const { EVMRevert } = require('./helpers/EVMRevert');
+const { ethGetBalance } = require('./helpers/web3');
+
+const BigNumber = web3.BigNumber;
+
+require('chai')
+  .use(require('chai-bignumber')(BigNumber))
+  .should();
+
+// Expects this.crowdsale to accept a purchase of `value` for `beneficiary`.
+function shouldBehaveLikeSettlement (wallet, beneficiary, purchaser, value) {
+  describe('as a crowdsale with pull-based settlement', function () {
+    it('should forward funds on each purchase by default', async function () {
+      (await this.crowdsale.accumulateFunds()).should.equal(false);
+
+      const pre = await ethGetBalance(wallet);
+      await this.crowdsale.buyTokens(beneficiary, { value, from: purchaser });
+      const post = await ethGetBalance(wallet);
+      post.minus(pre).should.be.bignumber.equal(value);
+    });
+
+    it('should only let the wallet accumulate funds', async function () {
+      await expectThrow(this.crowdsale.setAccumulateFunds(true, { from: purchaser }), EVMRevert);
+    });
+
+    it('should reject withdrawal when there are no funds', async function () {
+      await expectThrow(this.crowdsale.withdrawFunds({ from: purchaser }), EVMRevert);
+    });
+
+    describe('when accumulating funds', function () {
+      beforeEach(async function () {
+        await this.crowdsale.setAccumulateFunds(true, { from: wallet });
+      });
+
+      it('should keep funds in the crowdsale', async function () {
+        const pre = await ethGetBalance(wallet);
+        await this.crowdsale.buyTokens(beneficiary, { value, from: purchaser });
+        const post = await ethGetBalance(wallet);
+        post.should.be.bignumber.equal(pre);
+
+        (await ethGetBalance(this.crowdsale.address)).should.be.bignumber.equal(value);
+        (await this.crowdsale.weiRaised()).should.be.bignumber.equal(value);
+      });
+
+      it('should forward all accumulated funds to wallet on withdrawal', async function () {
+        await this.crowdsale.buyTokens(beneficiary, { value, from: purchaser });
+        await this.crowdsale.buyTokens(beneficiary, { value, from: purchaser });
+
+        const pre = await ethGetBalance(wallet);
+        await this.crowdsale.withdrawFunds({ from: purchaser });
+        const post = await ethGetBalance(wallet);
+        post.minus(pre).should.be.bignumber.equal(value.mul(2));
+
+        (await ethGetBalance(this.crowdsale.address)).should.be.bignumber.equal(0);
+      });
+    });
+  });
+}
+
+module.exports = {
+  shouldBehaveLikeSettlement,
+};
@@ -0,0 +1,112 @@
+const { ether } = require('./helpers/ether');
+const { advanceBlock } = require('./helpers/advanceToBlock');
+const { increaseTimeTo, duration } = require('./helpers/increaseTime');
+const { latestTime } = require('./helpers/latestTime');
+const { fixedArray } = require('./helpers/fixedArray');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
+const { assertRevert } = require('./helpers/assertRevert');
+
+const BigNumber = web3.BigNumber;
+
+require('chai')
+  .use(require('chai-bignumber')(BigNumber))
+  .should();
+
+const TieredPriceCrowdsale = artifacts.require('tiered_price_crowdsale.vyper');
+const SimpleToken = artifacts.require('erc20_standard_token.vyper');
+
+contract('TieredPriceCrowdsale', function ([_, investor, wallet, purchaser]) {
+  const value = ether(1);
+  const tokenSupply = new BigNumber('1e22');
+  const rates = [new BigNumber(9166), new BigNumber(8000), new BigNumber(5500)];
+
+  async function deployTiers (startTimes, tierRates, closingTime, token) {
+    return TieredPriceCrowdsale.new(
+      closingTime, wallet, token, startTimes.length, fixedArray(startTimes, 32, 0), fixedArray(tierRates, 32, 0)
+    );
+  }
+
+  beforeEach(async function () {
+    await advanceBlock();
+    this.startTime = (await latestTime()) + duration.weeks(1);
+    this.startTimes = [this.startTime, this.startTime + duration.days(2), this.startTime + duration.days(5)];
+    this.closingTime = this.startTime + duration.weeks(1);
+    this.afterClosingTime = this.closingTime + duration.seconds(1);
+    this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+  });
+
+  describe('creating a valid crowdsale', function () {
+    it('should fail with no tiers', async function () {
+      await assertRevert(deployTiers([], [], this.closingTime, this.token.address));
+    });
+
+    it('should fail with tiers out of order', async function () {
+      const startTimes = [this.startTimes[0], this.startTimes[2], this.startTimes[1]];
+      await assertRevert(deployTiers(startTimes, rates, this.closingTime, this.token.address));
+    });
+
+    it('should fail with a zero rate', async function () {
+      await assertRevert(deployTiers(this.startTimes, [rates[0], 0, rates[2]], this.closingTime, this.token.address));
+    });
+
+    it('should fail with a tier starting after the closing time', async function () {
+      const startTimes = [this.startTimes[0], this.startTimes[1], this.afterClosingTime];
+      await assertRevert(deployTiers(startTimes, rates, this.closingTime, this.token.address));
+    });
+  });
+
+  describe('rate during crowdsale should change at each tier', function () {
+    beforeEach(async function () {
+      this.crowdsale = await deployTiers(this.startTimes, rates, this.closingTime, this.token.address);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+    });
+
+    it('should report the tiers', async function () {
+      (await this.crowdsale.tierCount()).should.be.bignumber.equal(3);
+      (await this.crowdsale.openingTime()).should.be.bignumber.equal(this.startTime);
+      (await this.crowdsale.getTierStartTime(1)).should.be.bignumber.equal(this.startTimes[1]);
+      (await this.crowdsale.getTierRate(1)).should.be.bignumber.equal(rates[1]);
+      await assertRevert(this.crowdsale.getTierRate(3));
+    });
+
+    it('should report the rate at any time without advancing the chain', async function () {
+      (await this.crowdsale.getRateAt(this.startTime)).should.be.bignumber.equal(rates[0]);
+      (await this.crowdsale.getRateAt(this.startTimes[1] - 1)).should.be.bignumber.equal(rates[0]);
+      (await this.crowdsale.getRateAt(this.startTimes[1])).should.be.bignumber.equal(rates[1]);
+      (await this.crowdsale.getRateAt(this.startTimes[2] + 1)).should.be.bignumber.equal(rates[2]);
+    });
+
+    it('should clamp the rate to the crowdsale period', async function () {
+      (await this.crowdsale.getRateAt(this.startTime - 1000)).should.be.bignumber.equal(rates[0]);
+      (await this.crowdsale.getRateAt(this.afterClosingTime)).should.be.bignumber.equal(rates[2]);
+    });
+
+    it('at start', async function () {
+      await increaseTimeTo(this.startTime);
+      await this.crowdsale.buyTokens(investor, { value, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(value.mul(rates[0]));
+    });
+
+    it('during the second tier', async function () {
+      await increaseTimeTo(this.startTimes[1] + duration.hours(1));
+      await this.crowdsale.buyTokens(investor, { value, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(value.mul(rates[1]));
+    });
+
+    it('during the last tier', async function () {
+      await increaseTimeTo(this.startTimes[2] + duration.hours(1));
+      await this.crowdsale.buyTokens(investor, { value, from: purchaser });
+      (await this.token.balanceOf(investor)).should.be.bignumber.equal(value.mul(rates[2]));
+    });
+  });
+
+  describe('after start', function () {
+    beforeEach(async function () {
+      this.crowdsale = await deployTiers(this.startTimes, rates, this.closingTime, this.token.address);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+      await increaseTimeTo(this.startTime);
+    });
+
+    shouldBehaveLikeSettlement(wallet, investor, purchaser, value);
+  });
+});
@@ -4,6 +4,7 @@ const { increaseTimeTo, duration } = require('./helpers/increaseTime');
 const { latestTime } = require('./helpers/latestTime');
 const { expectThrow } = require('./helpers/expectThrow');
 const { EVMRevert } = require('./helpers/EVMRevert');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
 
 const BigNumber = web3.BigNumber;
 
@@ -59,4 +60,12 @@ contract('TimedCrowdsale', function ([_, investor, wallet, purchaser]) {
       await expectThrow(this.crowdsale.buyTokens(investor, { value: value, from: purchaser }), EVMRevert);
     });
   });
+
+  describe('after start', function () {
+    beforeEach(async function () {
+      await increaseTimeTo(this.openingTime);
+    });
+
+    shouldBehaveLikeSettlement(wallet, investor, purchaser, ether(1));
+  });
 });
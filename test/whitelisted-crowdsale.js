@@ -1,6 +1,10 @@
 const { ether } = require('./helpers/ether');
 const { expectThrow } = require('./helpers/expectThrow');
 const { shouldBehaveLikeOwnable } = require('./ownable.behavior.js');
+const { shouldBehaveLikeSettlement } = require('./settlement.behavior.js');
+const { EVMRevert } = require('./helpers/EVMRevert');
+const { addressLeaf, merkleTree, fixedProof, ZERO_HASH } = require('./helpers/merkleTree');
+const { packAddresses } = require('./helpers/packAddresses');
 
 const BigNumber = web3.BigNumber;
 
@@ -26,6 +30,7 @@ contract('WhitelistedCrowdsale', function ([_, wallet, authorized, unauthorized,
     });
 
     shouldBehaveLikeOwnable([_, wallet, authorized, unauthorized, anotherAuthorized]);
+    shouldBehaveLikeSettlement(wallet, authorized, unauthorized, ether(1));
 
     describe('accepting payments', function () {
       it('should accept payments to whitelisted (from whichever buyers)', async function () {
@@ -98,4 +103,112 @@ contract('WhitelistedCrowdsale', function ([_, wallet, authorized, unauthorized,
       });
     });
   });
+
+  describe('bulk whitelisting', function () {
+    beforeEach(async function () {
+      this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+      this.crowdsale = await WhitelistedCrowdsale.new(rate, wallet, this.token.address);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+      await this.crowdsale.addAddressesToWhitelistBulk(packAddresses([authorized, anotherAuthorized]));
+    });
+
+    describe('accepting payments', function () {
+      it('should accept payments to whitelisted (from whichever buyers)', async function () {
+        await this.crowdsale.buyTokens(authorized, { value: value, from: unauthorized });
+        await this.crowdsale.buyTokens(anotherAuthorized, { value: value, from: authorized });
+      });
+
+      it('should reject payments to not whitelisted (with whichever buyers)', async function () {
+        await expectThrow(this.crowdsale.buyTokens(unauthorized, { value: value, from: authorized }));
+      });
+
+      it('should reject payments to addresses removed from whitelist', async function () {
+        await this.crowdsale.removeAddressesFromWhitelistBulk(packAddresses([anotherAuthorized]));
+        await this.crowdsale.buyTokens(authorized, { value: value, from: authorized });
+        await expectThrow(this.crowdsale.buyTokens(anotherAuthorized, { value: value, from: authorized }));
+      });
+    });
+
+    describe('managing the whitelist', function () {
+      it('should only allow the owner to whitelist', async function () {
+        await expectThrow(this.crowdsale.addAddressesToWhitelistBulk(packAddresses([unauthorized]), { from: unauthorized }), EVMRevert);
+        await expectThrow(this.crowdsale.removeAddressesFromWhitelistBulk(packAddresses([authorized]), { from: unauthorized }), EVMRevert);
+      });
+
+      it('should reject lists that are not made of 32 byte words', async function () {
+        await expectThrow(this.crowdsale.addAddressesToWhitelistBulk(unauthorized), EVMRevert);
+      });
+
+      it('should log every address', async function () {
+        const { logs } = await this.crowdsale.addAddressesToWhitelistBulk(packAddresses([unauthorized, _]));
+        logs.length.should.equal(2);
+        logs[0].event.should.equal('WhitelistAdded');
+        logs[1].args._address.should.equal(_);
+      });
+    });
+
+    describe('reporting whitelisted', function () {
+      it('should report the status of many addresses at once', async function () {
+        const statuses = await this.crowdsale.checkIfWhitelistedBulk(packAddresses([authorized, unauthorized, anotherAuthorized]));
+        statuses.length.should.equal(500);
+        statuses.slice(0, 4).should.deep.equal([true, false, true, false]);
+      });
+    });
+  });
+
+  describe('merkle root whitelisting', function () {
+    beforeEach(async function () {
+      this.token = await SimpleToken.new(web3.fromAscii("Name"), web3.fromAscii("SYMBOL"), tokenSupply, 18);
+      this.crowdsale = await WhitelistedCrowdsale.new(rate, wallet, this.token.address);
+      await this.token.transfer(this.crowdsale.address, tokenSupply);
+
+      this.tree = merkleTree([authorized, anotherAuthorized, _].map(addressLeaf));
+      this.proof = fixedProof(this.tree.proof(0));
+      this.proofLength = this.tree.proof(0).length;
+      this.anotherProof = fixedProof(this.tree.proof(1));
+      this.anotherProofLength = this.tree.proof(1).length;
+
+      await this.crowdsale.setWhitelistRoot(this.tree.root);
+    });
+
+    describe('accepting payments', function () {
+      it('should accept payments with a valid proof (from whichever buyers)', async function () {
+        await this.crowdsale.buyTokensWithProof(authorized, this.proof, this.proofLength, { value: value, from: authorized });
+        await this.crowdsale.buyTokensWithProof(authorized, this.proof, this.proofLength, { value: value, from: unauthorized });
+        await this.crowdsale.buyTokensWithProof(anotherAuthorized, this.anotherProof, this.anotherProofLength, { value: value, from: unauthorized });
+      });
+
+      it('should reject payments with the proof of another address', async function () {
+        await expectThrow(this.crowdsale.buyTokensWithProof(unauthorized, this.proof, this.proofLength, { value: value, from: unauthorized }), EVMRevert);
+        await expectThrow(this.crowdsale.buyTokensWithProof(anotherAuthorized, this.proof, this.proofLength, { value: value, from: authorized }), EVMRevert);
+      });
+
+      it('should not whitelist the tree for regular purchases', async function () {
+        await expectThrow(this.crowdsale.buyTokens(authorized, { value: value, from: authorized }), EVMRevert);
+      });
+
+      it('should reject payments once the root is cleared', async function () {
+        await this.crowdsale.setWhitelistRoot(ZERO_HASH);
+        await expectThrow(this.crowdsale.buyTokensWithProof(authorized, this.proof, this.proofLength, { value: value, from: authorized }), EVMRevert);
+      });
+    });
+
+    describe('managing the root', function () {
+      it('should only allow the owner to change the root', async function () {
+        await expectThrow(this.crowdsale.setWhitelistRoot(ZERO_HASH, { from: authorized }), EVMRevert);
+      });
+
+      it('should log the root change', async function () {
+        const { logs } = await this.crowdsale.setWhitelistRoot(ZERO_HASH);
+        logs.find(e => e.event === 'WhitelistRootChanged').args._root.should.equal(ZERO_HASH);
+      });
+    });
+
+    describe('reporting whitelisted', function () {
+      it('should correctly report proofs', async function () {
+        (await this.crowdsale.checkWhitelistProof(authorized, this.proof, this.proofLength)).should.equal(true);
+        (await this.crowdsale.checkWhitelistProof(unauthorized, this.proof, this.proofLength)).should.equal(false);
+      });
+    });
+  });
 });